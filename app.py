@@ -2,25 +2,58 @@
 Main Flask application for the Email Priority Agent.
 
 Exposes:
-- GET  /health  : healthcheck endpoint used by the Supervisor
+- GET  /health  : healthcheck (liveness) endpoint used by the Supervisor
+- GET  /ready   : readiness endpoint; 200 only once worker warm-up has finished
+- GET  /stats   : LTM hit rates (exact / near-duplicate tiers) of this worker
+- GET  /metrics : Prometheus metrics (stage latency histograms, LTM / model counters)
 - POST /handle  : main handler endpoint that follows the agreed handshake contract
+- POST /handle_batch : same contract for N requests at once (bulk LTM + vectorized model)
+- POST /admin/reload_model : hot-swap the model version (needs X-Admin-Token)
 
 This file should NOT contain core ML / business logic.
 It should delegate to the email_agent package (priority_logic, ltm_store, etc.).
 """
 
-from flask import Flask, jsonify, request
+from typing import Any
+
+from flask import Flask, Response, jsonify, request
 
 # These modules will live under email_agent/ (we'll define them later).
-from email_agent.config import AGENT_NAME
-from email_agent.handshake_schemas import AgentRequest, AgentResponse
-from email_agent.priority_logic import classify_email
-from email_agent.ltm_store import lookup, store
-from email_agent.utils.logging_utils import get_logger
+from email_agent import metrics, service
+from email_agent.ltm_store import cache_stats, start_background_compaction, tier_stats
+from email_agent.config import AGENT_NAME, SERVER_TIMING
+from email_agent.utils.logging_utils import Payload, get_logger, sampled
+from email_agent.utils.timing import StageTimer
+from email_agent.warmup import readiness, start_warm_up
 
 app = Flask(__name__)
 logger = get_logger(__name__)
 
+# Load the model, keyword matcher and LTM store as soon as the worker starts
+start_warm_up()
+
+# Enforce LTM capacity limits periodically (off unless
+# EMAIL_AGENT_LTM_COMPACTION_INTERVAL_SECONDS is set). With gunicorn's
+# preload_app this thread lives in the master only, so one process compacts.
+start_background_compaction()
+
+
+def _summary_flag() -> bool:
+    return request.args.get("summary", "").lower() in ("1", "true", "yes")
+
+
+def _timed_json(endpoint: str, model: Any, status_code: int, timer: StageTimer) -> tuple:
+    """
+    Serialize a response model, record the request's metrics and add the
+    Server-Timing header if enabled.
+    """
+    with timer.stage("serialize"):
+        response = Response(service.encode_response(model), mimetype="application/json")
+    metrics.observe_request(endpoint, status_code, timer.elapsed_ms(), timer.stages)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = timer.server_timing()
+    return response, status_code
+
 
 @app.route("/health", methods=["GET"])
 def health() -> tuple:
@@ -38,6 +71,64 @@ def health() -> tuple:
     return jsonify(response_body), 200
 
 
+@app.route("/ready", methods=["GET"])
+def ready() -> tuple:
+    """
+    Readiness endpoint, separate from /health (liveness).
+
+    Returns 200 once warm-up has finished (model loaded, matcher compiled,
+    LTM open, dummy inference done) and 503 while it is still running or
+    if it failed. Also reports how long warm-up took.
+    """
+    state = readiness()
+    response_body = {
+        "status": state["status"],
+        "agent": AGENT_NAME,
+        "warmup_duration_ms": state["duration_ms"],
+        "model_version": state["model_version"],
+    }
+    if state["error"]:
+        response_body["error"] = state["error"]
+    status_code = 200 if state["status"] == "ready" else 503
+    return jsonify(response_body), status_code
+
+
+@app.route("/stats", methods=["GET"])
+def stats() -> tuple:
+    """
+    LTM hit-rate counters for the worker that serves this request:
+    exact and near-duplicate tier hits, misses, and the front cache.
+    """
+    response_body = {
+        "agent": AGENT_NAME,
+        "ltm": tier_stats(),
+        "front_cache": cache_stats(),
+    }
+    return jsonify(response_body), 200
+
+
+@app.route("/admin/reload_model", methods=["POST"])
+def admin_reload_model() -> tuple:
+    """
+    Swap to a new model version without a restart (needs X-Admin-Token).
+    See service.admin_reload_model.
+    """
+    status_code, response_body = service.admin_reload_model(
+        request.headers.get("X-Admin-Token"), request.get_data(cache=False)
+    )
+    return jsonify(response_body), status_code
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint() -> Response:
+    """
+    Prometheus text format: request / stage latency histograms and counters
+    for LTM tiers, ML vs rule-based classifications and model errors,
+    summed over all workers when EMAIL_AGENT_METRICS_DIR is set.
+    """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/handle", methods=["POST"])
 def handle() -> tuple:
     """
@@ -66,97 +157,95 @@ def handle() -> tuple:
       "error":  { "type": "...", "message": "..." } | null
     }
     """
+    timer = StageTimer()
     try:
-        raw_json = request.get_json(force=True, silent=False)
-        logger.info("Received /handle request: %s", raw_json)
-
-        # Parse & validate handshake into internal model
-        agent_request = AgentRequest.model_validate(raw_json)
+        with timer.stage("parse"):
+            body = request.get_data(cache=False)
+
+        # Decode & validate the handshake into the internal model in one pass
+        with timer.stage("validate"):
+            agent_request = service.parse_request(body)
+        logger.info(
+            "Received /handle request",
+            extra=sampled(
+                request_id=agent_request.request_id,
+                intent=agent_request.intent,
+                text=Payload(agent_request.input.text),
+            ),
+        )
 
     except Exception as exc:
         # Any parsing/validation / unexpected error before we have a request_id
         logger.exception("Failed to parse AgentRequest")
         # We may not have a request_id; send a generic response.
-        error_response = AgentResponse(
-            request_id=None,
-            agent_name=AGENT_NAME,
-            status="error",
-            output=None,
-            error={
-                "type": "BadRequest",
-                "message": f"Invalid request payload: {exc}",
-            },
+        error_response = service.error_response(
+            None, "BadRequest", f"Invalid request payload: {exc}"
         )
-        return jsonify(error_response.model_dump()), 400
+        return _timed_json("handle", error_response, 400, timer)
 
     # At this point we have a valid AgentRequest, including request_id.
     try:
-        # Build a deterministic task key for LTM (can refine later)
-        task_key = f"{agent_request.intent}:{agent_request.input.text}"
-
-        # 1) Try long-term memory first
-        cached_result = lookup(task_key)
-        if cached_result is not None:
-            logger.info("LTM hit for task_key=%s", task_key)
-            result_payload = cached_result
-            # Ensure cached results also have human_readable_summary (for backward compatibility)
-            if "human_readable_summary" not in result_payload:
-                from email_agent.priority_logic import format_human_readable_response
-                result_payload["human_readable_summary"] = format_human_readable_response(
-                    priority=result_payload.get("priority", "unknown"),
-                    confidence=result_payload.get("confidence", 0.0),
-                    explanation=result_payload.get("explanation", ""),
-                    metadata=agent_request.input.metadata,
-                    text_length=result_payload.get("raw_text_length", 0),
-                )
-        else:
-            logger.info("LTM miss for task_key=%s; invoking core logic", task_key)
-
-            # 2) Call core classification logic (ML model + rules)
-            result_payload = classify_email(
-                text=agent_request.input.text,
-                metadata=agent_request.input.metadata,
-                context=agent_request.context,
-            )
-
-            # 3) Store successful result in LTM
-            try:
-                store(task_key, result_payload)
-            except Exception:
-                # LTM failures should not break the main flow
-                logger.exception("Failed to store result in LTM for task_key=%s", task_key)
-
-        # 4) Build a success response with properly formatted output
-        agent_response = AgentResponse(
-            request_id=agent_request.request_id,
-            agent_name=AGENT_NAME,
-            status="success",
-            # NEST the result payload under "result"
-            output={"result": result_payload},
-            error=None,
+        # LTM lookup -> classify on miss -> store -> response (see email_agent/service.py)
+        agent_response = service.handle_request(
+            agent_request, summary_flag=_summary_flag(), timer=timer
         )
-        
-        # Log the human-readable summary for debugging
-        if "human_readable_summary" in result_payload:
-            logger.info("Classification result:\n%s", result_payload["human_readable_summary"])
-        
-        return jsonify(agent_response.model_dump()), 200
+        return _timed_json("handle", agent_response, 200, timer)
 
     except Exception as exc:
         # Any runtime error in business logic should result in a structured error response
         logger.exception("Error while handling request_id=%s", agent_request.request_id)
-        error_response = AgentResponse(
-            request_id=agent_request.request_id,
-            agent_name=AGENT_NAME,
-            status="error",
-            output=None,
-            error={
-                "type": type(exc).__name__,
-                "message": str(exc),
-            },
+        error_response = service.error_response(
+            agent_request.request_id, type(exc).__name__, str(exc)
         )
         # You can choose 500 or 200 with status="error"; using 500 is clearer for infra.
-        return jsonify(error_response.model_dump()), 500
+        return _timed_json("handle", error_response, 500, timer)
+
+
+@app.route("/handle_batch", methods=["POST"])
+def handle_batch() -> tuple:
+    """
+    Batch handler endpoint.
+
+    Expected JSON body:
+    {
+      "request_id": "...",          # optional, for the batch
+      "agent_name": "email_priority_agent",
+      "requests": [ <handshake>, <handshake>, ... ]
+    }
+
+    All LTM lookups are done in bulk, every miss goes through the model in
+    a single vectorized call, and the new results are written back to LTM in
+    one transaction. Each item gets its own AgentResponse (in order), so one
+    invalid item does not fail the whole batch.
+    """
+    timer = StageTimer()
+    try:
+        with timer.stage("parse"):
+            body = request.get_data(cache=False)
+        with timer.stage("validate"):
+            batch_request = service.parse_batch(body)
+    except Exception as exc:
+        logger.exception("Failed to parse BatchRequest")
+        error_response = service.error_response(None, "BadRequest", f"Invalid batch payload: {exc}")
+        return _timed_json("handle_batch", error_response, 400, timer)
+
+    logger.info(
+        "Received /handle_batch request",
+        extra=sampled(request_id=batch_request.request_id, items=len(batch_request.requests)),
+    )
+
+    try:
+        batch_response = service.handle_batch(
+            batch_request, summary_flag=_summary_flag(), timer=timer
+        )
+        return _timed_json("handle_batch", batch_response, 200, timer)
+
+    except Exception as exc:
+        logger.exception("Error while handling batch request_id=%s", batch_request.request_id)
+        error_response = service.error_response(
+            batch_request.request_id, type(exc).__name__, str(exc)
+        )
+        return _timed_json("handle_batch", error_response, 500, timer)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,330 @@
+"""
+Async (ASGI) entry point for the Email Priority Agent.
+
+Same HTTP contract as app.py:
+- GET  /health        : liveness
+- GET  /ready         : readiness (200 once warm-up has finished)
+- GET  /stats         : LTM hit rates of this worker
+- GET  /metrics       : Prometheus metrics
+- POST /handle        : main handshake endpoint
+- POST /handle_batch  : batch handshake endpoint
+
+Differences from the Flask/WSGI app:
+- LTM lookups and stores run in a small I/O thread pool, so the event loop
+  never blocks on SQLite/file access
+- model inference runs in a bounded executor (ASGI_INFERENCE_WORKERS), so
+  a burst of misses cannot starve the loop or oversubscribe the CPU
+- with ASGI_DEFER_LTM_WRITES the response is sent first and the LTM
+  write-back finishes afterwards
+
+Written against the raw ASGI 3 interface, so it needs no web framework.
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 2
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qs
+
+from pydantic import BaseModel
+
+from email_agent import metrics, service
+from email_agent.config import (
+    AGENT_NAME,
+    ASGI_DEFER_LTM_WRITES,
+    ASGI_INFERENCE_WORKERS,
+    ASGI_IO_WORKERS,
+    SERVER_TIMING,
+    WARMUP_MODE,
+)
+from email_agent.handshake_schemas import AgentRequest
+from email_agent.ltm_store import (
+    cache_stats,
+    start_background_compaction,
+    stop_background_compaction,
+    tier_stats,
+)
+from email_agent.utils.logging_utils import get_logger
+from email_agent.utils.timing import StageTimer
+from email_agent.warmup import readiness, start_warm_up, warm_up
+
+logger = get_logger(__name__)
+
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_IO_EXECUTOR = ThreadPoolExecutor(max_workers=ASGI_IO_WORKERS, thread_name_prefix="ltm-io")
+_INFERENCE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=ASGI_INFERENCE_WORKERS, thread_name_prefix="inference"
+)
+
+# LTM write-backs still running after their response was sent
+_PENDING_WRITES: Set["asyncio.Task[None]"] = set()
+
+
+async def _read_body(receive: Receive) -> bytes:
+    message = await receive()
+    if not message.get("more_body", False):
+        # Usual case: the whole body in one message, no copy needed
+        return message.get("body", b"")
+    chunks = [message.get("body", b"")]
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def _send_json(
+    send: Send, status: int, body: Dict[str, Any], extra_headers: Sequence[Tuple[bytes, bytes]] = ()
+) -> None:
+    await _send_payload(send, status, json.dumps(body).encode("utf-8"), extra_headers=extra_headers)
+
+
+async def _send_payload(
+    send: Send,
+    status: int,
+    payload: bytes,
+    timer: Optional[StageTimer] = None,
+    extra_headers: Sequence[Tuple[bytes, bytes]] = (),
+) -> None:
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(payload)).encode("ascii")),
+        *extra_headers,
+    ]
+    if timer is not None and SERVER_TIMING:
+        headers.append((b"server-timing", timer.server_timing().encode("ascii")))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def _send_timed(
+    send: Send, endpoint: str, status: int, response: BaseModel, timer: StageTimer
+) -> None:
+    """
+    Send a handshake response and record the request's metrics.
+    """
+    with timer.stage("serialize"):
+        payload = service.encode_response(response)
+    await _send_payload(send, status, payload, timer)
+    metrics.observe_request(endpoint, status, timer.elapsed_ms(), timer.stages)
+
+
+def _summary_flag(scope: Dict[str, Any]) -> bool:
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("summary", [""])[0].lower() in ("1", "true", "yes")
+
+
+async def _run_io(fn: Callable[..., Any], *args: Any) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(_IO_EXECUTOR, fn, *args)
+
+
+async def _run_inference(fn: Callable[..., Any], *args: Any) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(_INFERENCE_EXECUTOR, fn, *args)
+
+
+def _schedule_write(task_key: str, result_payload: Dict[str, Any], agent_request: AgentRequest) -> None:
+    task = asyncio.ensure_future(_run_io(service.remember, task_key, result_payload, agent_request))
+    _PENDING_WRITES.add(task)
+    task.add_done_callback(_PENDING_WRITES.discard)
+
+
+async def drain_pending_writes() -> None:
+    """
+    Wait for deferred LTM write-backs (used at shutdown and in tests).
+    """
+    if _PENDING_WRITES:
+        await asyncio.gather(*list(_PENDING_WRITES), return_exceptions=True)
+
+
+async def _health(scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+    await _send_json(
+        send,
+        200,
+        {
+            "status": "ok",
+            "agent": AGENT_NAME,
+            "message": "Email Priority Agent is healthy.",
+        },
+    )
+
+
+async def _ready(scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+    # May check the registry for a new model version (file I/O)
+    state = await _run_io(readiness)
+    body = {
+        "status": state["status"],
+        "agent": AGENT_NAME,
+        "warmup_duration_ms": state["duration_ms"],
+        "model_version": state["model_version"],
+    }
+    if state["error"]:
+        body["error"] = state["error"]
+    await _send_json(send, 200 if state["status"] == "ready" else 503, body)
+
+
+async def _stats(scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+    await _send_json(send, 200, {"agent": AGENT_NAME, "ltm": tier_stats(), "front_cache": cache_stats()})
+
+
+async def _admin_reload_model(scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+    token = dict(scope.get("headers") or []).get(b"x-admin-token")
+    body = await _read_body(receive)
+    # Loading a model is blocking file I/O + unpickling
+    status, response_body = await _run_io(
+        service.admin_reload_model, token.decode("latin-1") if token is not None else None, body
+    )
+    await _send_json(send, status, response_body)
+
+
+async def _metrics(scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+    # Reading the other workers' snapshots is file I/O
+    payload = (await _run_io(metrics.render)).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; version=0.0.4; charset=utf-8"),
+                (b"content-length", str(len(payload)).encode("ascii")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def _handle(scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+    timer = StageTimer()
+    try:
+        with timer.stage("parse"):
+            body = await _read_body(receive)
+        with timer.stage("validate"):
+            agent_request = service.parse_request(body)
+    except Exception as exc:
+        logger.exception("Failed to parse AgentRequest")
+        error_response = service.error_response(None, "BadRequest", f"Invalid request payload: {exc}")
+        await _send_timed(send, "handle", 400, error_response, timer)
+        return
+
+    pending_write: Optional[Tuple[str, Dict[str, Any], AgentRequest]] = None
+    try:
+        # 1) LTM lookup off the event loop (stage times include executor queueing)
+        with timer.stage("ltm_lookup"):
+            task_key, result_payload = await _run_io(service.lookup_cached, agent_request)
+
+        # 2) Inference in the bounded executor
+        if result_payload is None:
+            with timer.stage("classify"):
+                result_payload = await _run_inference(service.classify, agent_request)
+            pending_write = (task_key, dict(result_payload), agent_request)
+            if not ASGI_DEFER_LTM_WRITES:
+                with timer.stage("ltm_store"):
+                    await _run_io(service.remember, *pending_write)
+                pending_write = None
+
+        agent_response = service.success_response(
+            agent_request, result_payload, _summary_flag(scope), timer
+        )
+        status_code = 200
+    except Exception as exc:
+        logger.exception("Error while handling request_id=%s", agent_request.request_id)
+        agent_response = service.error_response(agent_request.request_id, type(exc).__name__, str(exc))
+        status_code = 500
+
+    # 3) Respond first, then let the LTM write-back finish in the background
+    await _send_timed(send, "handle", status_code, agent_response, timer)
+    if pending_write is not None:
+        _schedule_write(*pending_write)
+
+
+async def _handle_batch(scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+    timer = StageTimer()
+    try:
+        with timer.stage("parse"):
+            body = await _read_body(receive)
+        with timer.stage("validate"):
+            batch_request = service.parse_batch(body)
+    except Exception as exc:
+        logger.exception("Failed to parse BatchRequest")
+        error_response = service.error_response(None, "BadRequest", f"Invalid batch payload: {exc}")
+        await _send_timed(send, "handle_batch", 400, error_response, timer)
+        return
+
+    try:
+        # Bulk LTM I/O and vectorized inference happen together; run the
+        # whole batch in the inference executor to keep the loop free.
+        batch_response = await _run_inference(
+            service.handle_batch, batch_request, _summary_flag(scope), timer
+        )
+        await _send_timed(send, "handle_batch", 200, batch_response, timer)
+    except Exception as exc:
+        logger.exception("Error while handling batch request_id=%s", batch_request.request_id)
+        error_response = service.error_response(
+            batch_request.request_id, type(exc).__name__, str(exc)
+        )
+        await _send_timed(send, "handle_batch", 500, error_response, timer)
+
+
+_ROUTES = {
+    ("GET", "/health"): _health,
+    ("GET", "/ready"): _ready,
+    ("GET", "/stats"): _stats,
+    ("GET", "/metrics"): _metrics,
+    ("POST", "/handle"): _handle,
+    ("POST", "/handle_batch"): _handle_batch,
+    ("POST", "/admin/reload_model"): _admin_reload_model,
+}
+
+# Methods served on each path, for the Allow header of a 405
+_ALLOWED_METHODS: Dict[str, str] = {
+    path: ", ".join(sorted(method for method, other in _ROUTES if other == path))
+    for _, path in _ROUTES
+}
+
+
+async def _lifespan(receive: Receive, send: Send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if WARMUP_MODE == "blocking":
+                await asyncio.get_running_loop().run_in_executor(None, warm_up)
+            else:
+                start_warm_up(WARMUP_MODE)
+            start_background_compaction()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await drain_pending_writes()
+            stop_background_compaction()
+            _IO_EXECUTOR.shutdown(wait=True)
+            _INFERENCE_EXECUTOR.shutdown(wait=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+    """
+    ASGI 3 application callable.
+    """
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    route = _ROUTES.get((scope["method"], scope["path"]))
+    if route is None:
+        allowed = _ALLOWED_METHODS.get(scope["path"])
+        if allowed is None:
+            await _send_json(send, 404, {"status": "error", "message": "Not found"})
+        else:
+            await _send_json(
+                send,
+                405,
+                {"status": "error", "message": "Method not allowed"},
+                extra_headers=[(b"allow", allowed.encode("ascii"))],
+            )
+        return
+    await route(scope, receive, send)
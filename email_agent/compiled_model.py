@@ -0,0 +1,185 @@
+"""
+sklearn-free inference for the TF-IDF + LogisticRegression model.
+
+At serve time the pipeline only needs the vocabulary, the IDF weights and
+the classifier's coefficients. learning/model_export.py compiles a trained
+pipeline into those arrays (a small .npz file next to the pickle), and
+CompiledModel reproduces TfidfVectorizer.transform + predict_proba with
+plain numpy: tokenize, count the known n-grams, weight and normalize the
+sparse row, then a softmax over a handful of dot products.
+
+Loading it imports neither sklearn nor joblib and unpickles nothing.
+
+The arrays may also be compressed (learning/model_compression.py): fewer
+terms, float32 weights, or int8 coefficients with one float scale per
+class (coef_scale). They are used as stored, without expanding them.
+"""
+
+import json
+import math
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+class CompiledModel:
+    """
+    Duck-types the parts of a fitted sklearn classifier that priority_logic
+    uses: `classes_`, `predict_proba(texts)` and `predict(texts)`.
+    """
+
+    def __init__(
+        self,
+        terms: Sequence[str],
+        idf: np.ndarray,
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        classes: Sequence[str],
+        settings: Dict[str, Any],
+        coef_scale: Optional[np.ndarray] = None,
+        source_sha256: Optional[str] = None,
+    ):
+        """
+        coef has one row per term and one column per class (a single column
+        for a binary classifier, as in sklearn); settings holds the
+        vectorizer options ("lowercase", "token_pattern", "ngram_range",
+        "sublinear_tf", "binary", "norm") and "output" ("softmax" or
+        "sigmoid"). With coef_scale, coef holds quantized integers and the
+        real coefficient of class c is coef[:, c] * coef_scale[c].
+        source_sha256 is the hash of the pickle it was compiled from, so a
+        compiled file left behind by an older pickle is never served.
+        """
+        self.terms = [str(term) for term in terms]
+        self.idf = np.asarray(idf)
+        self.coef = np.asarray(coef)
+        self.intercept = np.asarray(intercept)
+        self.coef_scale = None if coef_scale is None else np.asarray(coef_scale)
+        self.classes_ = np.asarray(classes)
+        self.settings = dict(settings)
+        self.source_sha256 = source_sha256
+
+        self._vocabulary = {term: index for index, term in enumerate(self.terms)}
+        self._token_re = re.compile(self.settings["token_pattern"])
+        self._lowercase = bool(self.settings["lowercase"])
+        self._min_n, self._max_n = self.settings["ngram_range"]
+        self._sublinear_tf = bool(self.settings["sublinear_tf"])
+        self._binary = bool(self.settings["binary"])
+        self._l2_norm = self.settings["norm"] == "l2"
+        self._softmax = self.settings["output"] == "softmax"
+
+    @property
+    def n_features(self) -> int:
+        return len(self.terms)
+
+    def _counts(self, text: str) -> Dict[int, int]:
+        """
+        Column -> count of every vocabulary n-gram in the text, with the
+        same analyzer as TfidfVectorizer (analyzer="word").
+        """
+        if self._lowercase:
+            text = text.lower()
+        tokens = self._token_re.findall(text)
+        vocabulary = self._vocabulary
+        counts: Dict[int, int] = {}
+        for n in range(self._min_n, self._max_n + 1):
+            if n == 1:
+                grams: Any = tokens
+            else:
+                grams = (" ".join(tokens[i : i + n]) for i in range(len(tokens) - n + 1))
+            for gram in grams:
+                column = vocabulary.get(gram)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+        return counts
+
+    def decision_function(self, texts: List[str]) -> np.ndarray:
+        scores = np.empty((len(texts), self.coef.shape[1]), dtype=np.float64)
+        for row, text in enumerate(texts):
+            counts = self._counts(text)
+            if not counts:
+                scores[row] = self.intercept
+                continue
+            columns = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+            values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            if self._binary:
+                values[:] = 1.0
+            elif self._sublinear_tf:
+                values = np.log(values) + 1.0
+            values *= self.idf[columns]
+            if self._l2_norm:
+                norm = math.sqrt(float(values @ values))
+                if norm:
+                    values /= norm
+            contributions = values @ self.coef[columns]
+            if self.coef_scale is not None:
+                contributions *= self.coef_scale
+            scores[row] = contributions + self.intercept
+        return scores
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        scores = self.decision_function(texts)
+        if not self._softmax:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Write the arrays to an uncompressed .npz (no pickled objects).
+        """
+        settings = {"format_version": FORMAT_VERSION, **self.settings}
+        optional: Dict[str, np.ndarray] = {}
+        if self.coef_scale is not None:
+            optional["coef_scale"] = self.coef_scale
+        if self.source_sha256 is not None:
+            optional["source_sha256"] = np.array(self.source_sha256)
+        with open(path, "wb") as handle:
+            np.savez(
+                handle,
+                **optional,
+                # newline-joined UTF-8 rather than a fixed-width unicode array,
+                # which would pad every term to 4 bytes x the longest term
+                terms=np.frombuffer("\n".join(self.terms).encode("utf-8"), dtype=np.uint8),
+                idf=self.idf,
+                coef=self.coef,
+                intercept=self.intercept,
+                classes=self.classes_.astype(str),
+                settings=np.array(json.dumps(settings)),
+            )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "CompiledModel":
+        with np.load(path, allow_pickle=False) as data:
+            settings = json.loads(str(data["settings"]))
+            if settings.pop("format_version", None) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported compiled model format in {path}")
+            settings["ngram_range"] = tuple(settings["ngram_range"])
+            return cls(
+                terms=data["terms"].tobytes().decode("utf-8").split("\n"),
+                idf=data["idf"],
+                coef=data["coef"],
+                intercept=data["intercept"],
+                classes=data["classes"],
+                settings=settings,
+                coef_scale=data["coef_scale"] if "coef_scale" in data.files else None,
+                source_sha256=str(data["source_sha256"]) if "source_sha256" in data.files else None,
+            )
+
+
+def read_source_sha256(path: Union[str, Path]) -> Optional[str]:
+    """
+    The source pickle hash recorded in a compiled file, without loading
+    the arrays (None for files exported without one).
+    """
+    with np.load(path, allow_pickle=False) as data:
+        return str(data["source_sha256"]) if "source_sha256" in data.files else None
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Name must match the name you put in Supervisor's registry.py
@@ -14,9 +15,142 @@ DATA_DIR = BASE_DIR / "data"
 MODEL_DIR = DATA_DIR / "models"
 MODEL_PATH = MODEL_DIR / "email_priority_model.pkl"
 
+# Versioned model registry (see learning/model_store.py): one directory per
+# trained version plus a CURRENT file naming the active one. MODEL_PATH is
+# only used while the registry has no active version.
+MODEL_REGISTRY_DIR = Path(
+    os.environ.get("EMAIL_AGENT_MODEL_REGISTRY_DIR", str(MODEL_DIR / "registry"))
+)
+
+# How often (seconds) a worker checks whether the active model version
+# changed; a new version is loaded in the background and swapped in
+# without a restart. 0 = never (restart or POST /admin/reload_model).
+MODEL_RELOAD_INTERVAL_SECONDS = float(
+    os.environ.get("EMAIL_AGENT_MODEL_RELOAD_INTERVAL_SECONDS", "5")
+)
+
+# Token for the /admin/* endpoints (sent as X-Admin-Token); unset = disabled
+ADMIN_TOKEN = os.environ.get("EMAIL_AGENT_ADMIN_TOKEN") or None
+
+# Serve the compiled form of a model (model.npz next to model.pkl, see
+# compiled_model.py) when there is one: same probabilities, no sklearn
+# import and no unpickling. 0 = always serve the sklearn pipeline.
+USE_COMPILED_MODEL = os.environ.get("EMAIL_AGENT_COMPILED_MODEL", "1") == "1"
+
+# joblib mmap_mode used when loading the model ("r" = read-only shared pages,
+# empty string = load arrays into private memory)
+MODEL_MMAP_MODE = os.environ.get("EMAIL_AGENT_MODEL_MMAP_MODE", "r") or None
+
 # Long-Term Memory (LTM) storage
 LTM_DIR = BASE_DIR / "ltm"
 LTM_INDEX_PATH = LTM_DIR / "ltm_index.json"
 LTM_RECORDS_DIR = LTM_DIR / "records"
+LTM_DB_PATH = Path(os.environ.get("EMAIL_AGENT_LTM_DB_PATH", str(LTM_DIR / "ltm.sqlite3")))
+LTM_SEGMENTS_DIR = Path(os.environ.get("EMAIL_AGENT_LTM_SEGMENTS_DIR", str(LTM_DIR / "segments")))
+
+# Which LTM backend ltm_store uses: "sqlite" (default), "segment" (append-only
+# log) or "json" (legacy layout)
+LTM_BACKEND = os.environ.get("EMAIL_AGENT_LTM_BACKEND", "sqlite")
+
+# "segment" backend: segment files are sealed once they reach this size, and
+# a background merge rewrites them once this fraction of their bytes is
+# superseded (0 = only merge through compaction)
+LTM_SEGMENT_MAX_BYTES = int(os.environ.get("EMAIL_AGENT_LTM_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+LTM_SEGMENT_MERGE_GARBAGE_RATIO = float(
+    os.environ.get("EMAIL_AGENT_LTM_SEGMENT_MERGE_GARBAGE_RATIO", "0.5")
+)
+# On a lookup miss, catch up with other workers' appends and merges at most
+# once per this many seconds (0 = on every miss). Own writes are seen at once.
+LTM_SEGMENT_REFRESH_INTERVAL_SECONDS = float(
+    os.environ.get("EMAIL_AGENT_LTM_SEGMENT_REFRESH_INTERVAL_SECONDS", "1")
+)
+
+# In-process front cache for LTM hits (per worker). 0 entries disables it,
+# a TTL of 0 means entries only leave the cache through LRU eviction.
+LTM_CACHE_MAX_ENTRIES = int(os.environ.get("EMAIL_AGENT_LTM_CACHE_MAX_ENTRIES", "1024"))
+LTM_CACHE_TTL_SECONDS = float(os.environ.get("EMAIL_AGENT_LTM_CACHE_TTL_SECONDS", "0"))
+
+# Also resolve LTM entries written with the old "<intent>:<raw text>" keys
+# (pre-hashing). Hits are re-stored under the new key on first use. Those
+# keys carry no model version, so they are only consulted while no registry
+# version is serving; off by default.
+LTM_LEGACY_KEY_FALLBACK = os.environ.get("EMAIL_AGENT_LTM_LEGACY_KEYS", "0") == "1"
+
+# LTM capacity limits (0 = unlimited). When exceeded, compaction evicts the
+# least recently ("lru") or least frequently ("lfu") used entries; entries
+# older than the max age are always dropped.
+LTM_MAX_ENTRIES = int(os.environ.get("EMAIL_AGENT_LTM_MAX_ENTRIES", "0"))
+LTM_MAX_BYTES = int(os.environ.get("EMAIL_AGENT_LTM_MAX_BYTES", "0"))
+LTM_MAX_AGE_SECONDS = float(os.environ.get("EMAIL_AGENT_LTM_MAX_AGE_SECONDS", "0"))
+LTM_EVICTION_POLICY = os.environ.get("EMAIL_AGENT_LTM_EVICTION_POLICY", "lru")
+
+# Record last access time / hit count on LTM reads. LRU/LFU eviction needs
+# it; it costs a small write per backend hit, so it is only on when a size
+# limit is set.
+LTM_TRACK_ACCESS = bool(LTM_MAX_ENTRIES or LTM_MAX_BYTES)
+
+# Run LTM compaction in a background thread every N seconds (0 = off; use
+# scripts/compact_ltm.py instead)
+LTM_COMPACTION_INTERVAL_SECONDS = float(
+    os.environ.get("EMAIL_AGENT_LTM_COMPACTION_INTERVAL_SECONDS", "0")
+)
+
+# Near-duplicate LTM tier: on an exact miss, reuse the result of a previously
+# classified email whose SimHash similarity is at least the threshold (same
+# intent, sender, metadata fields and model version). Off by default.
+LTM_NEAR_DUP_ENABLED = os.environ.get("EMAIL_AGENT_LTM_NEAR_DUP", "0") == "1"
+LTM_NEAR_DUP_THRESHOLD = float(os.environ.get("EMAIL_AGENT_LTM_NEAR_DUP_THRESHOLD", "0.875"))
+LTM_NEAR_DUP_DB_PATH = Path(
+    os.environ.get("EMAIL_AGENT_LTM_NEAR_DUP_DB_PATH", str(LTM_DIR / "ltm_near.sqlite3"))
+)
+
+# Maximum number of handshake requests accepted by POST /handle_batch
+MAX_BATCH_SIZE = int(os.environ.get("EMAIL_AGENT_MAX_BATCH_SIZE", "1000"))
+
+# Text normalization before the LTM key and the model (see
+# email_agent/text_normalization.py): "all", "none" or a comma-separated
+# subset of quotes,signature,urls,emails,ids,numbers,case,whitespace
+TEXT_NORMALIZATION = os.environ.get("EMAIL_AGENT_TEXT_NORMALIZATION", "all")
+
+# Send per-stage durations (parse, validate, ltm_lookup, classify, ltm_store,
+# summary, serialize) in a Server-Timing response header; used by
+# scripts/benchmark_requests.py. Off by default.
+SERVER_TIMING = os.environ.get("EMAIL_AGENT_SERVER_TIMING", "0") == "1"
+
+# GET /metrics: with several worker processes, each one writes its metrics
+# to <METRICS_DIR>/<pid>.json (at most every METRICS_FLUSH_SECONDS) and the
+# endpoint adds them up. Unset = each worker reports only its own numbers.
+# gunicorn.conf.py sets (and clears) a default directory.
+METRICS_DIR = (
+    Path(os.environ["EMAIL_AGENT_METRICS_DIR"]) if os.environ.get("EMAIL_AGENT_METRICS_DIR") else None
+)
+METRICS_FLUSH_SECONDS = float(os.environ.get("EMAIL_AGENT_METRICS_FLUSH_SECONDS", "1.0"))
+
+# Logging (see email_agent/utils/logging_utils.py):
+# - LOG_FORMAT: "json" (one object per line) or "text"
+# - LOG_SAMPLE_RATE: fraction of per-request lines (LTM hit/miss, request
+#   received) that are written; warnings and errors are never sampled
+# - LOG_PAYLOAD_CHARS: how much of an email body a log line may quote; 0 =
+#   only its length and a short hash
+# - LOG_QUEUE: hand records to a background thread instead of writing to
+#   stdout on the request path
+LOG_LEVEL = os.environ.get("EMAIL_AGENT_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("EMAIL_AGENT_LOG_FORMAT", "json")
+LOG_SAMPLE_RATE = float(os.environ.get("EMAIL_AGENT_LOG_SAMPLE_RATE", "0.01"))
+LOG_PAYLOAD_CHARS = int(os.environ.get("EMAIL_AGENT_LOG_PAYLOAD_CHARS", "0"))
+LOG_QUEUE = os.environ.get("EMAIL_AGENT_LOG_QUEUE", "1") == "1"
+LOG_QUEUE_SIZE = int(os.environ.get("EMAIL_AGENT_LOG_QUEUE_SIZE", "10000"))
+
+# Keyword signals: only match whole words ("fun" does not match "function")
+KEYWORD_WORD_BOUNDARY = os.environ.get("EMAIL_AGENT_KEYWORD_WORD_BOUNDARY", "0") == "1"
+
+# Worker warm-up at startup: "background" (default), "blocking" or "off"
+WARMUP_MODE = os.environ.get("EMAIL_AGENT_WARMUP", "background")
+
+# Async (ASGI) server: thread pools for LTM I/O and for model inference, and
+# whether the response may be sent before the LTM write-back has finished
+ASGI_IO_WORKERS = int(os.environ.get("EMAIL_AGENT_ASGI_IO_WORKERS", "8"))
+ASGI_INFERENCE_WORKERS = int(os.environ.get("EMAIL_AGENT_ASGI_INFERENCE_WORKERS", "2"))
+ASGI_DEFER_LTM_WRITES = os.environ.get("EMAIL_AGENT_ASGI_DEFER_LTM_WRITES", "1") == "1"
 
 # You can add other config flags here later (thresholds, etc.)
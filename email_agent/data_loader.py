@@ -1,16 +1,19 @@
 # Load synthetic_emails.csv, split train/test
 from pathlib import Path
-from typing import Tuple
-
-import pandas as pd
+from typing import TYPE_CHECKING, Iterator, Tuple
 
 from .config import DATA_DIR
 from .utils.logging_utils import get_logger
 
 logger = get_logger(__name__)
 
+# pandas takes longer to import than the whole serving path; only the
+# training side needs it, so it is imported when a dataset is loaded
+if TYPE_CHECKING:
+    import pandas as pd
+
 
-def load_email_dataset(filename: str = "synthetic_emails.csv") -> pd.DataFrame:
+def load_email_dataset(filename: str = "synthetic_emails.csv") -> "pd.DataFrame":
     """
     Load the synthetic email dataset from the data/ folder.
 
@@ -25,14 +28,35 @@ def load_email_dataset(filename: str = "synthetic_emails.csv") -> pd.DataFrame:
     if not path.exists():
         raise FileNotFoundError(f"Dataset not found at: {path}")
 
+    import pandas as pd
+
     logger.info("Loading email dataset from %s", path)
     df = pd.read_csv(path)
     return df
 
 
+def iter_email_dataset(
+    filename: str = "synthetic_emails.csv", chunksize: int = 10_000
+) -> Iterator["pd.DataFrame"]:
+    """
+    Stream the dataset in DataFrames of at most `chunksize` rows, so a file
+    of any size can be processed with bounded memory.
+    """
+    path: Path = DATA_DIR / filename
+    if not path.exists():
+        raise FileNotFoundError(f"Dataset not found at: {path}")
+
+    import pandas as pd
+
+    logger.info("Streaming email dataset from %s in chunks of %d rows", path, chunksize)
+    with pd.read_csv(path, chunksize=chunksize, usecols=["text", "priority"]) as reader:
+        for chunk in reader:
+            yield chunk
+
+
 def train_test_split(
-    df: pd.DataFrame, test_ratio: float = 0.2, random_state: int = 42
-) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    df: "pd.DataFrame", test_ratio: float = 0.2, random_state: int = 42
+) -> Tuple["pd.DataFrame", "pd.DataFrame"]:
     """
     Simple train/test split helper.
     """
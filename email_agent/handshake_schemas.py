@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
 
 
@@ -67,3 +67,31 @@ class AgentResponse(BaseModel):
     status: str
     output: Optional[Dict[str, Any]] = None
     error: Optional[Dict[str, Any]] = None
+
+
+class BatchRequest(BaseModel):
+    """
+    Envelope the Supervisor sends to POST /handle_batch.
+
+    - request_id: optional ID for the batch as a whole
+    - agent_name: target agent's name
+    - requests: list of ordinary handshake objects (same shape as /handle).
+      Items are validated one by one, so a bad item only fails itself.
+    """
+    request_id: Optional[str] = None
+    agent_name: Optional[str] = None
+    requests: List[Any]
+
+
+class BatchResponse(BaseModel):
+    """
+    JSON returned from POST /handle_batch.
+
+    - status: "success" if every item succeeded, "partial" if some failed,
+      "error" if all of them failed
+    - results: one AgentResponse per request, in the same order
+    """
+    request_id: Optional[str]
+    agent_name: str
+    status: str
+    results: List[AgentResponse]
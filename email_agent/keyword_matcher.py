@@ -0,0 +1,137 @@
+"""
+Compiled multi-pattern keyword matcher (Aho-Corasick) for explanation signals.
+
+All keyword groups (urgency words, sender/subject hints, ...) are compiled
+into one automaton, so a single linear pass over the text finds every group
+at once. The cost per character does not depend on how many keywords exist.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over several named keyword groups.
+
+    - Matching is case-insensitive (keywords and text are lowercased).
+    - With `word_boundary=True` a keyword only counts when it is not glued to
+      other letters/digits, e.g. "fun" no longer matches inside "function".
+    - scan() returns, per group, the matched keywords in the group's own
+      order, which keeps explanations stable regardless of where in the text
+      the words appear.
+    """
+
+    def __init__(self, groups: Dict[str, Sequence[str]], word_boundary: bool = False) -> None:
+        self.word_boundary = word_boundary
+        self.groups: Dict[str, List[str]] = {name: list(words) for name, words in groups.items()}
+
+        # Every distinct (lowercased) keyword gets one id shared by all groups
+        self._keywords: List[str] = []
+        keyword_ids: Dict[str, int] = {}
+        self._group_ids: Dict[str, List[Tuple[str, int]]] = {}
+        for name, words in self.groups.items():
+            entries = []
+            for word in words:
+                lowered = word.lower()
+                if not lowered:
+                    continue
+                if lowered not in keyword_ids:
+                    keyword_ids[lowered] = len(self._keywords)
+                    self._keywords.append(lowered)
+                entries.append((word, keyword_ids[lowered]))
+            self._group_ids[name] = entries
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._delta: List[Dict[str, int]] = [{}]
+        self._build()
+
+    def _build(self) -> None:
+        outputs: List[List[int]] = [[]]
+
+        # 1) Trie of all keywords
+        for keyword_id, keyword in enumerate(self._keywords):
+            node = 0
+            for ch in keyword:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append([])
+                node = nxt
+            outputs[node].append(keyword_id)
+
+        # 2) Failure links (BFS), merging outputs along the failure chain
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                outputs[child].extend(outputs[self._fail[child]])
+
+        self._out = [tuple(ids) for ids in outputs]
+
+        # 3) Fold failure links into the transitions (full DFA over the
+        #    keyword alphabet), so scanning is one dict lookup per character.
+        #    Characters outside the alphabet always lead back to the root.
+        alphabet = set("".join(self._keywords))
+        self._delta = [dict() for _ in self._goto]
+        self._delta[0] = {ch: self._goto[0].get(ch, 0) for ch in alphabet}
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            queue.extend(self._goto[node].values())
+            row = dict(self._delta[self._fail[node]])
+            row.update(self._goto[node])
+            self._delta[node] = {ch: nxt for ch, nxt in row.items() if nxt}
+
+    def _matched_ids(self, text: str) -> Set[int]:
+        """
+        One pass over `text`; returns the ids of all keywords found.
+        """
+        delta, out = self._delta, self._out
+        keywords, word_boundary = self._keywords, self.word_boundary
+        lower = text.lower()
+        matched: Set[int] = set()
+        node = 0
+
+        for position, ch in enumerate(lower):
+            node = delta[node].get(ch, 0)
+            if not out[node]:
+                continue
+            for keyword_id in out[node]:
+                if keyword_id in matched:
+                    continue
+                if word_boundary:
+                    start = position - len(keywords[keyword_id]) + 1
+                    if start > 0 and _is_word_char(lower[start - 1]):
+                        continue
+                    if position + 1 < len(lower) and _is_word_char(lower[position + 1]):
+                        continue
+                matched.add(keyword_id)
+
+        return matched
+
+    def scan(self, text: str, groups: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+        """
+        Find keywords of every requested group (default: all groups) in `text`.
+        """
+        matched = self._matched_ids(text or "")
+        names = list(groups) if groups is not None else list(self._group_ids)
+        return {
+            name: [word for word, keyword_id in self._group_ids[name] if keyword_id in matched]
+            for name in names
+        }
@@ -0,0 +1,182 @@
+"""
+Post-training compression of the compiled TF-IDF + LogisticRegression model.
+
+- Pruning keeps the `keep_ratio` share of terms with the largest absolute
+  coefficient (over all classes); the others are dropped from the
+  vocabulary, the IDF weights and the coefficients. Dropped terms also no
+  longer count towards the row's l2 norm, so pruning changes the remaining
+  weights slightly too.
+- Quantization stores the weights as float32, or the coefficients as int8
+  with one float32 scale per class (symmetric, max |coef| -> 127).
+
+The result is a CompiledModel, so it is registered with
+model_store.register_model / save_model like any model and served by
+classify_email unchanged. tradeoff_curve measures accuracy, agreement with
+the uncompressed model, artifact size and latency on the held-out split of
+data_loader.train_test_split (the one model_training evaluates on).
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..compiled_model import CompiledModel
+from ..data_loader import load_email_dataset, train_test_split
+from ..text_normalization import normalize_text
+from ..utils.logging_utils import get_logger
+from .hyperparameter_search import measure_latency_us
+from .model_export import compile_pipeline
+from .model_store import activate, active_model_file, load_model, register_model
+
+logger = get_logger(__name__)
+
+DTYPES = ("float64", "float32", "int8")
+DEFAULT_KEEP_RATIOS = (1.0, 0.5, 0.25, 0.1, 0.05)
+
+
+def prune(model: CompiledModel, keep_ratio: float) -> CompiledModel:
+    """
+    Keep the `keep_ratio` share (at least one) of terms with the largest
+    absolute coefficient, in their original column order.
+    """
+    if not 0.0 < keep_ratio <= 1.0:
+        raise ValueError(f"keep_ratio must be in (0, 1], got {keep_ratio}")
+    if model.coef_scale is not None:
+        raise ValueError("Prune before quantizing")
+    keep = max(1, int(round(keep_ratio * model.n_features)))
+    importance = np.abs(model.coef).max(axis=1)
+    kept = np.sort(np.argsort(-importance, kind="stable")[:keep])
+    return CompiledModel(
+        terms=[model.terms[column] for column in kept],
+        idf=model.idf[kept],
+        coef=model.coef[kept],
+        intercept=model.intercept,
+        classes=model.classes_,
+        settings=model.settings,
+    )
+
+
+def quantize(model: CompiledModel, dtype: str) -> CompiledModel:
+    """
+    Store the weights as float64 (unchanged), float32 or int8.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+    if model.coef_scale is not None:
+        raise ValueError("Model is already quantized")
+    if dtype == "float64":
+        return model
+
+    coef_scale = None
+    if dtype == "float32":
+        coef = model.coef.astype(np.float32)
+    else:
+        coef_scale = np.abs(model.coef).max(axis=0) / 127.0
+        coef_scale[coef_scale == 0.0] = 1.0
+        coef = np.clip(np.round(model.coef / coef_scale), -127, 127).astype(np.int8)
+        coef_scale = coef_scale.astype(np.float32)
+    return CompiledModel(
+        terms=model.terms,
+        idf=model.idf.astype(np.float32),
+        coef=coef,
+        intercept=model.intercept,
+        classes=model.classes_,
+        settings=model.settings,
+        coef_scale=coef_scale,
+    )
+
+
+def compress(model: CompiledModel, keep_ratio: float = 1.0, dtype: str = "float32") -> CompiledModel:
+    return quantize(prune(model, keep_ratio), dtype)
+
+
+def artifact_bytes(model: CompiledModel) -> int:
+    """
+    Size of the model's .npz file.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "model.npz"
+        model.save(path)
+        return path.stat().st_size
+
+
+def held_out_split(csv_filename: str = "synthetic_emails.csv") -> Tuple[List[str], List[str]]:
+    """
+    Normalized texts and labels of the test split model_training holds out.
+    """
+    _, test_df = train_test_split(load_email_dataset(csv_filename))
+    texts = [normalize_text(text) for text in test_df["text"].astype(str).tolist()]
+    return texts, test_df["priority"].astype(str).tolist()
+
+
+def tradeoff_curve(
+    model: CompiledModel,
+    texts: List[str],
+    labels: List[str],
+    keep_ratios: Sequence[float] = DEFAULT_KEEP_RATIOS,
+    dtypes: Sequence[str] = DTYPES,
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate every (keep_ratio, dtype) variant of an uncompressed model.
+
+    Each entry has keep_ratio, dtype, n_features, size_bytes, accuracy,
+    agreement (share of predictions equal to the uncompressed model's),
+    max_proba_diff and latency_us (median single-email predict_proba).
+    """
+    baseline_proba = model.predict_proba(texts)
+    baseline_labels = baseline_proba.argmax(axis=1)
+    truth = np.asarray(labels)
+    curve = []
+    for keep_ratio in keep_ratios:
+        for dtype in dtypes:
+            variant = compress(model, keep_ratio, dtype)
+            proba = variant.predict_proba(texts)
+            predicted = proba.argmax(axis=1)
+            curve.append(
+                {
+                    "keep_ratio": keep_ratio,
+                    "dtype": dtype,
+                    "n_features": variant.n_features,
+                    "size_bytes": artifact_bytes(variant),
+                    "accuracy": float(np.mean(variant.classes_[predicted] == truth)),
+                    "agreement": float(np.mean(predicted == baseline_labels)),
+                    "max_proba_diff": float(np.abs(proba - baseline_proba).max()),
+                    "latency_us": measure_latency_us(variant, texts),
+                }
+            )
+    return curve
+
+
+def compress_and_register(
+    keep_ratio: float,
+    dtype: str,
+    version: Optional[str] = None,
+    csv_filename: str = "synthetic_emails.csv",
+    make_active: bool = False,
+) -> str:
+    """
+    Compress a registered pipeline (default: the active one), register the
+    result as a new version with its held-out metrics, and optionally
+    activate it. Returns the new version.
+    """
+    model = compile_pipeline(load_model(version, mmap_mode=None))
+    source_version = version or active_model_file()[0]
+    texts, labels = held_out_split(csv_filename)
+    metrics = tradeoff_curve(model, texts, labels, keep_ratios=[keep_ratio], dtypes=[dtype])[0]
+    new_version = register_model(
+        compress(model, keep_ratio, dtype),
+        metrics={name: metrics[name] for name in ("accuracy", "agreement", "size_bytes", "latency_us")},
+        params={"trainer": "compression", "source_version": source_version, "keep_ratio": keep_ratio, "dtype": dtype},
+    )
+    logger.info(
+        "Registered compressed model %s (%d features, %s, accuracy %.4f)",
+        new_version,
+        metrics["n_features"],
+        dtype,
+        metrics["accuracy"],
+    )
+    if make_active:
+        activate(new_version)
+    return new_version
@@ -0,0 +1,117 @@
+"""
+Compile a trained TF-IDF + LogisticRegression pipeline into a CompiledModel
+(see email_agent/compiled_model.py) for sklearn-free serving.
+
+model_store.register_model calls compile_pipeline for every new version;
+export_compiled does the same for a pickle trained before that (e.g. the
+legacy MODEL_PATH) and checks that both give the same probabilities.
+"""
+
+from pathlib import Path
+from typing import Any, List, Optional, Union
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from ..compiled_model import CompiledModel
+from ..utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Max absolute difference in any class probability the compiled model may
+# show against the sklearn pipeline
+TOLERANCE = 1e-9
+
+
+def compile_pipeline(pipeline: Any) -> CompiledModel:
+    """
+    Extract the vocabulary, IDF weights and coefficients of a fitted
+    Pipeline(TfidfVectorizer, LogisticRegression).
+
+    Raises ValueError for any other model, or for vectorizer options the
+    compiled analyzer does not reproduce (custom analyzer/tokenizer/
+    preprocessor, stop words, accent stripping, l1 norm, tokens that
+    span lines).
+    """
+    if not isinstance(pipeline, Pipeline) or len(pipeline.steps) != 2:
+        raise ValueError(f"Cannot compile {type(pipeline).__name__}: expected a two-step Pipeline")
+    vectorizer, classifier = (step for _, step in pipeline.steps)
+    if not isinstance(vectorizer, TfidfVectorizer) or not isinstance(classifier, LogisticRegression):
+        raise ValueError(
+            f"Cannot compile {type(vectorizer).__name__} + {type(classifier).__name__}: "
+            "expected TfidfVectorizer + LogisticRegression"
+        )
+
+    unsupported = {
+        "analyzer": vectorizer.analyzer != "word",
+        "tokenizer": vectorizer.tokenizer is not None,
+        "preprocessor": vectorizer.preprocessor is not None,
+        "stop_words": vectorizer.stop_words is not None,
+        "strip_accents": vectorizer.strip_accents is not None,
+        "norm": vectorizer.norm not in ("l2", None),
+        # terms are stored newline-separated
+        "token_pattern": any("\n" in term for term in vectorizer.vocabulary_),
+        # one-vs-rest probabilities are not a softmax
+        "multi_class": len(classifier.classes_) > 2
+        and (getattr(classifier, "multi_class", None) == "ovr" or classifier.solver == "liblinear"),
+    }
+    rejected = [name for name, is_unsupported in unsupported.items() if is_unsupported]
+    if rejected:
+        raise ValueError(f"Cannot compile pipeline with custom {', '.join(rejected)}")
+
+    terms: List[str] = [""] * len(vectorizer.vocabulary_)
+    for term, column in vectorizer.vocabulary_.items():
+        terms[column] = term
+    idf = np.asarray(vectorizer.idf_, dtype=np.float64) if vectorizer.use_idf else np.ones(len(terms))
+
+    return CompiledModel(
+        terms=terms,
+        idf=idf,
+        coef=np.ascontiguousarray(classifier.coef_.T, dtype=np.float64),
+        intercept=np.asarray(classifier.intercept_, dtype=np.float64),
+        classes=[str(label) for label in classifier.classes_],
+        settings={
+            "lowercase": vectorizer.lowercase,
+            "token_pattern": vectorizer.token_pattern,
+            "ngram_range": tuple(vectorizer.ngram_range),
+            "sublinear_tf": vectorizer.sublinear_tf,
+            "binary": vectorizer.binary,
+            "norm": vectorizer.norm,
+            "output": "softmax" if len(classifier.classes_) > 2 else "sigmoid",
+        },
+    )
+
+
+def max_probability_difference(pipeline: Any, compiled: CompiledModel, texts: List[str]) -> float:
+    """
+    Largest absolute difference between the two models' class probabilities.
+    """
+    if list(compiled.classes_) != [str(label) for label in pipeline.classes_]:
+        raise ValueError("Compiled model has different classes than the pipeline")
+    return float(np.abs(pipeline.predict_proba(texts) - compiled.predict_proba(texts)).max())
+
+
+def export_compiled(
+    pipeline: Any,
+    path: Union[str, Path],
+    check_texts: Optional[List[str]] = None,
+    source_sha256: Optional[str] = None,
+) -> CompiledModel:
+    """
+    Compile `pipeline` and write it to `path` (.npz). With `check_texts`,
+    refuse to write unless it matches the pipeline within TOLERANCE.
+    `source_sha256` (the hash of the pipeline's pickle) is recorded in the
+    file; model_store only serves it while that pickle is unchanged.
+    """
+    compiled = compile_pipeline(pipeline)
+    compiled.source_sha256 = source_sha256
+    if check_texts:
+        difference = max_probability_difference(pipeline, compiled, check_texts)
+        if difference > TOLERANCE:
+            raise ValueError(f"Compiled model differs from the pipeline by {difference:.3g}")
+        logger.info("Compiled model matches the pipeline (max difference %.3g)", difference)
+    compiled.save(path)
+    logger.info("Wrote compiled model (%d features) to %s", compiled.n_features, path)
+    return compiled
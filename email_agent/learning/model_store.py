@@ -1,32 +1,297 @@
-# Save/load email_priority_model.pkl
-from typing import Any
+"""
+Versioned model registry.
 
-import joblib
+Every trained model is stored as its own version:
 
-from ..config import MODEL_PATH
+    <MODEL_REGISTRY_DIR>/
+        CURRENT                      # name of the active version
+        20250101-120000-3f2a9c1e/
+            model.pkl                # joblib dump (uncompressed, mmap-able)
+            model.npz                # compiled arrays, if the model is compilable
+            metadata.json            # version, created_at, metrics, params, sha256
+
+Versions are immutable once written (the directory is renamed into place),
+and activating one is an atomic rewrite of CURRENT, so serving workers can
+watch that one file and swap models without a restart (see
+priority_logic.check_for_new_model).
+
+Before the first version is registered, the legacy single file MODEL_PATH
+is served, with a content fingerprint ("pkl-<sha>") as its version.
+
+A compiled artifact (same name, .npz suffix; see model_export.py) is served
+instead of the pickle when it exists, was compiled from that very pickle
+(its recorded source sha256 matches) and USE_COMPILED_MODEL is on. Versions
+registered from a CompiledModel (e.g. compressed ones, see
+model_compression.py) have only the .npz, which is then always served.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .. import config
+from ..config import MODEL_MMAP_MODE
+from ..storage.file_utils import atomic_write_text
 from ..utils.logging_utils import get_logger
 
 logger = get_logger(__name__)
 
+CURRENT_FILE = "CURRENT"
+MODEL_FILE = "model.pkl"
+METADATA_FILE = "metadata.json"
+COMPILED_SUFFIX = ".npz"
+_VERSION_RE = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{8}$")
+
+
+def _registry_dir() -> Path:
+    return config.MODEL_REGISTRY_DIR
+
+
+def file_sha256(path: Path) -> str:
+    """
+    Hex sha256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_compiled(model: Any, path: Path, source_sha256: str) -> bool:
+    """
+    Compile `model` next to its pickle (whose hash is `source_sha256`);
+    False if it cannot be compiled (e.g. the streaming hashing + SGD
+    pipeline).
+    """
+    from .model_export import compile_pipeline
+
+    try:
+        compiled = compile_pipeline(model)
+    except ValueError as exc:
+        logger.info("Model not compiled: %s", exc)
+        return False
+    compiled.source_sha256 = source_sha256
+    compiled.save(path)
+    return True
+
+
+def register_model(
+    model: Any,
+    metrics: Optional[Dict[str, Any]] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Store `model` as a new version (not activated) and return its name.
+
+    A pipeline is pickled uncompressed on purpose: only then can
+    joblib.load(..., mmap_mode="r") map its numpy arrays read-only,
+    letting all gunicorn workers share one copy. A CompiledModel is stored
+    as its .npz only.
+    """
+    from ..compiled_model import CompiledModel
+
+    registry = _registry_dir()
+    registry.mkdir(parents=True, exist_ok=True)
+    created = datetime.now(timezone.utc)
+    staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=str(registry)))
+    pickle_file = staging / MODEL_FILE
+    compiled_file = pickle_file.with_suffix(COMPILED_SUFFIX)
+    try:
+        if isinstance(model, CompiledModel):
+            model.save(compiled_file)
+            compiled, sha256 = True, file_sha256(compiled_file)
+        else:
+            import joblib
+
+            joblib.dump(model, pickle_file, compress=0)
+            sha256 = file_sha256(pickle_file)
+            compiled = _write_compiled(model, compiled_file, sha256)
+        version = f"{created:%Y%m%d-%H%M%S}-{sha256[:8]}"
+        metadata = {
+            "version": version,
+            "created_at": created.isoformat(timespec="seconds"),
+            "sha256": sha256,
+            "model_type": type(model).__name__,
+            "compiled": compiled,
+            "metrics": metrics or {},
+            "params": params or {},
+        }
+        atomic_write_text(staging / METADATA_FILE, json.dumps(metadata, indent=2, default=str))
+        os.replace(staging, registry / version)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    logger.info("Registered model version %s in %s", version, registry)
+    return version
+
+
+def activate(version: str) -> None:
+    """
+    Make `version` the one served. Workers pick it up on their next check.
+    """
+    model_file = _registry_dir() / version / MODEL_FILE
+    if not (model_file.exists() or model_file.with_suffix(COMPILED_SUFFIX).exists()):
+        raise FileNotFoundError(f"Unknown model version: {version!r}")
+    atomic_write_text(_registry_dir() / CURRENT_FILE, version + "\n")
+    logger.info("Activated model version %s", version)
+
+
+def active_version() -> Optional[str]:
+    """
+    The version named by CURRENT, or None if nothing was activated yet.
+    """
+    try:
+        version = (_registry_dir() / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def list_versions() -> List[Dict[str, Any]]:
+    """
+    Metadata of every registered version, oldest first, with an "active" flag.
+    """
+    registry = _registry_dir()
+    if not registry.exists():
+        return []
+    current = active_version()
+    versions = []
+    for path in sorted(registry.iterdir()):
+        if path.is_dir() and (path / METADATA_FILE).exists():
+            metadata = read_metadata(path.name)
+            metadata["active"] = path.name == current
+            versions.append(metadata)
+    return versions
+
 
-def save_model(model: Any) -> None:
+def is_registry_version(version: str) -> bool:
     """
-    Save a trained model to disk.
+    True for registry version names ("<created>-<sha8>"), False for the
+    legacy MODEL_PATH fingerprint and the rule-based fallback.
     """
-    MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    logger.info("Saved model to %s", MODEL_PATH)
+    return bool(_VERSION_RE.match(version))
+
+
+def read_metadata(version: str) -> Dict[str, Any]:
+    return json.loads((_registry_dir() / version / METADATA_FILE).read_text(encoding="utf-8"))
+
+
+# (reader, path) -> ((mtime_ns, size), value), so that periodic reload
+# checks do not re-hash or re-open an unchanged file
+_FILE_CACHE: Dict[Tuple[str, str], Tuple[Tuple[int, int], Any]] = {}
+
+
+def _cached(reader: Callable[[Path], Any], path: Path) -> Any:
+    stat = path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = (reader.__name__, str(path))
+    entry = _FILE_CACHE.get(key)
+    if entry is None or entry[0] != signature:
+        entry = _FILE_CACHE[key] = (signature, reader(path))
+    return entry[1]
 
 
-def load_model() -> Any:
+def legacy_version() -> str:
     """
-    Load a trained model from disk.
+    Version identifier of the legacy MODEL_PATH file (its content hash).
+    """
+    return f"pkl-{_cached(file_sha256, config.MODEL_PATH)[:12]}"
+
+
+def servable_file(model_file: Path) -> Path:
+    """
+    The compiled artifact of a pickled model if there is one (and
+    USE_COMPILED_MODEL is on, or there is no pickle), else the pickle itself.
 
-    Raises FileNotFoundError if the model file does not exist.
+    Next to a pickle, the compiled file is only served if it records that
+    pickle's sha256: one left behind when the pickle was replaced (or
+    exported without a source hash) would serve a different model under the
+    pickle's version name.
     """
-    if not MODEL_PATH.exists():
-        raise FileNotFoundError(f"No model file found at {MODEL_PATH}")
+    compiled = model_file.with_suffix(COMPILED_SUFFIX)
+    if not compiled.exists():
+        return model_file
+    if not model_file.exists():
+        return compiled
+    if not config.USE_COMPILED_MODEL:
+        return model_file
+
+    from ..compiled_model import read_source_sha256
+
+    if _cached(read_source_sha256, compiled) != _cached(file_sha256, model_file):
+        logger.warning("Ignoring %s: not compiled from the current %s", compiled, model_file.name)
+        return model_file
+    return compiled
+
+
+def active_model_file() -> Optional[Tuple[str, Path]]:
+    """
+    (version, pickle) of the active model, ignoring any compiled artifact
+    (the pickle does not exist for a version registered as a CompiledModel).
+    """
+    version = active_version()
+    if version is not None:
+        return version, _registry_dir() / version / MODEL_FILE
+    if config.MODEL_PATH.exists():
+        return legacy_version(), config.MODEL_PATH
+    return None
+
+
+def resolve_active() -> Optional[Tuple[str, Path]]:
+    """
+    (version, file to load) that should be served: the registry's active
+    version, else the legacy MODEL_PATH, else None (rule-based fallback).
+    The compiled form of a version has the same version name.
+    """
+    resolved = active_model_file()
+    if resolved is None:
+        return None
+    version, model_file = resolved
+    return version, servable_file(model_file)
+
+
+def save_model(
+    model: Any,
+    metrics: Optional[Dict[str, Any]] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Register a trained model as a new version and activate it.
+    Returns the version name.
+    """
+    version = register_model(model, metrics=metrics, params=params)
+    activate(version)
+    return version
+
+
+def load_model(version: Optional[str] = None, mmap_mode: Optional[str] = MODEL_MMAP_MODE) -> Any:
+    """
+    Load a model version (default: the active one) from disk, always as the
+    sklearn pipeline (for training-side use; serving goes through
+    resolve_active).
+
+    Raises FileNotFoundError if there is no such version / no model at all,
+    or if the version was registered as a CompiledModel only.
+    """
+    import joblib
+
+    if version is None:
+        resolved = active_model_file()
+        if resolved is None:
+            raise FileNotFoundError(f"No active model in {_registry_dir()} and no file at {config.MODEL_PATH}")
+        version, path = resolved
+    else:
+        path = _registry_dir() / version / MODEL_FILE
+    if not path.exists():
+        raise FileNotFoundError(f"Model version {version!r} has no pickled pipeline")
 
-    model = joblib.load(MODEL_PATH)
-    logger.info("Loaded model from %s", MODEL_PATH)
+    model = joblib.load(path, mmap_mode=mmap_mode)
+    logger.info("Loaded model version %s from %s", version, path)
     return model
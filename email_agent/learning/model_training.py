@@ -1,40 +1,49 @@
 # Train scikit-learn model (offline script)
-from typing import Tuple
-
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.pipeline import Pipeline
-from sklearn.linear_model import LogisticRegression
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
 from ..data_loader import load_email_dataset, train_test_split
+from ..text_normalization import normalize_text
 from ..utils.logging_utils import get_logger
 from ..utils.evaluation_utils import evaluate_classifier
 from .model_store import save_model
 
 logger = get_logger(__name__)
 
+# sklearn is imported in build_pipeline, so that importing this module (e.g.
+# for build_pipeline's signature, or via learning/) stays cheap
+if TYPE_CHECKING:
+    from sklearn.pipeline import Pipeline
+
 
-def build_pipeline() -> Pipeline:
+def build_pipeline(params: Optional[Dict[str, Any]] = None) -> "Pipeline":
     """
     Build a simple scikit-learn pipeline for text classification.
 
     - TfidfVectorizer: converts text to numerical features
     - LogisticRegression: classifier
 
+    `params` overrides the defaults using pipeline names, e.g.
+    {"tfidf__ngram_range": (1, 1), "clf__C": 10.0} (see hyperparameter_search.py).
     You can change the model later (e.g., SVM, Naive Bayes, etc.).
     """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
     pipeline = Pipeline(
         steps=[
             ("tfidf", TfidfVectorizer(max_features=5000, ngram_range=(1, 2))),
             ("clf", LogisticRegression(max_iter=500)),
         ]
     )
+    if params:
+        pipeline.set_params(**params)
     return pipeline
 
 
 def train_and_evaluate(
     csv_filename: str = "synthetic_emails.csv",
-) -> Tuple[Pipeline, float]:
+) -> Tuple["Pipeline", float]:
     """
     Train the classifier on the synthetic dataset and evaluate accuracy.
 
@@ -47,10 +56,11 @@ def train_and_evaluate(
 
     train_df, test_df = train_test_split(df)
 
-    X_train = train_df["text"].tolist()
+    # Train on the same normalized text the agent classifies at runtime
+    X_train = [normalize_text(text) for text in train_df["text"].tolist()]
     y_train = train_df["priority"].tolist()
 
-    X_test = test_df["text"].tolist()
+    X_test = [normalize_text(text) for text in test_df["text"].tolist()]
     y_test = test_df["priority"].tolist()
 
     pipeline = build_pipeline()
@@ -61,8 +71,12 @@ def train_and_evaluate(
     accuracy = evaluate_classifier(pipeline, X_test, y_test)
     logger.info("Model accuracy on test set: %.4f", accuracy)
 
-    # Save the model for use at runtime
-    save_model(pipeline)
+    # Save the model for use at runtime (as a new, active registry version)
+    save_model(
+        pipeline,
+        metrics={"accuracy": accuracy, "train_examples": len(X_train), "test_examples": len(X_test)},
+        params={"trainer": "tfidf_logreg"},
+    )
 
     return pipeline, accuracy
 
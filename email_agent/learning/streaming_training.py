@@ -0,0 +1,163 @@
+"""
+Streaming alternative to model_training.train_and_evaluate for datasets
+that do not fit in memory.
+
+TfidfVectorizer has to see the whole corpus to learn its vocabulary and IDF
+weights. HashingVectorizer is stateless (a token's column is its hash), so
+every chunk is featurized on its own, and SGDClassifier with log loss learns
+one chunk at a time through partial_fit while still offering predict_proba
+for the confidence score. Peak memory depends on the chunk size and
+n_features, not on the size of the dataset.
+
+The held-out test set is picked by hashing each email's text, so the split
+is the same in every epoch and run without keeping it in memory.
+"""
+
+import sys
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from ..data_loader import iter_email_dataset
+from ..models import Priority
+from ..text_normalization import normalize_text
+from ..utils.logging_utils import get_logger
+from .model_store import save_model
+
+logger = get_logger(__name__)
+
+CLASSES = [priority.value for priority in Priority]
+
+
+def build_streaming_pipeline(n_features: int = 2**18, random_state: int = 42) -> Pipeline:
+    """
+    Hashing featurizer (word 1-2 grams, l2-normalized like TF-IDF rows)
+    followed by a logistic-loss SGD classifier.
+    """
+    return Pipeline(
+        steps=[
+            (
+                "hashing",
+                HashingVectorizer(n_features=n_features, ngram_range=(1, 2), alternate_sign=False),
+            ),
+            ("clf", SGDClassifier(loss="log_loss", alpha=1e-5, random_state=random_state)),
+        ]
+    )
+
+
+def _is_test(text: str, test_ratio: float) -> bool:
+    return zlib.crc32(text.encode("utf-8")) % 10_000 < test_ratio * 10_000
+
+
+def _split_chunk(chunk: Any, test_ratio: float) -> Tuple[List[str], List[str], List[str], List[str]]:
+    """
+    Normalize a chunk's texts and split it into (train_X, train_y, test_X, test_y).
+    """
+    train_X: List[str] = []
+    train_y: List[str] = []
+    test_X: List[str] = []
+    test_y: List[str] = []
+    for text, label in zip(chunk["text"].astype(str), chunk["priority"].astype(str)):
+        label = label.strip().lower()
+        if label not in CLASSES:
+            raise ValueError(f"Unknown priority label {label!r}; expected one of {CLASSES}.")
+        if _is_test(text, test_ratio):
+            test_X.append(normalize_text(text))
+            test_y.append(label)
+        else:
+            train_X.append(normalize_text(text))
+            train_y.append(label)
+    return train_X, train_y, test_X, test_y
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process so far, in MB (None on Windows).
+    """
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def train_streaming(
+    csv_filename: str = "synthetic_emails.csv",
+    chunksize: int = 10_000,
+    epochs: int = 5,
+    test_ratio: float = 0.2,
+    n_features: int = 2**18,
+    random_state: int = 42,
+    save: bool = True,
+) -> Tuple[Pipeline, float, Dict[str, Any]]:
+    """
+    Train the streaming pipeline chunk by chunk and evaluate it on the
+    held-out emails (a second streamed pass).
+
+    Returns:
+        (trained_pipeline, accuracy, stats) where stats holds the number of
+        documents trained on, the training throughput (docs/sec) and the
+        peak RSS of the process.
+    """
+    pipeline = build_streaming_pipeline(n_features=n_features, random_state=random_state)
+    vectorizer = pipeline.named_steps["hashing"]
+    classifier = pipeline.named_steps["clf"]
+
+    trained = 0
+    started = time.perf_counter()
+    for epoch in range(epochs):
+        for number, chunk in enumerate(iter_email_dataset(csv_filename, chunksize)):
+            # Shuffle within the chunk; a different order every epoch
+            chunk = chunk.sample(frac=1.0, random_state=random_state + epoch * 100_003 + number)
+            train_X, train_y, _, _ = _split_chunk(chunk, test_ratio)
+            if train_X:
+                classifier.partial_fit(vectorizer.transform(train_X), train_y, classes=CLASSES)
+                trained += len(train_X)
+        logger.info("Epoch %d/%d done (%d documents so far)", epoch + 1, epochs, trained)
+    train_seconds = time.perf_counter() - started
+    if trained == 0:
+        raise ValueError("No training examples found in the dataset.")
+
+    correct = 0
+    confusion: Counter = Counter()
+    for chunk in iter_email_dataset(csv_filename, chunksize):
+        _, _, test_X, test_y = _split_chunk(chunk, test_ratio)
+        if test_X:
+            for truth, predicted in zip(test_y, pipeline.predict(test_X)):
+                confusion[(truth, predicted)] += 1
+                correct += truth == predicted
+    tested = sum(confusion.values())
+    accuracy = correct / tested if tested else 0.0
+
+    stats = {
+        "documents_trained": trained,
+        "documents_tested": tested,
+        "epochs": epochs,
+        "train_seconds": round(train_seconds, 3),
+        "docs_per_sec": round(trained / train_seconds, 1) if train_seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "confusion": {f"{truth}->{predicted}": count for (truth, predicted), count in sorted(confusion.items())},
+    }
+    logger.info(
+        "Streaming training: %d docs in %.2fs (%.0f docs/sec), test accuracy %.4f, peak RSS %s MB",
+        trained,
+        train_seconds,
+        stats["docs_per_sec"] or 0.0,
+        accuracy,
+        stats["peak_rss_mb"],
+    )
+
+    if save:
+        save_model(
+            pipeline,
+            metrics={"accuracy": accuracy, **{k: v for k, v in stats.items() if k != "confusion"}},
+            params={"trainer": "streaming_sgd", "n_features": n_features, "chunksize": chunksize},
+        )
+    return pipeline, accuracy, stats
@@ -1,48 +1,172 @@
+"""
+Long-Term Memory (LTM) facade used by app.py.
+
+The public API is just `lookup(task_key)` and `store(task_key, result)`.
+The actual storage lives in a pluggable backend (see email_agent/storage),
+selected by `config.LTM_BACKEND`. Hits are additionally kept in a bounded
+in-process LRU/TTL cache so hot duplicates never touch the filesystem.
+
+Task keys are fixed-size digests (see `build_task_key`), so the size of an
+index entry does not depend on how long the email is.
+
+Capacity limits from config are enforced by `compact()`, either from
+scripts/compact_ltm.py or periodically by `start_background_compaction()`.
+
+With `LTM_NEAR_DUP_ENABLED`, a second tier answers exact misses with the
+result of a near-identical email (`lookup_near`), using SimHash
+signatures kept in their own index next to the backend. `tier_stats()`
+reports the exact / near hit rates of this worker.
+"""
+
 import hashlib
 import json
-from pathlib import Path
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, List, Tuple
 
-from .config import LTM_DIR, LTM_INDEX_PATH, LTM_RECORDS_DIR
+from .config import (
+    LTM_BACKEND,
+    LTM_CACHE_MAX_ENTRIES,
+    LTM_CACHE_TTL_SECONDS,
+    LTM_COMPACTION_INTERVAL_SECONDS,
+    LTM_EVICTION_POLICY,
+    LTM_LEGACY_KEY_FALLBACK,
+    LTM_MAX_AGE_SECONDS,
+    LTM_MAX_BYTES,
+    LTM_MAX_ENTRIES,
+    LTM_NEAR_DUP_ENABLED,
+    LTM_NEAR_DUP_THRESHOLD,
+)
+from .metrics import LTM_LOOKUPS
+from .simhash import simhash
+from .storage import LTMBackend, create_backend
+from .storage.front_cache import LRUTTLCache
+from .storage.simhash_index import SimHashIndex
 from .utils.logging_utils import get_logger
 
 logger = get_logger(__name__)
 
+_BACKEND: Optional[LTMBackend] = None
+_FRONT_CACHE = LRUTTLCache(
+    max_entries=LTM_CACHE_MAX_ENTRIES,
+    ttl_seconds=LTM_CACHE_TTL_SECONDS,
+)
+
+_NEAR_INDEX: Optional[SimHashIndex] = None
+
+_TIER_LOCK = threading.Lock()
+_TIER_STATS = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+
+_COMPACTION_STOP = threading.Event()
+_COMPACTION_THREAD: Optional[threading.Thread] = None
+
+TASK_KEY_VERSION = "v2"
+
+# Metadata fields whose values influence the classification result
+KEY_METADATA_FIELDS = ("sender", "subject")
+
+
+def build_task_key(
+    intent: str,
+    text: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    model_version: str = "",
+    normalization: str = "",
+) -> str:
+    """
+    Build the canonical, fixed-size LTM key for a request.
+
+    The digest covers everything that can change the stored result:
+    - the intent and the email text (already normalized by the caller)
+    - the sender/subject values (used for metadata signals)
+    - the set of metadata field names (echoed back as "metadata_used")
+    - the model version that produced the result
+    - the normalization settings the text went through, if any
+
+    Returns a string like "v2:<64 hex chars>".
+    """
+    metadata = metadata or {}
+    parts: List[Any] = [
+        intent,
+        text,
+        {field: str(metadata.get(field, "")) for field in KEY_METADATA_FIELDS},
+        sorted(metadata.keys()),
+        model_version,
+    ]
+    if normalization:
+        parts.append(normalization)
+    canonical = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return f"{TASK_KEY_VERSION}:{digest}"
+
+
+def legacy_task_key(intent: str, text: str) -> str:
+    """
+    Key format used before hashed keys: the intent followed by the raw text.
+    """
+    return f"{intent}:{text}"
+
+
+def build_near_scope(
+    intent: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    model_version: str = "",
+) -> str:
+    """
+    Everything that must match exactly for a near-duplicate hit: the intent,
+    the sender, the set of metadata field names and the model version.
+    The text and subject are compared by similarity instead.
+    """
+    metadata = metadata or {}
+    canonical = json.dumps(
+        [intent, str(metadata.get("sender", "")), sorted(metadata.keys()), model_version],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
 
-def _ensure_dirs() -> None:
+def near_signature(text: str, metadata: Optional[Dict[str, Any]] = None) -> int:
     """
-    Ensure LTM directories and index file exist.
-    Safe to call multiple times.
+    SimHash over the subject and body of an email.
     """
-    LTM_DIR.mkdir(parents=True, exist_ok=True)
-    LTM_RECORDS_DIR.mkdir(parents=True, exist_ok=True)
-    if not LTM_INDEX_PATH.exists():
-        LTM_INDEX_PATH.write_text("{}", encoding="utf-8")
+    subject = str((metadata or {}).get("subject", ""))
+    return simhash(f"{subject}\n{text}")
 
 
-def _load_index() -> Dict[str, str]:
-    _ensure_dirs()
-    try:
-        text = LTM_INDEX_PATH.read_text(encoding="utf-8")
-        return json.loads(text)
-    except Exception:
-        logger.exception("Failed to read LTM index file; resetting to empty.")
-        return {}
+def get_backend() -> LTMBackend:
+    """
+    Return the process-wide LTM backend, creating it on first use.
+    """
+    global _BACKEND
+    if _BACKEND is None:
+        _BACKEND = create_backend(LTM_BACKEND)
+    return _BACKEND
 
 
-def _save_index(index: Dict[str, str]) -> None:
-    try:
-        LTM_INDEX_PATH.write_text(json.dumps(index), encoding="utf-8")
-    except Exception:
-        logger.exception("Failed to write LTM index file.")
+def set_backend(backend: Optional[LTMBackend]) -> None:
+    """
+    Replace the active backend (used by tests and tools).
+    Passing None makes the next call re-create the configured default.
+    """
+    global _BACKEND
+    if _BACKEND is not None and _BACKEND is not backend:
+        _BACKEND.close()
+    _BACKEND = backend
+    _FRONT_CACHE.clear()
 
 
-def _key_to_filename(task_key: str) -> str:
+def get_front_cache() -> LRUTTLCache:
     """
-    Convert a task key to a stable filename using a hash.
+    Return this worker's in-process LTM front cache.
     """
-    digest = hashlib.sha256(task_key.encode("utf-8")).hexdigest()
-    return f"{digest}.json"
+    return _FRONT_CACHE
+
+
+def cache_stats() -> Dict[str, Any]:
+    """
+    Hit/miss/eviction counters of this worker's front cache.
+    """
+    return _FRONT_CACHE.stats()
 
 
 def lookup(task_key: str) -> Optional[Dict[str, Any]]:
@@ -53,21 +177,15 @@ def lookup(task_key: str) -> Optional[Dict[str, Any]]:
         - dict with cached "output" payload if found
         - None if not found or on error
     """
-    index = _load_index()
-    filename = index.get(task_key)
-    if not filename:
-        return None
-
-    record_path: Path = LTM_RECORDS_DIR / filename
-    if not record_path.exists():
-        return None
+    if _FRONT_CACHE.enabled:
+        cached = _FRONT_CACHE.get(task_key)
+        if cached is not None:
+            return cached
 
-    try:
-        text = record_path.read_text(encoding="utf-8")
-        return json.loads(text)
-    except Exception:
-        logger.exception("Failed to read LTM record: %s", record_path)
-        return None
+    result = get_backend().lookup(task_key)
+    if result is not None:
+        _FRONT_CACHE.put(task_key, result)
+    return result
 
 
 def store(task_key: str, result: Dict[str, Any]) -> None:
@@ -77,13 +195,245 @@ def store(task_key: str, result: Dict[str, Any]) -> None:
     Failures are logged but do not raise exceptions,
     so the main agent flow can continue.
     """
-    index = _load_index()
-    filename = index.get(task_key) or _key_to_filename(task_key)
-    record_path: Path = LTM_RECORDS_DIR / filename
+    _FRONT_CACHE.invalidate(task_key)
+    get_backend().store(task_key, result)
+
 
-    try:
-        record_path.write_text(json.dumps(result), encoding="utf-8")
-        index[task_key] = filename
-        _save_index(index)
-    except Exception:
-        logger.exception("Failed to write LTM record: %s", record_path)
+def lookup_with_fallback(task_key: str, legacy_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Look up `task_key`, falling back to an old-format key if configured.
+
+    A hit on the legacy key is copied under the new key, so later lookups
+    for the same request go straight to the hashed entry.
+    """
+    result = lookup(task_key)
+    if result is not None or not legacy_key or not LTM_LEGACY_KEY_FALLBACK:
+        return result
+
+    result = get_backend().lookup(legacy_key)
+    if result is not None:
+        store(task_key, result)
+    return result
+
+
+def lookup_many(task_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Bulk version of lookup(): front cache first, then a single backend call
+    for everything that was not cached. Returns only the keys that were found.
+    """
+    found: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for task_key in dict.fromkeys(task_keys):
+        cached = _FRONT_CACHE.get(task_key) if _FRONT_CACHE.enabled else None
+        if cached is not None:
+            found[task_key] = cached
+        else:
+            missing.append(task_key)
+
+    if missing:
+        for task_key, result in get_backend().lookup_many(missing).items():
+            _FRONT_CACHE.put(task_key, result)
+            found[task_key] = result
+    return found
+
+
+def lookup_many_with_fallback(keys: List[Tuple[str, Optional[str]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Bulk version of lookup_with_fallback() for (task_key, legacy_key) pairs.
+    Returns results keyed by the new task_key.
+    """
+    found = lookup_many([task_key for task_key, _ in keys])
+    if not LTM_LEGACY_KEY_FALLBACK:
+        return found
+
+    pending = {
+        legacy_key: task_key
+        for task_key, legacy_key in keys
+        if legacy_key and task_key not in found
+    }
+    if not pending:
+        return found
+
+    promoted: List[Tuple[str, Dict[str, Any]]] = []
+    for legacy_key, result in get_backend().lookup_many(list(pending)).items():
+        found[pending[legacy_key]] = result
+        promoted.append((pending[legacy_key], result))
+    store_many(promoted)
+    return found
+
+
+def store_many(items: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """
+    Store several (task_key, result) pairs in one backend transaction.
+    Failures are logged but do not raise exceptions.
+    """
+    if not items:
+        return
+    for task_key, _ in items:
+        _FRONT_CACHE.invalidate(task_key)
+    get_backend().store_many(items)
+
+
+def compact(
+    max_entries: int = LTM_MAX_ENTRIES,
+    max_bytes: int = LTM_MAX_BYTES,
+    max_age_seconds: float = LTM_MAX_AGE_SECONDS,
+    policy: str = LTM_EVICTION_POLICY,
+    vacuum: bool = False,
+) -> Dict[str, Any]:
+    """
+    Enforce the LTM capacity limits on the active backend and reclaim space.
+    Returns the backend's compaction report.
+
+    Evicted entries may still be served from other workers' front caches
+    until they age out there.
+    """
+    report = get_backend().compact(
+        max_entries=max_entries,
+        max_bytes=max_bytes,
+        max_age_seconds=max_age_seconds,
+        policy=policy,
+        vacuum=vacuum,
+    )
+    if report["expired"] or report["evicted"]:
+        _FRONT_CACHE.clear()
+    logger.info(
+        "LTM compaction: %d expired, %d evicted, %d orphans removed, %d bytes reclaimed",
+        report["expired"],
+        report["evicted"],
+        report["orphans_removed"],
+        report["bytes_reclaimed"],
+    )
+    return report
+
+
+def _compaction_loop(interval: float) -> None:
+    while not _COMPACTION_STOP.wait(interval):
+        try:
+            compact()
+        except Exception:
+            logger.exception("Background LTM compaction failed")
+
+
+def start_background_compaction(
+    interval: float = LTM_COMPACTION_INTERVAL_SECONDS,
+) -> Optional[threading.Thread]:
+    """
+    Run compact() every `interval` seconds in a daemon thread (0 = off).
+    Calling it again while the thread is running does nothing.
+    """
+    global _COMPACTION_THREAD
+    if interval <= 0:
+        return None
+    if _COMPACTION_THREAD is not None and _COMPACTION_THREAD.is_alive():
+        return _COMPACTION_THREAD
+    _COMPACTION_STOP.clear()
+    _COMPACTION_THREAD = threading.Thread(
+        target=_compaction_loop, args=(interval,), name="ltm-compaction", daemon=True
+    )
+    _COMPACTION_THREAD.start()
+    return _COMPACTION_THREAD
+
+
+def stop_background_compaction() -> None:
+    """
+    Stop the background compaction thread, if any, and wait for it.
+    """
+    global _COMPACTION_THREAD
+    _COMPACTION_STOP.set()
+    if _COMPACTION_THREAD is not None:
+        _COMPACTION_THREAD.join()
+        _COMPACTION_THREAD = None
+
+
+def get_near_index() -> Optional[SimHashIndex]:
+    """
+    Return the near-duplicate signature index, or None if the tier is off.
+    """
+    global _NEAR_INDEX
+    if _NEAR_INDEX is None and LTM_NEAR_DUP_ENABLED:
+        _NEAR_INDEX = SimHashIndex()
+    return _NEAR_INDEX
+
+
+def set_near_index(index: Optional[SimHashIndex]) -> None:
+    """
+    Replace the near-duplicate index (used by tests and tools).
+    Passing an index turns the tier on regardless of config.
+    """
+    global _NEAR_INDEX
+    if _NEAR_INDEX is not None and _NEAR_INDEX is not index:
+        _NEAR_INDEX.close()
+    _NEAR_INDEX = index
+
+
+def lookup_near(
+    intent: str,
+    text: str,
+    metadata: Optional[Dict[str, Any]] = None,
+    model_version: str = "",
+    threshold: float = LTM_NEAR_DUP_THRESHOLD,
+) -> Optional[Tuple[str, float, Dict[str, Any]]]:
+    """
+    Near-duplicate tier: find a stored result for an email at least
+    `threshold` similar to this one (same scope, see build_near_scope).
+
+    Returns (matched_task_key, similarity, result), or None on a miss or
+    when the tier is off. Signatures whose LTM entry has been evicted are
+    dropped on the way.
+    """
+    index = get_near_index()
+    if index is None:
+        return None
+    scope = build_near_scope(intent, metadata, model_version)
+    for matched_key, score in index.candidates(scope, near_signature(text, metadata), threshold):
+        result = lookup(matched_key)
+        if result is not None:
+            return matched_key, score, result
+        index.remove(matched_key)
+    return None
+
+
+def store_signatures(
+    items: List[Tuple[str, str, str, Optional[Dict[str, Any]], str]],
+) -> None:
+    """
+    Record near-duplicate signatures for freshly classified emails, given
+    as (task_key, intent, text, metadata, model_version). No-op when the
+    tier is off; failures are logged but do not raise exceptions.
+    """
+    index = get_near_index()
+    if index is None or not items:
+        return
+    index.add_many(
+        [
+            (task_key, build_near_scope(intent, metadata, model_version), near_signature(text, metadata))
+            for task_key, intent, text, metadata, model_version in items
+        ]
+    )
+
+
+def record_tier(tier: str, count: int = 1) -> None:
+    """
+    Count how a request was answered: "exact", "near" or "miss".
+    """
+    if not count:
+        return
+    field = "misses" if tier == "miss" else f"{tier}_hits"
+    with _TIER_LOCK:
+        _TIER_STATS[field] += count
+    LTM_LOOKUPS.inc(count, tier=tier)
+
+
+def tier_stats() -> Dict[str, Any]:
+    """
+    Exact / near-duplicate hit counts and rates for this worker.
+    """
+    with _TIER_LOCK:
+        stats: Dict[str, Any] = dict(_TIER_STATS)
+    lookups = stats["exact_hits"] + stats["near_hits"] + stats["misses"]
+    stats["lookups"] = lookups
+    stats["exact_hit_rate"] = stats["exact_hits"] / lookups if lookups else 0.0
+    stats["near_hit_rate"] = stats["near_hits"] / lookups if lookups else 0.0
+    stats["hit_rate"] = stats["exact_hit_rate"] + stats["near_hit_rate"]
+    return stats
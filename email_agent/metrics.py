@@ -0,0 +1,310 @@
+"""
+Process metrics exported in the Prometheus text format by GET /metrics.
+
+Counters and histograms live in memory and updating them only takes a lock,
+so the hooks are cheap enough for the request path.
+
+With several worker processes (gunicorn, uvicorn --workers) each worker only
+sees its own numbers. When `config.METRICS_DIR` is set, every process writes
+a snapshot of its metrics to `<METRICS_DIR>/<pid>.json` (atomically, at most
+every METRICS_FLUSH_SECONDS and at exit), and /metrics adds up the snapshots
+of all processes, so whichever worker answers the scrape reports the totals.
+Snapshots of workers that exited are kept, so counters never go backwards;
+clear the directory when the server (re)starts (gunicorn.conf.py does).
+"""
+
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import METRICS_DIR, METRICS_FLUSH_SECONDS
+from .storage.file_utils import atomic_write_text
+from .utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Request and stage latencies, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_LOCK = threading.Lock()
+_DIRTY = threading.Event()
+_FLUSHER: Optional[threading.Thread] = None
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(self.labelnames, labels)
+        with _LOCK:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        _mark_dirty()
+
+    def value(self, **labels: str) -> float:
+        with _LOCK:
+            return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def _snapshot(self) -> List[Any]:
+        return [[list(key), value] for key, value in self._values.items()]
+
+    def _reset(self) -> None:
+        self._values = {}
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets and optional labels.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: non-cumulative count per bucket (last one is +Inf), and the sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(self.labelnames, labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with _LOCK:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[position] += 1
+            self._sums[key] += value
+        _mark_dirty()
+
+    def count(self, **labels: str) -> int:
+        with _LOCK:
+            return sum(self._counts.get(_label_key(self.labelnames, labels), ()))
+
+    def _snapshot(self) -> List[Any]:
+        return [[list(key), list(counts), self._sums[key]] for key, counts in self._counts.items()]
+
+    def _reset(self) -> None:
+        self._counts = {}
+        self._sums = {}
+
+
+REQUEST_DURATION = Histogram(
+    "email_agent_request_duration_seconds",
+    "Time to handle a request, by endpoint.",
+    ("endpoint",),
+)
+STAGE_DURATION = Histogram(
+    "email_agent_stage_duration_seconds",
+    "Time spent in each stage of a request "
+    "(parse, validate, ltm_lookup, classify, ltm_store, summary, serialize).",
+    ("endpoint", "stage"),
+)
+REQUESTS = Counter(
+    "email_agent_requests_total",
+    "Requests handled, by endpoint and HTTP status.",
+    ("endpoint", "status"),
+)
+LTM_LOOKUPS = Counter(
+    "email_agent_ltm_lookups_total",
+    "LTM lookups by the tier that answered (exact, near) or miss.",
+    ("tier",),
+)
+CLASSIFICATIONS = Counter(
+    "email_agent_classifications_total",
+    "Emails classified, by method (ml or rule_based); includes one warm-up inference per process.",
+    ("method",),
+)
+MODEL_ERRORS = Counter(
+    "email_agent_model_errors_total",
+    "Model failures (load or predict) that fell back to the rules.",
+    ("stage",),
+)
+
+METRICS = (REQUEST_DURATION, STAGE_DURATION, REQUESTS, LTM_LOOKUPS, CLASSIFICATIONS, MODEL_ERRORS)
+
+
+def observe_request(endpoint: str, status: int, duration_ms: float, stages: Dict[str, float]) -> None:
+    """
+    Record one finished request: its total duration and each stage's.
+    """
+    REQUESTS.inc(endpoint=endpoint, status=str(status))
+    REQUEST_DURATION.observe(duration_ms / 1000.0, endpoint=endpoint)
+    for stage, stage_ms in stages.items():
+        STAGE_DURATION.observe(stage_ms / 1000.0, endpoint=endpoint, stage=stage)
+
+
+def reset() -> None:
+    """
+    Zero every metric in this process.
+    """
+    with _LOCK:
+        for metric in METRICS:
+            metric._reset()
+    _mark_dirty()
+
+
+# ---- cross-process aggregation ----------------------------------------------
+
+
+def _mark_dirty() -> None:
+    if METRICS_DIR is None:
+        return
+    _DIRTY.set()
+    if _FLUSHER is None:
+        _start_flusher()
+
+
+def _start_flusher() -> None:
+    global _FLUSHER
+    with _LOCK:
+        if _FLUSHER is not None:
+            return
+        _FLUSHER = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+        _FLUSHER.start()
+
+
+def _flush_loop() -> None:
+    while True:
+        _DIRTY.wait()
+        flush()
+        time.sleep(METRICS_FLUSH_SECONDS)
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    This process's metrics as a JSON-serializable dict.
+    """
+    with _LOCK:
+        return {metric.name: metric._snapshot() for metric in METRICS}
+
+
+def flush() -> None:
+    """
+    Write this process's snapshot to METRICS_DIR (no-op when unset). Never raises.
+    """
+    if METRICS_DIR is None:
+        return
+    _DIRTY.clear()
+    try:
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(METRICS_DIR / f"{os.getpid()}.json", json.dumps(snapshot()), fsync=False)
+    except Exception:
+        logger.exception("Failed to write metrics snapshot to %s", METRICS_DIR)
+
+
+def _read_snapshots(directory: Path) -> List[Dict[str, Any]]:
+    snapshots = []
+    for path in sorted(directory.glob("*.json")):
+        try:
+            snapshots.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            # Removed or replaced while reading; its numbers come next scrape
+            continue
+    return snapshots
+
+
+def _merge(snapshots: List[Dict[str, Any]]) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+    merged: Dict[str, Dict[Tuple[str, ...], Any]] = {metric.name: {} for metric in METRICS}
+    for data in snapshots:
+        for metric in METRICS:
+            target = merged[metric.name]
+            for sample in data.get(metric.name, ()):
+                key = tuple(sample[0])
+                if metric.kind == "counter":
+                    target[key] = target.get(key, 0.0) + sample[1]
+                else:
+                    counts, total = target.get(key, ([0] * len(sample[1]), 0.0))
+                    target[key] = ([a + b for a, b in zip(counts, sample[1])], total + sample[2])
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Tuple[str, ...], key: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render() -> str:
+    """
+    The metrics in the Prometheus text exposition format (version 0.0.4):
+    the sum over all processes if METRICS_DIR is set, else this process only.
+    """
+    if METRICS_DIR is not None:
+        flush()
+        snapshots = _read_snapshots(METRICS_DIR)
+    else:
+        snapshots = [snapshot()]
+    merged = _merge(snapshots)
+
+    lines: List[str] = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in sorted(merged[metric.name].items()):
+            if metric.kind == "counter":
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(list(metric.buckets) + [float("inf")], counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(metric.labelnames, key, f'le="{le}"')
+                lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(metric.labelnames, key)
+            lines.append(f"{metric.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{metric.name}_count{labels} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _after_fork_in_child() -> None:
+    # The child starts from zero under its own pid; the parent's numbers stay
+    # in the parent's file. The lock may have been held by another thread.
+    global _FLUSHER, _LOCK
+    _LOCK = threading.Lock()
+    _FLUSHER = None
+    _DIRTY.clear()
+    for metric in METRICS:
+        metric._reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(flush)
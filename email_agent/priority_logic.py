@@ -1,12 +1,28 @@
-from typing import Dict, Any, Optional, List
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, List, Tuple
 
 from .models import Priority
-from .config import MODEL_PATH
+from .config import KEYWORD_WORD_BOUNDARY, MODEL_MMAP_MODE, MODEL_RELOAD_INTERVAL_SECONDS
+from .keyword_matcher import KeywordMatcher
+from .metrics import CLASSIFICATIONS, MODEL_ERRORS
+from .text_normalization import normalize_text
 from .utils.logging_utils import get_logger
 
 logger = get_logger(__name__)
 
-_MODEL = None  # lazy-loaded scikit-learn pipeline
+# (model, version) being served, the model being a CompiledModel or a
+# scikit-learn pipeline; replaced as a whole on a hot reload, so a request
+# never pairs one model with another's version
+_ACTIVE: Optional[Tuple[Any, str]] = None
+_LOAD_ATTEMPTED = False
+_MODEL_LOCK = threading.Lock()
+_NEXT_RELOAD_CHECK = 0.0
+_RELOADING = False
+
+RULE_BASED_VERSION = "rules"
 
 # Simple keyword groups for explanation
 URGENT_KEYWORDS = ["urgent", "asap", "immediately", "deadline", "critical", "today"]
@@ -17,32 +33,192 @@ CASUAL_KEYWORDS = ["memes", "photos", "fun", "joke", "newsletter"]
 IMPORTANT_SENDER_HINTS = ["boss", "manager", "hod", "coordinator"]
 IMPORTANT_SUBJECT_HINTS = ["exam", "deadline", "submission", "project", "meeting"]
 
+# Matcher group name -> module attribute holding its keyword list
+_KEYWORD_GROUP_ATTRS = {
+    "urgent": "URGENT_KEYWORDS",
+    "medium": "MEDIUM_KEYWORDS",
+    "casual": "CASUAL_KEYWORDS",
+    "sender": "IMPORTANT_SENDER_HINTS",
+    "subject": "IMPORTANT_SUBJECT_HINTS",
+}
+_TEXT_GROUPS = ("urgent", "medium", "casual")
+
+_MATCHER: Optional[KeywordMatcher] = None  # compiled from all keyword groups
+
+
+def reload_keywords(groups: Optional[Dict[str, List[str]]] = None) -> KeywordMatcher:
+    """
+    (Re)compile the keyword matcher from the keyword lists above.
+
+    `groups` optionally replaces some lists first, keyed by matcher group
+    name ("urgent", "medium", "casual", "sender", "subject"). The new matcher
+    is swapped in atomically, so requests in flight keep using the old one.
+    """
+    global _MATCHER
+    for name, words in (groups or {}).items():
+        if name not in _KEYWORD_GROUP_ATTRS:
+            raise ValueError(f"Unknown keyword group: {name!r}")
+        globals()[_KEYWORD_GROUP_ATTRS[name]] = list(words)
+
+    _MATCHER = KeywordMatcher(
+        {name: globals()[attr] for name, attr in _KEYWORD_GROUP_ATTRS.items()},
+        word_boundary=KEYWORD_WORD_BOUNDARY,
+    )
+    return _MATCHER
+
+
+def get_keyword_matcher() -> KeywordMatcher:
+    if _MATCHER is None:
+        return reload_keywords()
+    return _MATCHER
+
+
+reload_keywords()
+
+
+def _load_model_file(path: Any) -> Any:
+    if Path(path).suffix == ".npz":
+        # Compiled model: plain numpy arrays, no sklearn import
+        from .compiled_model import CompiledModel
+
+        return CompiledModel.load(path)
+
+    import joblib
+
+    # Numpy arrays (IDF weights, coefficients) are memory-mapped read-only,
+    # so pre-forked gunicorn workers share the same physical pages.
+    return joblib.load(path, mmap_mode=MODEL_MMAP_MODE)
+
 
 def _load_model_if_needed() -> None:
     """
-    Lazy-load the ML model from disk, if present.
+    Lazy-load the active model version on first use (if there is one);
+    afterwards only check, now and then, whether a new version was activated.
     """
-    global _MODEL
-    if _MODEL is not None:
+    global _ACTIVE, _LOAD_ATTEMPTED, _NEXT_RELOAD_CHECK
+    if _LOAD_ATTEMPTED:
+        check_for_new_model()
         return
 
-    if not MODEL_PATH.exists():
-        logger.info("No trained model found at %s; using rule-based fallback.", MODEL_PATH)
-        return
+    from .learning import model_store
 
-    try:
-        import joblib
+    with _MODEL_LOCK:
+        if _LOAD_ATTEMPTED:
+            return
+        try:
+            resolved = model_store.resolve_active()
+            if resolved is None:
+                logger.info("No trained model found; using rule-based fallback.")
+            else:
+                version, path = resolved
+                _ACTIVE = (_load_model_file(path), version)
+                logger.info("Loaded email priority model from %s (version %s)", path, version)
+        except Exception:
+            logger.exception("Failed to load trained model; using fallback.")
+            MODEL_ERRORS.inc(stage="load")
+        _LOAD_ATTEMPTED = True
+        _NEXT_RELOAD_CHECK = time.monotonic() + MODEL_RELOAD_INTERVAL_SECONDS
 
-        _MODEL = joblib.load(MODEL_PATH)
-        logger.info("Loaded email priority model from %s", MODEL_PATH)
+
+def _swap_in(version: str, path: Any) -> None:
+    """
+    Load a model version, warm it up, then make it the served one. Requests
+    keep using the previous model until the swap.
+    """
+    global _ACTIVE, _RELOADING
+    try:
+        model = _load_model_file(path)
+        _predict_with_confidence(model, ["warm-up"])
+        previous = _ACTIVE[1] if _ACTIVE is not None else RULE_BASED_VERSION
+        _ACTIVE = (model, version)
+        logger.info("Swapped model version %s -> %s", previous, version)
     except Exception:
-        logger.exception("Failed to load trained model from %s; using fallback.", MODEL_PATH)
-        _MODEL = None
+        logger.exception("Failed to load model version %s; keeping the current one.", version)
+        MODEL_ERRORS.inc(stage="load")
+    finally:
+        _RELOADING = False
+
+
+def check_for_new_model(force: bool = False, wait: bool = False) -> Optional[str]:
+    """
+    Swap to the registry's active model version if it is not the one served.
 
+    Cheap on the request path: unless `force`, the registry is looked at at
+    most once per MODEL_RELOAD_INTERVAL_SECONDS. The new version is loaded in
+    a background thread (or right here with `wait`). Returns the version
+    being swapped in, or None if there is nothing to do.
+    """
+    global _NEXT_RELOAD_CHECK, _RELOADING
+    if not force and (MODEL_RELOAD_INTERVAL_SECONDS <= 0 or time.monotonic() < _NEXT_RELOAD_CHECK):
+        return None
+
+    from .learning import model_store
+
+    with _MODEL_LOCK:
+        if _RELOADING:
+            return None
+        _NEXT_RELOAD_CHECK = time.monotonic() + MODEL_RELOAD_INTERVAL_SECONDS
+        try:
+            resolved = model_store.resolve_active()
+        except Exception:
+            logger.exception("Failed to read the model registry")
+            return None
+        if resolved is None or (_ACTIVE is not None and _ACTIVE[1] == resolved[0]):
+            return None
+        _RELOADING = True
+
+    version, path = resolved
+    if wait:
+        _swap_in(version, path)
+    else:
+        threading.Thread(target=_swap_in, args=(version, path), name="model-reload", daemon=True).start()
+    return version
 
-def _find_keywords(text: str, keywords: List[str]) -> List[str]:
-    lower = text.lower()
-    return [kw for kw in keywords if kw in lower]
+
+def reload_model(version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Admin hook: optionally activate `version` in the registry (every worker
+    follows on its next check), then swap this process over right away.
+    """
+    from .learning import model_store
+
+    previous = get_model_version()
+    if version is not None:
+        model_store.activate(version)
+    check_for_new_model(force=True, wait=True)
+    return {"previous_version": previous, "model_version": get_model_version()}
+
+
+def _after_fork_in_child() -> None:
+    # A reload thread running in the parent does not exist in the child
+    global _MODEL_LOCK, _RELOADING
+    _MODEL_LOCK = threading.Lock()
+    _RELOADING = False
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def get_model_version() -> str:
+    """
+    Identifier of the classifier that will answer the next request.
+
+    Loads the model if needed; returns RULE_BASED_VERSION when no model is
+    available. Part of the LTM key and of every result, so a new model never
+    reuses old results.
+    """
+    _load_model_if_needed()
+    active = _ACTIVE
+    return active[1] if active is not None else RULE_BASED_VERSION
+
+
+def _find_text_keywords(text: str) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Return (urgent_hits, medium_hits, casual_hits) from one pass over the text.
+    """
+    hits = get_keyword_matcher().scan(text, _TEXT_GROUPS)
+    return hits["urgent"], hits["medium"], hits["casual"]
 
 
 def _inspect_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
@@ -58,20 +234,18 @@ def _inspect_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     if not metadata:
         return signals
 
-    sender = str(metadata.get("sender", "")).lower()
-    subject = str(metadata.get("subject", "")).lower()
+    matcher = get_keyword_matcher()
+    sender_hits = matcher.scan(str(metadata.get("sender", "")), ("sender",))["sender"]
+    subject_hits = matcher.scan(str(metadata.get("subject", "")), ("subject",))["subject"]
 
-    for hint in IMPORTANT_SENDER_HINTS:
-        if hint in sender:
-            signals["important_sender"] = True
-            signals["sender_match"] = hint
-            break
+    # First hint in list order wins, as before
+    if sender_hits:
+        signals["important_sender"] = True
+        signals["sender_match"] = sender_hits[0]
 
-    for hint in IMPORTANT_SUBJECT_HINTS:
-        if hint in subject:
-            signals["important_subject"] = True
-            signals["subject_match"] = hint
-            break
+    if subject_hits:
+        signals["important_subject"] = True
+        signals["subject_match"] = subject_hits[0]
 
     return signals
 
@@ -146,11 +320,9 @@ def _rule_based_classify(text: str, metadata: Optional[Dict[str, Any]]) -> Dict[
     """
     if text is None:
         text = ""
-    lower = text.lower()
+    CLASSIFICATIONS.inc(method="rule_based")
 
-    urgent_hits = _find_keywords(lower, URGENT_KEYWORDS)
-    medium_hits = _find_keywords(lower, MEDIUM_KEYWORDS)
-    casual_hits = _find_keywords(lower, CASUAL_KEYWORDS)
+    urgent_hits, medium_hits, casual_hits = _find_text_keywords(text)
     meta_signals = _inspect_metadata(metadata)
 
     # Decide priority
@@ -180,6 +352,7 @@ def _rule_based_classify(text: str, metadata: Optional[Dict[str, Any]]) -> Dict[
         "confidence": confidence,
         "explanation": explanation,
         "raw_text_length": len(text),
+        "model_version": RULE_BASED_VERSION,
     }
 
     if metadata:
@@ -251,90 +424,155 @@ def format_human_readable_response(
     return "\n".join(lines)
 
 
+def _model_result(
+    text: str,
+    metadata: Optional[Dict[str, Any]],
+    priority: str,
+    confidence: float,
+    model_version: str,
+) -> Dict[str, Any]:
+    """
+    Build the result payload for a prediction made by the ML model.
+    """
+    CLASSIFICATIONS.inc(method="ml")
+    # Analyse text/metadata for explanation signals
+    urgent_hits, medium_hits, casual_hits = _find_text_keywords(text)
+    meta_signals = _inspect_metadata(metadata)
+
+    explanation = _build_explanation_from_signals(
+        priority=priority,
+        confidence=confidence,
+        text=text,
+        used_model=True,
+        urgent_hits=urgent_hits,
+        medium_hits=medium_hits,
+        casual_hits=casual_hits,
+        meta_signals=meta_signals,
+    )
+
+    result: Dict[str, Any] = {
+        "priority": priority,
+        "confidence": confidence,
+        "explanation": explanation,
+        "raw_text_length": len(text),
+        "model_version": model_version,
+    }
+
+    if metadata:
+        result["metadata_used"] = list(metadata.keys())
+
+    return result
+
+
+def render_summary(result: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Render the human-readable summary from a result's structured fields.
+
+    The summary is not part of the default output (nor of LTM records); it is
+    only rendered when a caller asks for it.
+    """
+    return format_human_readable_response(
+        priority=result.get("priority", "unknown"),
+        confidence=result.get("confidence", 0.0),
+        explanation=result.get("explanation", ""),
+        metadata=metadata,
+        text_length=result.get("raw_text_length", 0),
+    )
+
+
+def _predict_with_confidence(model: Any, texts: List[str]) -> List[Tuple[str, float]]:
+    """
+    Run the model once over all texts and return (label, confidence) pairs.
+
+    The label is read from the probability vector via `classes_`, so the
+    vectorizer and classifier only run a single time for the whole batch.
+    """
+    if hasattr(model, "predict_proba"):
+        proba = model.predict_proba(texts)
+        best = proba.argmax(axis=1)
+        classes = model.classes_
+        return [(str(classes[j]), float(row[j])) for row, j in zip(proba, best)]
+
+    labels = model.predict(texts)
+    return [(str(label), 0.8) for label in labels]
+
+
 def classify_email(
     text: str,
     metadata: Optional[Dict[str, Any]] = None,
     context: Optional[Any] = None,
+    normalize: bool = True,
 ) -> Dict[str, Any]:
     """
     Top-level function used by app.py to classify an email.
 
     Behaviour:
-    1. Try to use the trained scikit-learn model (if available).
-    2. If the model is missing or fails, fall back to rule-based classification.
-    3. In both cases, produce a meaningful explanation using signals from
+    1. Normalize the text (see text_normalization.py), unless the caller
+       already did (`normalize=False`).
+    2. Try to use the trained model (if available; its compiled form when
+       there is one, see compiled_model.py).
+    3. If the model is missing or fails, fall back to rule-based classification.
+    4. In both cases, produce a meaningful explanation using signals from
        text and metadata.
     """
     if text is None:
         text = ""
+    if normalize:
+        text = normalize_text(text)
 
-    # Analyse text/metadata for explanation signals (works for both ML and rules)
-    urgent_hits = _find_keywords(text, URGENT_KEYWORDS)
-    medium_hits = _find_keywords(text, MEDIUM_KEYWORDS)
-    casual_hits = _find_keywords(text, CASUAL_KEYWORDS)
-    meta_signals = _inspect_metadata(metadata)
-
-    # Try ML model first
+    # Try ML model first (one snapshot, in case a hot reload swaps it meanwhile)
     _load_model_if_needed()
-    used_model = False
+    active = _ACTIVE
 
-    if _MODEL is not None:
+    if active is not None:
+        model, model_version = active
         try:
-            y_pred = _MODEL.predict([text])[0]
-            priority = str(y_pred)
-
-            confidence = 0.8
-            if hasattr(_MODEL, "predict_proba"):
-                proba = _MODEL.predict_proba([text])[0]
-                confidence = float(max(proba))
-
-            used_model = True
-
-            explanation = _build_explanation_from_signals(
-                priority=priority,
-                confidence=confidence,
-                text=text,
-                used_model=used_model,
-                urgent_hits=urgent_hits,
-                medium_hits=medium_hits,
-                casual_hits=casual_hits,
-                meta_signals=meta_signals,
-            )
-
-            result: Dict[str, Any] = {
-                "priority": priority,
-                "confidence": confidence,
-                "explanation": explanation,
-                "raw_text_length": len(text),
-            }
-
-            if metadata:
-                result["metadata_used"] = list(metadata.keys())
-            
-            # Add human-readable summary
-            result["human_readable_summary"] = format_human_readable_response(
-                priority=priority,
-                confidence=confidence,
-                explanation=explanation,
-                metadata=metadata,
-                text_length=len(text),
-            )
-
-            return result
+            # One pass through the pipeline gives both label and confidence
+            priority, confidence = _predict_with_confidence(model, [text])[0]
+            return _model_result(text, metadata, priority, confidence, model_version)
 
         except Exception:
             logger.exception("ML model failed during classification; falling back to rules.")
+            MODEL_ERRORS.inc(stage="predict")
 
     # Fallback: rule-based classification (still with detailed explanation)
-    rule_result = _rule_based_classify(text, metadata)
-    
-    # Add human-readable summary to rule-based result
-    rule_result["human_readable_summary"] = format_human_readable_response(
-        priority=rule_result["priority"],
-        confidence=rule_result["confidence"],
-        explanation=rule_result["explanation"],
-        metadata=metadata,
-        text_length=rule_result["raw_text_length"],
-    )
-    
-    return rule_result
+    return _rule_based_classify(text, metadata)
+
+
+def classify_emails(
+    texts: List[str],
+    metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+    contexts: Optional[List[Any]] = None,
+    normalize: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Batch version of classify_email() used by /handle_batch.
+
+    All texts go through the model in one vectorized predict_proba call,
+    which amortizes the TF-IDF + LogisticRegression overhead over the batch.
+    Results are returned in the same order and format as classify_email().
+    """
+    texts = [text if text is not None else "" for text in texts]
+    if normalize:
+        texts = [normalize_text(text) for text in texts]
+    if metadatas is None:
+        metadatas = [None] * len(texts)
+
+    _load_model_if_needed()
+    active = _ACTIVE
+    predictions: Optional[List[Tuple[str, float]]] = None
+
+    if active is not None and texts:
+        try:
+            predictions = _predict_with_confidence(active[0], texts)
+        except Exception:
+            logger.exception("ML model failed during batch classification; falling back to rules.")
+            MODEL_ERRORS.inc(stage="predict")
+
+    if predictions is None:
+        return [_rule_based_classify(text, metadata) for text, metadata in zip(texts, metadatas)]
+
+    return [
+        _model_result(text, metadata, priority, confidence, active[1])
+        for text, metadata, (priority, confidence) in zip(texts, metadatas, predictions)
+    ]
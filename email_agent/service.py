@@ -0,0 +1,423 @@
+"""
+Request handling shared by the HTTP entry points (app.py for Flask/WSGI,
+asgi.py for the async server).
+
+The single-request flow is split into small steps (LTM lookup, classify,
+LTM write-back, response building) so the async server can run each step
+in the right executor and send the response before the write-back is done.
+Nothing in here knows about Flask or ASGI.
+"""
+
+import hmac
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from .config import ADMIN_TOKEN, AGENT_NAME, MAX_BATCH_SIZE
+from .handshake_schemas import AgentRequest, AgentResponse, BatchRequest, BatchResponse
+from .learning.model_store import is_registry_version
+from .ltm_store import (
+    build_task_key,
+    legacy_task_key,
+    lookup_many_with_fallback,
+    lookup_near,
+    lookup_with_fallback,
+    record_tier,
+    store,
+    store_many,
+    store_signatures,
+)
+from .priority_logic import (
+    classify_email,
+    classify_emails,
+    get_model_version,
+    reload_model,
+    render_summary,
+)
+from .text_normalization import normalization_fingerprint, normalize_text
+from .utils.logging_utils import get_logger, sampled, short_key
+from .utils.timing import StageTimer
+
+logger = get_logger(__name__)
+
+# The LTM lookup and the model both need the normalized text of the same
+# request; remember the last few so it is only computed once per request
+_normalize_cached = lru_cache(maxsize=1024)(normalize_text)
+
+
+def normalized_text(agent_request: AgentRequest) -> str:
+    """
+    The request text after text normalization (see text_normalization.py).
+    """
+    return _normalize_cached(agent_request.input.text)
+
+
+def task_keys(agent_request: AgentRequest, model_version: str) -> Tuple[str, Optional[str]]:
+    """
+    Return (task_key, legacy_key) for a validated request. The task key is
+    built from the normalized text; the legacy key always used the raw text.
+
+    Legacy keys carry no model version, so they predate the registry: once
+    a registry version is serving, legacy_key is None and old results are
+    never returned for the new model.
+    """
+    task_key = build_task_key(
+        intent=agent_request.intent,
+        text=normalized_text(agent_request),
+        metadata=agent_request.input.metadata,
+        model_version=model_version,
+        normalization=normalization_fingerprint(),
+    )
+    if is_registry_version(model_version):
+        return task_key, None
+    return task_key, legacy_task_key(agent_request.intent, agent_request.input.text)
+
+
+def summary_requested(agent_request: AgentRequest, query_flag: bool = False) -> bool:
+    """
+    The human-readable summary is opt-in: either `?summary=1` on the URL
+    (passed in as `query_flag`) or `"include_summary": true` in context.extras.
+    """
+    if query_flag:
+        return True
+    extras = agent_request.context.extras if agent_request.context else None
+    return bool(extras and extras.get("include_summary"))
+
+
+def apply_summary(result_payload: Dict[str, Any], agent_request: AgentRequest, requested: bool) -> None:
+    """
+    Render the summary from the structured fields only when it was asked for.
+    Older LTM records may still carry a stored summary; drop it otherwise.
+    """
+    if requested:
+        result_payload["human_readable_summary"] = render_summary(
+            result_payload, agent_request.input.metadata
+        )
+    else:
+        result_payload.pop("human_readable_summary", None)
+
+
+def ltm_match(tier: str, matched_key: str, similarity: float) -> Dict[str, Any]:
+    """
+    The "ltm_match" block added to results served from LTM.
+    """
+    return {"tier": tier, "matched_key": matched_key, "similarity": round(similarity, 4)}
+
+
+def _signature_item(agent_request: AgentRequest, task_key: str, model_version: str) -> tuple:
+    return (
+        task_key,
+        agent_request.intent,
+        agent_request.input.text,
+        agent_request.input.metadata,
+        model_version,
+    )
+
+
+def error_response(request_id: Optional[str], error_type: str, message: str) -> AgentResponse:
+    return AgentResponse(
+        request_id=request_id,
+        agent_name=AGENT_NAME,
+        status="error",
+        output=None,
+        error={
+            "type": error_type,
+            "message": message,
+        },
+    )
+
+
+def lookup_cached(agent_request: AgentRequest) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Step 1: build the task key and try long-term memory: the exact tier
+    first, then (if enabled) the near-duplicate tier.
+    Returns (task_key, cached_result or None); a cached result carries an
+    "ltm_match" block saying which tier answered.
+    """
+    model_version = get_model_version()
+    task_key, legacy_key = task_keys(agent_request, model_version)
+    cached_result = lookup_with_fallback(task_key, legacy_key=legacy_key)
+    if cached_result is not None:
+        logger.info("LTM hit", extra=sampled(tier="exact", task_key=short_key(task_key)))
+        cached_result["ltm_match"] = ltm_match("exact", task_key, 1.0)
+        record_tier("exact")
+        return task_key, cached_result
+
+    near = lookup_near(
+        agent_request.intent,
+        agent_request.input.text,
+        agent_request.input.metadata,
+        model_version,
+    )
+    if near is not None:
+        matched_key, similarity, cached_result = near
+        logger.info(
+            "LTM hit",
+            extra=sampled(
+                tier="near",
+                task_key=short_key(task_key),
+                matched_key=short_key(matched_key),
+                similarity=round(similarity, 3),
+            ),
+        )
+        cached_result["ltm_match"] = ltm_match("near", matched_key, similarity)
+        record_tier("near")
+        return task_key, cached_result
+
+    logger.info("LTM miss; invoking core logic", extra=sampled(task_key=short_key(task_key)))
+    record_tier("miss")
+    return task_key, None
+
+
+def classify(agent_request: AgentRequest) -> Dict[str, Any]:
+    """
+    Step 2: call core classification logic (ML model + rules).
+    """
+    return classify_email(
+        text=normalized_text(agent_request),
+        metadata=agent_request.input.metadata,
+        context=agent_request.context,
+        normalize=False,
+    )
+
+
+def remember(
+    task_key: str,
+    result_payload: Dict[str, Any],
+    agent_request: Optional[AgentRequest] = None,
+) -> None:
+    """
+    Step 3: store a fresh result in LTM (plus its near-duplicate signature
+    when `agent_request` is given). Never raises.
+    """
+    try:
+        store(task_key, result_payload)
+        if agent_request is not None:
+            store_signatures([_signature_item(agent_request, task_key, get_model_version())])
+    except Exception:
+        # LTM failures should not break the main flow
+        logger.exception("Failed to store result in LTM for task_key=%s", task_key)
+
+
+def success_response(
+    agent_request: AgentRequest,
+    result_payload: Dict[str, Any],
+    summary_flag: bool = False,
+    timer: Optional[StageTimer] = None,
+) -> AgentResponse:
+    """
+    Step 4: build the success response (summary rendered only on request).
+    """
+    timer = timer or StageTimer()
+    # Results are shared by every text variant that normalizes to the same
+    # key, so the length always describes this request's own text
+    result_payload["raw_text_length"] = len(agent_request.input.text or "")
+    with timer.stage("summary"):
+        apply_summary(result_payload, agent_request, summary_requested(agent_request, summary_flag))
+    return AgentResponse(
+        request_id=agent_request.request_id,
+        agent_name=AGENT_NAME,
+        status="success",
+        # NEST the result payload under "result"
+        output={"result": result_payload},
+        error=None,
+    )
+
+
+def handle_request(
+    agent_request: AgentRequest,
+    summary_flag: bool = False,
+    timer: Optional[StageTimer] = None,
+) -> AgentResponse:
+    """
+    Full synchronous /handle flow: LTM lookup, classify on miss, store, respond.
+    Exceptions propagate so the caller can turn them into a 500.
+    Stage durations are recorded in `timer` if one is given.
+    """
+    timer = timer or StageTimer()
+    with timer.stage("ltm_lookup"):
+        task_key, result_payload = lookup_cached(agent_request)
+    if result_payload is None:
+        with timer.stage("classify"):
+            result_payload = classify(agent_request)
+        with timer.stage("ltm_store"):
+            remember(task_key, result_payload, agent_request)
+    return success_response(agent_request, result_payload, summary_flag, timer)
+
+
+def parse_request(body: Union[bytes, str]) -> AgentRequest:
+    """
+    Validate a /handle body straight from its raw JSON (pydantic's JSON
+    mode), without decoding it into an intermediate dict first.
+    """
+    return AgentRequest.model_validate_json(body)
+
+
+def parse_batch(body: Union[bytes, str]) -> BatchRequest:
+    """
+    Validate a raw /handle_batch body, enforcing MAX_BATCH_SIZE. The items
+    stay plain JSON values; handle_batch() validates them one by one.
+    """
+    batch_request = BatchRequest.model_validate_json(body)
+    if len(batch_request.requests) > MAX_BATCH_SIZE:
+        raise ValueError(
+            f"Batch of {len(batch_request.requests)} requests exceeds the limit of {MAX_BATCH_SIZE}."
+        )
+    return batch_request
+
+
+def encode_response(response: BaseModel) -> bytes:
+    """
+    Serialize a response model straight to JSON bytes (no intermediate dict).
+    """
+    return to_json(response)
+
+
+def handle_batch(
+    batch_request: BatchRequest,
+    summary_flag: bool = False,
+    timer: Optional[StageTimer] = None,
+) -> BatchResponse:
+    """
+    Full /handle_batch flow.
+
+    All LTM lookups are done in bulk (exact misses then try the
+    near-duplicate tier), every remaining miss goes through the model in a
+    single vectorized call, and the new results are written back to LTM in
+    one transaction. Each item gets its own AgentResponse (in order), so one
+    invalid item does not fail the whole batch.
+    Stage durations are recorded in `timer` if one is given.
+    """
+    timer = timer or StageTimer()
+    responses: List[Optional[AgentResponse]] = [None] * len(batch_request.requests)
+    parsed: List[Tuple[int, AgentRequest, str, str]] = []
+    model_version = get_model_version()
+
+    # Validate every item on its own
+    with timer.stage("validate"):
+        for position, item in enumerate(batch_request.requests):
+            try:
+                agent_request = AgentRequest.model_validate(item)
+            except Exception as exc:
+                item_id = item.get("request_id") if isinstance(item, dict) else None
+                responses[position] = error_response(
+                    item_id, "BadRequest", f"Invalid request payload: {exc}"
+                )
+                continue
+            task_key, legacy_key = task_keys(agent_request, model_version)
+            parsed.append((position, agent_request, task_key, legacy_key))
+
+    # 1) Bulk LTM lookup
+    with timer.stage("ltm_lookup"):
+        results: Dict[str, Dict[str, Any]] = lookup_many_with_fallback(
+            [(task_key, legacy_key) for _, _, task_key, legacy_key in parsed]
+        )
+
+        matches: Dict[str, Dict[str, Any]] = {
+            task_key: ltm_match("exact", task_key, 1.0) for task_key in results
+        }
+
+        misses: Dict[str, AgentRequest] = {}
+        for _, agent_request, task_key, _ in parsed:
+            if task_key not in results:
+                misses.setdefault(task_key, agent_request)
+
+        # 2) Near-duplicate tier for the exact misses
+        for task_key, agent_request in list(misses.items()):
+            near = lookup_near(
+                agent_request.intent,
+                agent_request.input.text,
+                agent_request.input.metadata,
+                model_version,
+            )
+            if near is not None:
+                matched_key, similarity, results[task_key] = near
+                matches[task_key] = ltm_match("near", matched_key, similarity)
+                del misses[task_key]
+
+    # 3) Classify every distinct remaining miss in one vectorized call
+    if misses:
+        with timer.stage("classify"):
+            miss_requests = list(misses.values())
+            classified = classify_emails(
+                texts=[normalized_text(r) for r in miss_requests],
+                metadatas=[r.input.metadata for r in miss_requests],
+                contexts=[r.context for r in miss_requests],
+                normalize=False,
+            )
+        new_items = list(zip(misses.keys(), classified))
+
+        # 4) Write all new results back in one transaction
+        with timer.stage("ltm_store"):
+            try:
+                store_many(new_items)
+                store_signatures(
+                    [_signature_item(r, task_key, model_version) for task_key, r in misses.items()]
+                )
+            except Exception:
+                # LTM failures should not break the main flow
+                logger.exception("Failed to store %d batch results in LTM", len(new_items))
+        results.update(new_items)
+
+    tiers = [
+        matches[task_key]["tier"] if task_key in matches else "miss" for _, _, task_key, _ in parsed
+    ]
+    for tier in ("exact", "near", "miss"):
+        record_tier(tier, tiers.count(tier))
+    logger.info(
+        "Batch resolved",
+        extra=sampled(
+            valid_items=len(parsed),
+            exact_hits=tiers.count("exact"),
+            near_hits=tiers.count("near"),
+            classified=len(misses),
+        ),
+    )
+
+    # 5) Per-item responses, in request order
+    for position, agent_request, task_key, _ in parsed:
+        result_payload = dict(results[task_key])
+        if task_key in matches:
+            result_payload["ltm_match"] = matches[task_key]
+        responses[position] = success_response(agent_request, result_payload, summary_flag, timer)
+
+    failures = sum(1 for r in responses if r.status == "error")
+    if failures == 0:
+        batch_status = "success"
+    elif failures == len(responses):
+        batch_status = "error"
+    else:
+        batch_status = "partial"
+
+    return BatchResponse(
+        request_id=batch_request.request_id,
+        agent_name=AGENT_NAME,
+        status=batch_status,
+        results=responses,
+    )
+
+
+def admin_reload_model(token: Optional[str], body: bytes) -> Tuple[int, Dict[str, Any]]:
+    """
+    POST /admin/reload_model: check the X-Admin-Token, optionally activate
+    the registry version named in the body ({"version": "..."}), and swap
+    this worker to the active version now (the others follow within
+    MODEL_RELOAD_INTERVAL_SECONDS). Returns (HTTP status, JSON body).
+    """
+    if ADMIN_TOKEN is None:
+        return 403, {"status": "error", "message": "Admin endpoints are disabled (EMAIL_AGENT_ADMIN_TOKEN unset)."}
+    if token is None or not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        return 403, {"status": "error", "message": "Invalid admin token."}
+    try:
+        version = json.loads(body).get("version") if body.strip() else None
+    except (ValueError, AttributeError):
+        return 400, {"status": "error", "message": "Body must be empty or a JSON object."}
+    try:
+        result = reload_model(version)
+    except FileNotFoundError as exc:
+        return 404, {"status": "error", "message": str(exc)}
+    logger.info("Model reload requested", extra={"fields": result})
+    return 200, {"status": "ok", **result}
@@ -0,0 +1,80 @@
+"""
+64-bit SimHash signatures for near-duplicate email detection.
+
+Templated notifications ("Hi Alice, ticket #1234 was updated on 3 May")
+differ only in a few tokens, so their signatures differ in only a few bits.
+The similarity of two emails is the fraction of equal bits:
+
+    similarity = 1 - hamming(a, b) / 64
+
+Features are lower-cased word bigrams with every digit run collapsed to
+"0", so ticket numbers and dates do not count as differences at all.
+
+For lookup, a signature is cut into bands; two signatures within
+bands - 1 differing bits share at least one band exactly (pigeonhole), so
+only emails sharing a band need to be compared. band_count() picks the
+number of bands for a similarity threshold so that no match above it is
+missed.
+"""
+
+import hashlib
+import math
+import re
+from typing import List
+
+SIGNATURE_BITS = 64
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_DIGITS_RE = re.compile(r"[0-9]+")
+
+
+def _features(text: str) -> List[str]:
+    tokens = [_DIGITS_RE.sub("0", token) for token in _TOKEN_RE.findall(text.lower())]
+    if len(tokens) < 2:
+        return tokens
+    return [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def simhash(text: str) -> int:
+    """
+    Return the 64-bit SimHash of `text` as an unsigned int (0 for empty text).
+    """
+    features = _features(text)
+    if not features:
+        return 0
+    # Imported on first use: near-duplicate lookup is off by default, and
+    # numpy is the largest import of the serving path
+    import numpy as np
+
+    digests = b"".join(
+        hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest() for feature in features
+    )
+    # One row of 64 bits per feature; a bit is set if most features set it
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(features), SIGNATURE_BITS)
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(features)
+    return int.from_bytes(np.packbits(majority).tobytes(), "big")
+
+
+def similarity(a: int, b: int) -> float:
+    """
+    Fraction of equal bits between two signatures (1.0 = identical).
+    """
+    return 1.0 - (a ^ b).bit_count() / SIGNATURE_BITS
+
+
+def band_count(threshold: float) -> int:
+    """
+    Number of bands needed so that every pair at least `threshold` similar
+    shares a band: such a pair differs in at most floor((1 - threshold) * 64)
+    bits, and one band more than that guarantees an untouched one.
+    """
+    max_differing_bits = math.floor((1.0 - threshold) * SIGNATURE_BITS + 1e-9)
+    return max(1, min(SIGNATURE_BITS, max_differing_bits + 1))
+
+
+def bands(signature: int, count: int) -> List[int]:
+    """
+    Split a signature into `count` integers of (nearly) equal bit widths.
+    """
+    edges = [band * SIGNATURE_BITS // count for band in range(count + 1)]
+    return [(signature >> start) & ((1 << (end - start)) - 1) for start, end in zip(edges, edges[1:])]
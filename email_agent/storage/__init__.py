@@ -0,0 +1,32 @@
+"""
+Subpackage with the storage backends behind the Long-Term Memory (LTM).
+
+`email_agent.ltm_store` is the only module the rest of the agent talks to;
+it picks one of these backends based on `config.LTM_BACKEND`.
+"""
+
+from .base import LTMBackend
+
+
+def create_backend(name: str) -> LTMBackend:
+    """
+    Build the LTM backend registered under `name`.
+
+    Backends are imported lazily so that unused ones cost nothing at startup.
+    """
+    if name == "sqlite":
+        from .sqlite_backend import SQLiteBackend
+
+        return SQLiteBackend()
+    if name == "segment":
+        from .segment_backend import SegmentLogBackend
+
+        return SegmentLogBackend()
+    if name == "json":
+        from .json_backend import JSONFileBackend
+
+        return JSONFileBackend()
+    raise ValueError(f"Unknown LTM backend: {name!r}")
+
+
+__all__ = ["LTMBackend", "create_backend"]
@@ -0,0 +1,89 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class LTMBackend:
+    """
+    Interface implemented by every LTM storage backend.
+
+    Contract (same as the public ltm_store functions):
+    - lookup() returns the stored result dict, or None if missing / on error
+    - store() never raises; failures are logged so the agent flow continues
+    """
+
+    name = "base"
+
+    def lookup(self, task_key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def store(self, task_key: str, result: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def lookup_many(self, task_keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Bulk lookup. Returns only the keys that were found.
+        Backends override this when they can answer in a single round trip.
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        for task_key in task_keys:
+            result = self.lookup(task_key)
+            if result is not None:
+                found[task_key] = result
+        return found
+
+    def store_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Bulk store of (task_key, result) pairs.
+        Backends override this to write everything in one transaction.
+        """
+        for task_key, result in items:
+            self.store(task_key, result)
+
+    def compact(
+        self,
+        max_entries: int = 0,
+        max_bytes: int = 0,
+        max_age_seconds: float = 0.0,
+        policy: str = "lru",
+        vacuum: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Enforce capacity limits and reclaim space (0 = no limit).
+
+        Drops entries older than `max_age_seconds`, then evicts by `policy`
+        ("lru" or "lfu") until at most `max_entries` entries / `max_bytes`
+        payload bytes remain. Returns a report (see compaction_report()).
+        Backends without anything to compact return an empty report.
+        """
+        return compaction_report(self.name)
+
+    def close(self) -> None:
+        """
+        Release any open handles. Safe to call multiple times.
+        """
+
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+def compaction_report(backend_name: str) -> Dict[str, Any]:
+    """
+    Blank report returned by LTMBackend.compact().
+
+    - expired / evicted:      entries dropped by max age / by the size limits
+    - orphans_removed:        files no index entry points to (file backends)
+    - payload_bytes_evicted:  size of the dropped results
+    - entries / payload_bytes: what is left afterwards
+    - disk_bytes_before / disk_bytes_after / bytes_reclaimed: on-disk footprint
+    """
+    return {
+        "backend": backend_name,
+        "expired": 0,
+        "evicted": 0,
+        "orphans_removed": 0,
+        "payload_bytes_evicted": 0,
+        "entries": 0,
+        "payload_bytes": 0,
+        "disk_bytes_before": 0,
+        "disk_bytes_after": 0,
+        "bytes_reclaimed": 0,
+    }
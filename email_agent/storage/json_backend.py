@@ -0,0 +1,306 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..config import LTM_INDEX_PATH, LTM_RECORDS_DIR, LTM_TRACK_ACCESS
+from ..utils.logging_utils import get_logger
+from .base import EVICTION_POLICIES, LTMBackend, compaction_report
+from .file_utils import atomic_write_text, file_lock
+
+logger = get_logger(__name__)
+
+# Unreferenced record files and leftover temp files younger than this are
+# kept by compact(): a concurrent store() writes the record before it adds
+# the index entry.
+ORPHAN_GRACE_SECONDS = 300.0
+
+
+def key_to_filename(task_key: str) -> str:
+    """
+    Convert a task key to a stable filename using a hash.
+    """
+    digest = hashlib.sha256(task_key.encode("utf-8")).hexdigest()
+    return f"{digest}.json"
+
+
+class JSONFileBackend(LTMBackend):
+    """
+    Original LTM layout: a JSON index (task_key -> filename) plus one
+    JSON file per record under records/.
+
+    Every call re-reads the whole index, so cost grows with the cache size.
+    Kept for backwards compatibility and as the source for migrations.
+
+    Safe with several worker processes:
+    - record files and the index are written to a temp file and atomically
+      renamed, so readers never see a half-written file
+    - index updates happen under a cross-process file lock, re-reading the
+      index first, so concurrent stores never drop each other's entries
+    - index updates are group-committed: entries queued by concurrent
+      threads are merged into a single locked read-modify-write
+
+    For eviction, a record file's mtime is its write time and, with
+    `track_access`, its atime is set explicitly on every hit (so it works
+    on noatime mounts too). Hit counts are not kept, so "lfu" falls back
+    to LRU here.
+    """
+
+    name = "json"
+
+    def __init__(
+        self,
+        index_path: Path = LTM_INDEX_PATH,
+        records_dir: Path = LTM_RECORDS_DIR,
+        track_access: bool = LTM_TRACK_ACCESS,
+    ) -> None:
+        self.index_path = Path(index_path)
+        self.records_dir = Path(records_dir)
+        self.track_access = track_access
+        self.orphan_grace_seconds = ORPHAN_GRACE_SECONDS
+        self.lock_path = self.index_path.with_name(self.index_path.name + ".lock")
+        self._pending: Dict[str, str] = {}
+        self._pending_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+
+    def _ensure_dirs(self, locked: bool = False) -> None:
+        """
+        Ensure LTM directories and index file exist.
+        Safe to call multiple times. Pass `locked` when the caller already
+        holds the index lock: flock() from a second fd would wait for it.
+        """
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.records_dir.mkdir(parents=True, exist_ok=True)
+        if self.index_path.exists():
+            return
+        if locked:
+            atomic_write_text(self.index_path, "{}")
+            return
+        with file_lock(self.lock_path):
+            if not self.index_path.exists():
+                atomic_write_text(self.index_path, "{}")
+
+    def _read_index(self) -> Dict[str, str]:
+        """
+        Parse the index file as it is (missing or corrupt: empty). Takes no
+        lock, so it is what code holding the index lock uses.
+        """
+        try:
+            text = self.index_path.read_text(encoding="utf-8")
+            return json.loads(text)
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            logger.exception("Failed to read LTM index file; resetting to empty.")
+            return {}
+
+    def load_index(self) -> Dict[str, str]:
+        self._ensure_dirs()
+        return self._read_index()
+
+    def read_record(self, filename: str) -> Optional[Dict[str, Any]]:
+        record_path: Path = self.records_dir / filename
+        if not record_path.exists():
+            return None
+
+        try:
+            text = record_path.read_text(encoding="utf-8")
+            return json.loads(text)
+        except Exception:
+            logger.exception("Failed to read LTM record: %s", record_path)
+            return None
+
+    def _touch(self, filename: str) -> None:
+        """
+        Record an access by bumping the record's atime (mtime stays the write time).
+        """
+        if not self.track_access:
+            return
+        record_path = self.records_dir / filename
+        try:
+            stat = record_path.stat()
+            os.utime(record_path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except OSError:
+            logger.warning("Failed to record LTM access for %s", record_path, exc_info=True)
+
+    def _write_record(self, task_key: str, result: Dict[str, Any]) -> Optional[str]:
+        """
+        Atomically write one record file; returns its filename or None on error.
+        """
+        filename = key_to_filename(task_key)
+        record_path: Path = self.records_dir / filename
+        try:
+            atomic_write_text(record_path, json.dumps(result))
+            return filename
+        except Exception:
+            logger.exception("Failed to write LTM record: %s", record_path)
+            return None
+
+    def _commit_index(self) -> None:
+        """
+        Group commit: whichever thread gets here first merges every entry
+        queued so far into the index under the cross-process lock. Threads
+        that queued entries meanwhile find them already committed.
+        """
+        with self._commit_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+
+            try:
+                with file_lock(self.lock_path):
+                    self._ensure_dirs(locked=True)
+                    index = self._read_index()
+                    index.update(batch)
+                    atomic_write_text(self.index_path, json.dumps(index))
+            except Exception:
+                logger.exception("Failed to write LTM index file.")
+
+    def lookup(self, task_key: str) -> Optional[Dict[str, Any]]:
+        index = self.load_index()
+        filename = index.get(task_key)
+        if not filename:
+            return None
+        record = self.read_record(filename)
+        if record is not None:
+            self._touch(filename)
+        return record
+
+    def store(self, task_key: str, result: Dict[str, Any]) -> None:
+        self.store_many([(task_key, result)])
+
+    def lookup_many(self, task_keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        index = self.load_index()
+        found: Dict[str, Dict[str, Any]] = {}
+        for task_key in task_keys:
+            filename = index.get(task_key)
+            if not filename:
+                continue
+            record = self.read_record(filename)
+            if record is not None:
+                self._touch(filename)
+                found[task_key] = record
+        return found
+
+    def store_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        if not items:
+            return
+        self._ensure_dirs()
+
+        written: Dict[str, str] = {}
+        for task_key, result in items:
+            filename = self._write_record(task_key, result)
+            if filename is not None:
+                written[task_key] = filename
+
+        with self._pending_lock:
+            self._pending.update(written)
+        self._commit_index()
+
+    def compact(
+        self,
+        max_entries: int = 0,
+        max_bytes: int = 0,
+        max_age_seconds: float = 0.0,
+        policy: str = "lru",
+        vacuum: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Under the index lock: drop expired and evicted entries from the index
+        and delete their record files, delete orphaned records/*.json files
+        that no index entry points to, and clean up temp files left behind by
+        crashed writers. Index entries whose record file is gone are dropped
+        too. `vacuum` has no meaning for this backend.
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown LTM eviction policy: {policy!r}")
+        if policy == "lfu":
+            logger.warning("The json LTM backend does not count hits; evicting by LRU instead.")
+
+        report = compaction_report(self.name)
+        self._ensure_dirs()
+        now = time.time()
+
+        with self._commit_lock, file_lock(self.lock_path):
+            self._ensure_dirs(locked=True)
+            index = self._read_index()
+            index_size = self.index_path.stat().st_size
+            report["disk_bytes_before"] = index_size
+
+            files: Dict[str, os.stat_result] = {}
+            doomed: List[Tuple[Path, int]] = []  # files to delete, with their size
+            with os.scandir(self.records_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    report["disk_bytes_before"] += stat.st_size
+                    if entry.name.endswith(".tmp"):
+                        if now - stat.st_mtime > self.orphan_grace_seconds:
+                            doomed.append((Path(entry.path), stat.st_size))
+                    else:
+                        files[entry.name] = stat
+
+            referenced = set(index.values())
+            for filename, stat in files.items():
+                if filename not in referenced and now - stat.st_mtime > self.orphan_grace_seconds:
+                    doomed.append((self.records_dir / filename, stat.st_size))
+                    report["orphans_removed"] += 1
+
+            live: List[Tuple[str, str, os.stat_result]] = []
+            dangling = 0
+            for task_key, filename in index.items():
+                stat = files.get(filename)
+                if stat is None:
+                    dangling += 1
+                elif max_age_seconds > 0 and now - stat.st_mtime > max_age_seconds:
+                    doomed.append((self.records_dir / filename, stat.st_size))
+                    report["expired"] += 1
+                    report["payload_bytes_evicted"] += stat.st_size
+                else:
+                    live.append((task_key, filename, stat))
+
+            payload_bytes = sum(stat.st_size for _, _, stat in live)
+            excess_entries = max(0, len(live) - max_entries) if max_entries > 0 else 0
+            excess_bytes = max(0, payload_bytes - max_bytes) if max_bytes > 0 else 0
+            evicted = 0
+            freed = 0
+            if excess_entries or excess_bytes:
+                live.sort(key=lambda item: item[2].st_atime)
+                for _, filename, stat in live:
+                    if evicted >= excess_entries and freed >= excess_bytes:
+                        break
+                    doomed.append((self.records_dir / filename, stat.st_size))
+                    evicted += 1
+                    freed += stat.st_size
+                live = live[evicted:]
+            report["evicted"] = evicted
+            report["payload_bytes_evicted"] += freed
+            report["entries"] = len(live)
+            report["payload_bytes"] = payload_bytes - freed
+
+            if report["expired"] or evicted or dangling:
+                new_index = {task_key: filename for task_key, filename, _ in live}
+                atomic_write_text(self.index_path, json.dumps(new_index))
+
+            removed = 0
+            for path, size in doomed:
+                try:
+                    path.unlink()
+                    removed += size
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    logger.warning("Failed to delete LTM file %s", path, exc_info=True)
+
+            new_index_size = self.index_path.stat().st_size
+            report["disk_bytes_after"] = report["disk_bytes_before"] - removed - index_size + new_index_size
+
+        report["bytes_reclaimed"] = max(0, report["disk_bytes_before"] - report["disk_bytes_after"])
+        if dangling:
+            logger.info("Dropped %d LTM index entries whose record file was missing", dangling)
+        return report
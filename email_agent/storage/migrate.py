@@ -0,0 +1,70 @@
+import json
+import time
+from pathlib import Path
+from typing import Dict
+
+from ..config import LTM_DB_PATH, LTM_INDEX_PATH, LTM_RECORDS_DIR
+from ..utils.logging_utils import get_logger
+from .json_backend import JSONFileBackend
+from .sqlite_backend import SQLiteBackend
+
+logger = get_logger(__name__)
+
+
+def migrate_json_to_sqlite(
+    index_path: Path = LTM_INDEX_PATH,
+    records_dir: Path = LTM_RECORDS_DIR,
+    db_path: Path = LTM_DB_PATH,
+) -> Dict[str, int]:
+    """
+    One-shot copy of the legacy ltm_index.json + records/*.json layout
+    into the SQLite LTM database.
+
+    Existing rows in the database win, so the migration can be re-run safely.
+    The legacy files are left untouched; delete them once you are happy.
+
+    Returns:
+        dict with counts: "migrated", "skipped_existing", "missing_records"
+    """
+    source = JSONFileBackend(index_path=index_path, records_dir=records_dir)
+    target = SQLiteBackend(db_path=db_path)
+
+    counts = {"migrated": 0, "skipped_existing": 0, "missing_records": 0}
+    index = source.load_index()
+    now = time.time()
+
+    conn = target.connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for task_key, filename in index.items():
+            record = source.read_record(filename)
+            if record is None:
+                counts["missing_records"] += 1
+                continue
+            text = json.dumps(record)
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO ltm_records "
+                "(task_key, result, created_at, updated_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (task_key, text, now, now, now, len(text)),
+            )
+            if cursor.rowcount:
+                counts["migrated"] += 1
+            else:
+                counts["skipped_existing"] += 1
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        target.close()
+
+    logger.info(
+        "Migrated LTM from %s to %s: %d migrated, %d already present, %d missing records",
+        index_path,
+        db_path,
+        counts["migrated"],
+        counts["skipped_existing"],
+        counts["missing_records"],
+    )
+    return counts
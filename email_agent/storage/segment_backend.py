@@ -0,0 +1,656 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..config import (
+    LTM_SEGMENT_MAX_BYTES,
+    LTM_SEGMENT_MERGE_GARBAGE_RATIO,
+    LTM_SEGMENT_REFRESH_INTERVAL_SECONDS,
+    LTM_SEGMENTS_DIR,
+)
+from ..utils.logging_utils import get_logger
+from .base import EVICTION_POLICIES, LTMBackend, compaction_report
+from .file_utils import file_lock
+
+logger = get_logger(__name__)
+
+# Record: crc32, flags, key length, value length, sequence number, write time,
+# followed by the key (UTF-8) and the value (JSON). The CRC covers everything
+# after itself, so a torn or corrupt record is detected when scanning.
+_HEADER = struct.Struct("<IBHIQd")
+# Footer entry: key length, value offset, value length, sequence number,
+# write time, record length, followed by the key
+_FOOTER_ENTRY = struct.Struct("<HQIQdI")
+# Last bytes of a sealed segment: offset of the footer record + magic
+_TRAILER = struct.Struct("<Q8s")
+_MAGIC = b"LTMSEG01"
+
+_DATA = 0
+_FOOTER = 1
+
+_SEGMENT_SUFFIX = ".seg"
+
+# Temp files from a merge that crashed are removed after this long
+ORPHAN_GRACE_SECONDS = 300.0
+
+# (key, value_offset, value_length, seq, written_at, record_length)
+_Record = Tuple[str, int, int, int, float, int]
+# (segment_id, value_offset, value_length, seq, written_at, record_length)
+_Entry = Tuple[int, int, int, int, float, int]
+
+
+def _encode_record(flags: int, key: bytes, value: bytes, seq: int, written_at: float) -> bytes:
+    body = _HEADER.pack(0, flags, len(key), len(value), seq, written_at)[4:] + key + value
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def _parse_records(buf: bytes, base: int) -> Tuple[List[_Record], int, bool]:
+    """
+    Parse consecutive records from `buf`, which was read at file offset `base`.
+
+    Returns (records, file offset after the last complete data record, sealed).
+    Stops at the first torn or corrupt record, or at the footer.
+    """
+    records: List[_Record] = []
+    view = memoryview(buf)
+    pos = 0
+    while pos + _HEADER.size <= len(buf):
+        crc, flags, key_len, value_len, seq, written_at = _HEADER.unpack_from(buf, pos)
+        end = pos + _HEADER.size + key_len + value_len
+        if end > len(buf) or zlib.crc32(view[pos + 4 : end]) != crc:
+            break
+        if flags == _FOOTER:
+            return records, base + pos, True
+        key_start = pos + _HEADER.size
+        key = bytes(view[key_start : key_start + key_len]).decode("utf-8")
+        records.append((key, base + key_start + key_len, value_len, seq, written_at, end - pos))
+        pos = end
+    return records, base + pos, False
+
+
+def _encode_footer(records: List[_Record], seq: int) -> bytes:
+    parts = []
+    for key, value_offset, value_len, record_seq, written_at, record_len in records:
+        key_bytes = key.encode("utf-8")
+        parts.append(
+            _FOOTER_ENTRY.pack(len(key_bytes), value_offset, value_len, record_seq, written_at, record_len)
+        )
+        parts.append(key_bytes)
+    return _encode_record(_FOOTER, b"", b"".join(parts), seq, time.time())
+
+
+def _parse_footer(value: bytes) -> List[_Record]:
+    records: List[_Record] = []
+    pos = 0
+    while pos < len(value):
+        key_len, value_offset, value_len, seq, written_at, record_len = _FOOTER_ENTRY.unpack_from(value, pos)
+        pos += _FOOTER_ENTRY.size
+        key = value[pos : pos + key_len].decode("utf-8")
+        pos += key_len
+        records.append((key, value_offset, value_len, seq, written_at, record_len))
+    return records
+
+
+class _Segment:
+    """
+    One segment file. Read with pread() while it is still being appended to,
+    and through a read-only mmap once it is sealed.
+    """
+
+    def __init__(self, segment_id: int, path: Path) -> None:
+        self.segment_id = segment_id
+        self.path = path
+        self.fd = os.open(str(path), os.O_RDONLY)
+        self.mm: Optional[mmap.mmap] = None
+        self.sealed = False
+        # End of the last indexed data record (the footer's offset once sealed)
+        self.scanned_to = 0
+        # Readers currently using the fd / mmap, and whether the segment was
+        # dropped (it is closed once both say so; see SegmentLogBackend._read)
+        self.pins = 0
+        self.retired = False
+
+    def size(self) -> int:
+        return os.fstat(self.fd).st_size
+
+    def read(self, offset: int, length: int) -> bytes:
+        mm = self.mm
+        if mm is not None:
+            return mm[offset : offset + length]
+        return os.pread(self.fd, length, offset)
+
+    def seal(self) -> None:
+        self.sealed = True
+        if self.mm is None and self.size() > 0:
+            self.mm = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        os.close(self.fd)
+
+
+class SegmentLogBackend(LTMBackend):
+    """
+    LTM stored as an append-only log split into size-capped segment files.
+
+    - store() appends records to the active segment with a single write()
+    - each process keeps an in-memory index task_key -> (segment, offset),
+      so lookup() is one dict access plus one pread (or an mmap slice for
+      sealed segments); no per-record files, no JSON index to parse
+    - a sealed segment ends with a footer listing its records, so startup
+      reads footers instead of scanning data; only the active segment is
+      scanned (and a torn tail from a crash is cut off on the next write)
+    - superseded records are dropped by merging segments, in a background
+      thread once enough of the log is garbage, or through compact()
+
+    Appends, sealing and merges take a cross-process file lock. Other
+    workers pick up new records and merged segments on a miss, at most
+    once per refresh_interval seconds (listing the directory on every miss
+    would dominate the cost of a cold lookup).
+    Every record has a sequence number and the highest one wins, so
+    segments can be replayed in any order.
+    """
+
+    name = "segment"
+
+    def __init__(
+        self,
+        segments_dir: Path = LTM_SEGMENTS_DIR,
+        max_segment_bytes: int = LTM_SEGMENT_MAX_BYTES,
+        merge_garbage_ratio: float = LTM_SEGMENT_MERGE_GARBAGE_RATIO,
+        refresh_interval: float = LTM_SEGMENT_REFRESH_INTERVAL_SECONDS,
+    ) -> None:
+        self.segments_dir = Path(segments_dir)
+        self.lock_path = self.segments_dir / "segments.lock"
+        self.max_segment_bytes = max_segment_bytes
+        self.merge_garbage_ratio = merge_garbage_ratio
+        self.refresh_interval = refresh_interval
+        self.orphan_grace_seconds = ORPHAN_GRACE_SECONDS
+        # Never held while waiting for the file lock (merges take the file lock first)
+        self._lock = threading.RLock()
+        self._segments: Dict[int, _Segment] = {}
+        # Guards segment pins: lookups do not take self._lock, so a segment
+        # dropped by a refresh is closed by whoever lets go of it last
+        self._pin_lock = threading.Lock()
+        self._index: Dict[str, _Entry] = {}
+        self._live_bytes = 0
+        self._max_seq = 0
+        self._loaded = False
+        self._next_miss_refresh = 0.0
+        self._merge_thread: Optional[threading.Thread] = None
+        # Guards the two flags below: a merge is running / was asked for again
+        self._merge_state_lock = threading.Lock()
+        self._merging = False
+        self._merge_pending = False
+
+    # ---- index maintenance -------------------------------------------------
+
+    def _segment_path(self, segment_id: int) -> Path:
+        return self.segments_dir / f"{segment_id:08d}{_SEGMENT_SUFFIX}"
+
+    def _apply(self, segment_id: int, records: List[_Record]) -> None:
+        index = self._index
+        for key, value_offset, value_len, seq, written_at, record_len in records:
+            current = index.get(key)
+            if current is not None and current[3] > seq:
+                continue
+            if current is not None:
+                self._live_bytes -= current[5]
+            index[key] = (segment_id, value_offset, value_len, seq, written_at, record_len)
+            self._live_bytes += record_len
+            if seq > self._max_seq:
+                self._max_seq = seq
+
+    def _load_footer(self, segment: _Segment) -> bool:
+        """
+        Index a sealed segment from its footer. Returns False if it has none.
+        """
+        size = segment.size()
+        if size < _TRAILER.size:
+            return False
+        footer_offset, magic = _TRAILER.unpack(os.pread(segment.fd, _TRAILER.size, size - _TRAILER.size))
+        if magic != _MAGIC or footer_offset + _HEADER.size > size:
+            return False
+        footer = os.pread(segment.fd, size - _TRAILER.size - footer_offset, footer_offset)
+        crc, flags, key_len, value_len, _, _ = _HEADER.unpack_from(footer, 0)
+        end = _HEADER.size + key_len + value_len
+        if flags != _FOOTER or end > len(footer) or zlib.crc32(memoryview(footer)[4:end]) != crc:
+            return False
+        self._apply(segment.segment_id, _parse_footer(footer[_HEADER.size + key_len : end]))
+        segment.scanned_to = footer_offset
+        segment.seal()
+        return True
+
+    def _scan_tail(self, segment: _Segment) -> None:
+        """
+        Index records appended to an unsealed segment since the last scan.
+        """
+        size = segment.size()
+        if size <= segment.scanned_to:
+            return
+        buf = os.pread(segment.fd, size - segment.scanned_to, segment.scanned_to)
+        records, end, sealed = _parse_records(buf, segment.scanned_to)
+        self._apply(segment.segment_id, records)
+        segment.scanned_to = end
+        if sealed:
+            segment.seal()
+
+    def _refresh(self) -> None:
+        """
+        Catch up with the segment directory: index new segments and records
+        appended by other processes, and forget segments removed by a merge.
+        """
+        with self._lock:
+            self.segments_dir.mkdir(parents=True, exist_ok=True)
+            on_disk = set()
+            for name in os.listdir(self.segments_dir):
+                if name.endswith(_SEGMENT_SUFFIX) and name[: -len(_SEGMENT_SUFFIX)].isdigit():
+                    on_disk.add(int(name[: -len(_SEGMENT_SUFFIX)]))
+
+            for segment_id in sorted(on_disk):
+                segment = self._segments.get(segment_id)
+                if segment is None:
+                    try:
+                        segment = _Segment(segment_id, self._segment_path(segment_id))
+                    except FileNotFoundError:
+                        continue  # merged away since listdir()
+                    self._segments[segment_id] = segment
+                    if self._load_footer(segment):
+                        continue
+                if not segment.sealed:
+                    self._scan_tail(segment)
+
+            # Segments removed by a merge: their live records were loaded above
+            # from the merged segments, anything still pointing at them was dropped
+            removed = [segment_id for segment_id in self._segments if segment_id not in on_disk]
+            if removed:
+                gone = set(removed)
+                for key in [k for k, entry in self._index.items() if entry[0] in gone]:
+                    self._live_bytes -= self._index.pop(key)[5]
+            for segment_id in removed:
+                self._retire(self._segments.pop(segment_id))
+            self._loaded = True
+            self._next_miss_refresh = time.monotonic() + self.refresh_interval
+
+    def _retire(self, segment: _Segment) -> None:
+        """
+        Close a segment that is no longer indexed, or leave that to the last
+        reader still using it.
+        """
+        with self._pin_lock:
+            segment.retired = True
+            if segment.pins:
+                return
+        segment.close()
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self._refresh()
+
+    def _refresh_on_miss(self) -> bool:
+        """
+        Refresh after a lookup miss unless the last refresh was less than
+        refresh_interval ago. Returns whether it refreshed.
+        """
+        if time.monotonic() < self._next_miss_refresh:
+            return False
+        self._refresh()
+        return True
+
+    # ---- writing -----------------------------------------------------------
+
+    def _seal(self, segment: _Segment) -> None:
+        """
+        Append the footer + trailer to `segment` (file lock must be held).
+        """
+        size = segment.size()
+        records, end, sealed = _parse_records(os.pread(segment.fd, size, 0), 0)
+        if sealed:
+            segment.seal()
+            return
+        footer = _encode_footer(records, self._max_seq)
+        with open(segment.path, "r+b") as handle:
+            handle.truncate(end)
+            handle.seek(end)
+            handle.write(footer + _TRAILER.pack(end, _MAGIC))
+            handle.flush()
+            os.fsync(handle.fileno())
+        segment.scanned_to = end
+        segment.seal()
+
+    def _active_segment(self) -> _Segment:
+        """
+        Return the segment to append to (file lock must be held), sealing a
+        full one and starting a new one as needed.
+        """
+        for segment in self._segments.values():
+            if segment.sealed:
+                continue
+            if segment.scanned_to >= self.max_segment_bytes:
+                self._seal(segment)
+                continue
+            if segment.size() > segment.scanned_to:
+                # Torn tail left by a writer that crashed mid-append
+                os.truncate(segment.path, segment.scanned_to)
+            return segment
+
+        segment_id = max(self._segments, default=0) + 1
+        path = self._segment_path(segment_id)
+        os.close(os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+        segment = _Segment(segment_id, path)
+        self._segments[segment_id] = segment
+        return segment
+
+    def store(self, task_key: str, result: Dict[str, Any]) -> None:
+        self.store_many([(task_key, result)])
+
+    def store_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        if not items:
+            return
+        sealed_one = False
+        try:
+            with file_lock(self.lock_path), self._lock:
+                self._refresh()
+                segment = self._active_segment()
+                now = time.time()
+                offset = segment.scanned_to
+                chunks: List[bytes] = []
+                records: List[_Record] = []
+                for task_key, result in items:
+                    key_bytes = task_key.encode("utf-8")
+                    value = json.dumps(result).encode("utf-8")
+                    self._max_seq += 1
+                    record = _encode_record(_DATA, key_bytes, value, self._max_seq, now)
+                    value_offset = offset + _HEADER.size + len(key_bytes)
+                    records.append((task_key, value_offset, len(value), self._max_seq, now, len(record)))
+                    chunks.append(record)
+                    offset += len(record)
+
+                fd = os.open(str(segment.path), os.O_WRONLY | os.O_APPEND)
+                try:
+                    data = memoryview(b"".join(chunks))
+                    while data:
+                        data = data[os.write(fd, data) :]
+                finally:
+                    os.close(fd)
+
+                self._apply(segment.segment_id, records)
+                segment.scanned_to = offset
+                if offset >= self.max_segment_bytes:
+                    self._seal(segment)
+                    sealed_one = True
+        except Exception:
+            logger.exception("Failed to append %d LTM records to %s", len(items), self.segments_dir)
+            return
+
+        if sealed_one:
+            self._maybe_merge()
+
+    # ---- reading -----------------------------------------------------------
+
+    def _read(self, task_key: str) -> Optional[bytes]:
+        # Pin the segment so that a concurrent refresh cannot close its fd
+        # (which a newly opened file could then reuse) during the read
+        with self._pin_lock:
+            entry = self._index.get(task_key)
+            if entry is None:
+                return None
+            segment = self._segments.get(entry[0])
+            if segment is None or segment.retired:
+                return None
+            segment.pins += 1
+        try:
+            return segment.read(entry[1], entry[2])
+        finally:
+            with self._pin_lock:
+                segment.pins -= 1
+                last_reader = segment.retired and not segment.pins
+            if last_reader:
+                segment.close()
+
+    def lookup(self, task_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            self._ensure_loaded()
+            raw = self._read(task_key)
+            if raw is None and self._refresh_on_miss():
+                # Another worker may have written it since we last looked
+                raw = self._read(task_key)
+        except Exception:
+            logger.exception("Failed to read LTM record from %s", self.segments_dir)
+            return None
+        if raw is None:
+            return None
+
+        try:
+            return json.loads(raw)
+        except Exception:
+            logger.exception("Corrupt LTM record in %s", self.segments_dir)
+            return None
+
+    def lookup_many(self, task_keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(dict.fromkeys(task_keys))
+        found: Dict[str, Dict[str, Any]] = {}
+        try:
+            self._ensure_loaded()
+            if any(key not in self._index for key in keys):
+                self._refresh_on_miss()
+            for task_key in keys:
+                raw = self._read(task_key)
+                if raw is None:
+                    continue
+                try:
+                    found[task_key] = json.loads(raw)
+                except Exception:
+                    logger.exception("Corrupt LTM record in %s", self.segments_dir)
+        except Exception:
+            logger.exception("Failed to bulk-read LTM records from %s", self.segments_dir)
+        return found
+
+    def count(self) -> int:
+        self._refresh()
+        return len(self._index)
+
+    # ---- merging -----------------------------------------------------------
+
+    def disk_bytes(self) -> int:
+        """
+        Size on disk of all segment files (including leftover merge temp files).
+        """
+        if not self.segments_dir.exists():
+            return 0
+        return sum(
+            entry.stat().st_size
+            for entry in os.scandir(self.segments_dir)
+            if entry.is_file() and entry.name != self.lock_path.name
+        )
+
+    def garbage_ratio(self) -> float:
+        """
+        Fraction of the record bytes that are superseded, as seen by this process.
+        """
+        with self._lock:
+            total = sum(segment.scanned_to for segment in self._segments.values())
+            return 1.0 - self._live_bytes / total if total else 0.0
+
+    def _maybe_merge(self) -> None:
+        if self.merge_garbage_ratio <= 0 or self.garbage_ratio() < self.merge_garbage_ratio:
+            return
+        with self._merge_state_lock:
+            # A running merge re-checks before it exits, so this write is not missed
+            self._merge_pending = True
+            if self._merging:
+                return
+            self._merging = True
+            self._merge_thread = threading.Thread(
+                target=self._background_merge, name="ltm-segment-merge", daemon=True
+            )
+            self._merge_thread.start()
+
+    def _background_merge(self) -> None:
+        while True:
+            with self._merge_state_lock:
+                if not self._merge_pending:
+                    self._merging = False
+                    return
+                self._merge_pending = False
+            try:
+                # Another worker may have merged already; re-check under the lock
+                with file_lock(self.lock_path):
+                    self._refresh()
+                    if self.garbage_ratio() < self.merge_garbage_ratio:
+                        continue
+                self.compact()
+                # Writes that landed while merging may already need another pass
+                if self.garbage_ratio() >= self.merge_garbage_ratio:
+                    with self._merge_state_lock:
+                        self._merge_pending = True
+            except Exception:
+                logger.exception("Background merge of LTM segments failed")
+
+    def _write_merged(self, live: List[Tuple[str, _Entry]], first_id: int) -> List[Path]:
+        """
+        Copy the live records into new sealed segments (as temp files).
+        Records are copied verbatim, keeping their sequence numbers.
+        """
+        written: List[Path] = []
+        segment_id = first_id
+        handle = None
+        records: List[_Record] = []
+        offset = 0
+
+        def finish() -> None:
+            footer_offset = offset
+            handle.write(_encode_footer(records, self._max_seq))
+            handle.write(_TRAILER.pack(footer_offset, _MAGIC))
+            handle.flush()
+            os.fsync(handle.fileno())
+            handle.close()
+
+        for key, entry in live:
+            source_id, value_offset, value_len, seq, written_at, record_len = entry
+            header_and_key = record_len - value_len
+            data = self._segments[source_id].read(value_offset - header_and_key, record_len)
+            if handle is not None and offset + record_len > self.max_segment_bytes:
+                finish()
+                handle = None
+            if handle is None:
+                path = self.segments_dir / f".{segment_id:08d}{_SEGMENT_SUFFIX}.merge.tmp"
+                handle = open(path, "wb")
+                written.append(path)
+                segment_id += 1
+                records = []
+                offset = 0
+            handle.write(data)
+            records.append((key, offset + header_and_key, value_len, seq, written_at, record_len))
+            offset += record_len
+        if handle is not None:
+            finish()
+        return written
+
+    def compact(
+        self,
+        max_entries: int = 0,
+        max_bytes: int = 0,
+        max_age_seconds: float = 0.0,
+        policy: str = "lru",
+        vacuum: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Merge all segments into new ones that only hold the live records,
+        dropping superseded, expired and evicted ones, then delete the old
+        segments. Appends from other workers wait for the merge to finish;
+        lookups do not.
+
+        Access is not tracked here, so both "lru" and "lfu" evict the
+        entries written longest ago. `vacuum` has no meaning for this backend.
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown LTM eviction policy: {policy!r}")
+        if policy == "lfu":
+            logger.warning("The segment LTM backend does not count hits; evicting oldest entries instead.")
+
+        report = compaction_report(self.name)
+        now = time.time()
+
+        with file_lock(self.lock_path):
+            with self._lock:
+                self._refresh()
+                report["disk_bytes_before"] = self.disk_bytes()
+                for segment in list(self._segments.values()):
+                    if not segment.sealed and segment.scanned_to > 0:
+                        self._seal(segment)
+                sources = [segment for segment in self._segments.values() if segment.sealed]
+                source_ids = {segment.segment_id for segment in sources}
+                live = [(key, entry) for key, entry in self._index.items() if entry[0] in source_ids]
+                next_id = max(self._segments, default=0) + 1
+
+            # Leftover temp files from a merge that crashed
+            for entry in os.scandir(self.segments_dir):
+                if entry.name.endswith(".tmp") and now - entry.stat().st_mtime > self.orphan_grace_seconds:
+                    os.unlink(entry.path)
+                    report["orphans_removed"] += 1
+
+            if max_age_seconds > 0:
+                cutoff = now - max_age_seconds
+                kept = [(key, entry) for key, entry in live if entry[4] >= cutoff]
+                report["expired"] = len(live) - len(kept)
+                report["payload_bytes_evicted"] += sum(e[2] for _, e in live if e[4] < cutoff)
+                live = kept
+
+            payload_bytes = sum(entry[2] for _, entry in live)
+            excess_entries = max(0, len(live) - max_entries) if max_entries > 0 else 0
+            excess_bytes = max(0, payload_bytes - max_bytes) if max_bytes > 0 else 0
+            evicted = 0
+            freed = 0
+            if excess_entries or excess_bytes:
+                live.sort(key=lambda item: item[1][4])
+                for _, entry in live:
+                    if evicted >= excess_entries and freed >= excess_bytes:
+                        break
+                    evicted += 1
+                    freed += entry[2]
+                live = live[evicted:]
+            report["evicted"] = evicted
+            report["payload_bytes_evicted"] += freed
+            report["entries"] = len(live)
+            report["payload_bytes"] = payload_bytes - freed
+
+            # Sequential reads: copy in on-disk order
+            live.sort(key=lambda item: (item[1][0], item[1][1]))
+            temp_paths = self._write_merged(live, next_id)
+
+            with self._lock:
+                for temp_path in temp_paths:
+                    final_name = temp_path.name[1:].split(".merge.tmp")[0]
+                    os.replace(temp_path, self.segments_dir / final_name)
+                for segment in sources:
+                    os.unlink(segment.path)
+                self._refresh()
+
+            report["disk_bytes_after"] = self.disk_bytes()
+
+        report["bytes_reclaimed"] = max(0, report["disk_bytes_before"] - report["disk_bytes_after"])
+        logger.info(
+            "Merged %d LTM segments into %d (%d live records)",
+            len(sources),
+            len(temp_paths),
+            len(live),
+        )
+        return report
+
+    def close(self) -> None:
+        with self._lock:
+            for segment in self._segments.values():
+                self._retire(segment)
+            self._segments = {}
+            self._index = {}
+            self._live_bytes = 0
+            self._loaded = False
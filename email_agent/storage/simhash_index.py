@@ -0,0 +1,256 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from ..config import LTM_NEAR_DUP_DB_PATH, LTM_NEAR_DUP_THRESHOLD
+from ..simhash import band_count, bands, similarity
+from ..utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS near_signatures (
+        task_key  TEXT PRIMARY KEY,
+        scope     TEXT NOT NULL,
+        signature INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS near_bands (
+        scope    TEXT NOT NULL,
+        band     INTEGER NOT NULL,
+        bucket   INTEGER NOT NULL,
+        task_key TEXT NOT NULL,
+        PRIMARY KEY (scope, band, bucket, task_key)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS near_meta (
+        name  TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    ) WITHOUT ROWID
+    """,
+)
+
+
+def _candidates_query(band_total: int) -> str:
+    # One primary-key range lookup per band; keys sharing the most bands
+    # first, ties by key, so the LIMIT always keeps the same candidates
+    return (
+        "SELECT s.task_key, s.signature FROM ("
+        "SELECT task_key, COUNT(*) AS shared FROM ("
+        + " UNION ALL ".join(
+            ["SELECT task_key FROM near_bands WHERE scope = ? AND band = ? AND bucket = ?"] * band_total
+        )
+        + ") GROUP BY task_key ORDER BY shared DESC, task_key LIMIT ?"
+        ") AS c JOIN near_signatures AS s ON s.task_key = c.task_key ORDER BY c.shared DESC, s.task_key"
+    )
+
+# Popular templates fill the same buckets; compare at most this many candidates
+MAX_CANDIDATES = 512
+
+
+def _to_signed(signature: int) -> int:
+    # SQLite integers are signed 64-bit
+    return signature - (1 << 64) if signature >= (1 << 63) else signature
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class SimHashIndex:
+    """
+    Banded index of SimHash signatures (see email_agent/simhash.py) stored
+    in its own SQLite database, next to whichever LTM backend is active.
+
+    Each signature is filed under one (band, bucket) row per band, all
+    within a `scope` (everything besides the text that must match exactly,
+    e.g. the intent and model version). A query fetches the signatures
+    sharing at least one bucket and returns the most similar one above the
+    threshold.
+
+    The number of bands follows `threshold` (see simhash.band_count), so
+    queries at that threshold or above miss nothing; lower thresholds only
+    find what shares a band. If the band count changes, the band rows are
+    rebuilt from the stored signatures when the index is opened.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = LTM_NEAR_DUP_DB_PATH,
+        busy_timeout_ms: int = 5000,
+        threshold: float = LTM_NEAR_DUP_THRESHOLD,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.bands = band_count(threshold)
+        self._candidates = _candidates_query(self.bands)
+        self._local = threading.local()
+        # Every connection opened by any thread, as (pid, connection)
+        self._connections: List[Tuple[int, sqlite3.Connection]] = []
+        self._connections_lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection, opening it if needed (re-opened after a fork).
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=self.busy_timeout_ms / 1000.0,
+            isolation_level=None,
+            check_same_thread=False,  # so close() can close it from any thread
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        self._check_band_layout(conn)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        with self._connections_lock:
+            self._connections.append((self._local.pid, conn))
+        return conn
+
+    def _band_rows(self, task_key: str, scope: str, signature: int) -> List[Tuple[str, int, int, str]]:
+        return [(scope, band, bucket, task_key) for band, bucket in enumerate(bands(signature, self.bands))]
+
+    def _filed_band_rows(self, conn: sqlite3.Connection, task_key: str) -> List[Tuple[str, int, int, str]]:
+        row = conn.execute(
+            "SELECT scope, signature FROM near_signatures WHERE task_key = ?", (task_key,)
+        ).fetchone()
+        return [] if row is None else self._band_rows(task_key, row[0], _to_unsigned(row[1]))
+
+    def _check_band_layout(self, conn: sqlite3.Connection) -> None:
+        """
+        Re-file every signature if the index was built with another band count.
+        """
+        row = conn.execute("SELECT value FROM near_meta WHERE name = 'bands'").fetchone()
+        if row is not None and int(row[0]) == self.bands:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM near_meta WHERE name = 'bands'").fetchone()
+            if row is None or int(row[0]) != self.bands:
+                conn.execute("DELETE FROM near_bands")
+                band_rows = []
+                for task_key, scope, value in conn.execute(
+                    "SELECT task_key, scope, signature FROM near_signatures"
+                ).fetchall():
+                    band_rows.extend(self._band_rows(task_key, scope, _to_unsigned(value)))
+                conn.executemany("INSERT INTO near_bands VALUES (?, ?, ?, ?)", band_rows)
+                conn.execute(
+                    "INSERT OR REPLACE INTO near_meta (name, value) VALUES ('bands', ?)", (str(self.bands),)
+                )
+                if band_rows:
+                    logger.info("Re-filed near-duplicate signatures under %d bands", self.bands)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add_many(self, items: List[Tuple[str, str, int]]) -> None:
+        """
+        File (task_key, scope, signature) triples in one transaction,
+        replacing any earlier signature of the same key. Never raises.
+        """
+        if not items:
+            return
+        band_rows = []
+        for task_key, scope, signature in items:
+            band_rows.extend(self._band_rows(task_key, scope, signature))
+        try:
+            conn = self.connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # The old signature's buckets would keep pointing at the key
+                stale_rows = []
+                for task_key in dict.fromkeys(task_key for task_key, _, _ in items):
+                    stale_rows.extend(self._filed_band_rows(conn, task_key))
+                conn.executemany(
+                    "DELETE FROM near_bands WHERE scope = ? AND band = ? AND bucket = ? AND task_key = ?",
+                    stale_rows,
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO near_signatures (task_key, scope, signature) VALUES (?, ?, ?)",
+                    [(task_key, scope, _to_signed(signature)) for task_key, scope, signature in items],
+                )
+                conn.executemany("INSERT OR IGNORE INTO near_bands VALUES (?, ?, ?, ?)", band_rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception:
+            logger.exception("Failed to store %d near-duplicate signatures in %s", len(items), self.db_path)
+
+    def add(self, task_key: str, scope: str, signature: int) -> None:
+        self.add_many([(task_key, scope, signature)])
+
+    def candidates(self, scope: str, signature: int, threshold: float) -> List[Tuple[str, float]]:
+        """
+        Signatures in `scope` at least `threshold` similar, most similar first.
+        """
+        params: List[object] = []
+        for band, bucket in enumerate(bands(signature, self.bands)):
+            params.extend((scope, band, bucket))
+        params.append(MAX_CANDIDATES)
+        try:
+            rows = self.connection().execute(self._candidates, params).fetchall()
+        except Exception:
+            logger.exception("Failed to query near-duplicate signatures in %s", self.db_path)
+            return []
+
+        scored = [(task_key, similarity(signature, _to_unsigned(value))) for task_key, value in rows]
+        scored = [(task_key, score) for task_key, score in scored if score >= threshold]
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored
+
+    def nearest(self, scope: str, signature: int, threshold: float) -> Optional[Tuple[str, float]]:
+        found = self.candidates(scope, signature, threshold)
+        return found[0] if found else None
+
+    def remove(self, task_key: str) -> None:
+        """
+        Forget a signature (e.g. when its LTM entry has been evicted).
+        """
+        try:
+            conn = self.connection()
+            band_rows = self._filed_band_rows(conn, task_key)
+            if not band_rows:
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "DELETE FROM near_bands WHERE scope = ? AND band = ? AND bucket = ? AND task_key = ?",
+                    band_rows,
+                )
+                conn.execute("DELETE FROM near_signatures WHERE task_key = ?", (task_key,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception:
+            logger.exception("Failed to remove near-duplicate signature from %s", self.db_path)
+
+    def count(self) -> int:
+        row = self.connection().execute("SELECT COUNT(*) FROM near_signatures").fetchone()
+        return int(row[0])
+
+    def close(self) -> None:
+        """
+        Close every thread's connection opened by this process.
+        """
+        pid = os.getpid()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for owner, conn in connections:
+            if owner == pid:
+                conn.close()
@@ -0,0 +1,330 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..config import LTM_DB_PATH, LTM_TRACK_ACCESS
+from ..utils.logging_utils import get_logger
+from .base import EVICTION_POLICIES, LTMBackend, compaction_report
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ltm_records (
+    task_key   TEXT PRIMARY KEY,
+    result     TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_access REAL NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID
+"""
+
+# Columns added after the first release, with the statement that backfills
+# them on databases created before they existed
+_ADDED_COLUMNS = {
+    "last_access": "REAL NOT NULL DEFAULT 0",
+    "hits": "INTEGER NOT NULL DEFAULT 0",
+    "size": "INTEGER NOT NULL DEFAULT 0",
+}
+_BACKFILL = (
+    "UPDATE ltm_records SET last_access = updated_at, size = length(result) "
+    "WHERE size = 0"
+)
+
+_UPSERT = (
+    "INSERT INTO ltm_records (task_key, result, created_at, updated_at, last_access, size) "
+    "VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(task_key) DO UPDATE SET "
+    "result = excluded.result, updated_at = excluded.updated_at, "
+    "last_access = excluded.last_access, size = excluded.size"
+)
+
+# Eviction order: first rows in this order are dropped first
+_EVICTION_ORDER = {
+    "lru": "last_access ASC",
+    "lfu": "hits ASC, last_access ASC",
+}
+
+# Stay well below SQLite's bound-parameter limit for IN (...) queries
+_MAX_SQL_PARAMS = 500
+
+
+class SQLiteBackend(LTMBackend):
+    """
+    LTM stored in a single SQLite database running in WAL mode.
+
+    - task_key is the primary key, so point reads and upserts are O(log n)
+    - results are stored inline as JSON text (no file per record)
+    - WAL lets readers in other gunicorn workers proceed while one writes
+
+    Connections are opened lazily, one per thread, and re-opened after a
+    fork so that a pre-forked worker never reuses its parent's handle.
+
+    With `track_access` every backend hit also bumps last_access/hits,
+    which compact() uses for LRU/LFU eviction. Hits served by the
+    in-process front cache are not counted.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        db_path: Path = LTM_DB_PATH,
+        busy_timeout_ms: int = 5000,
+        track_access: bool = LTM_TRACK_ACCESS,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.track_access = track_access
+        self._local = threading.local()
+        # Every connection opened by any thread, as (pid, connection), so
+        # close() can close them all and not only the caller's
+        self._connections: List[Tuple[int, sqlite3.Connection]] = []
+        self._connections_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=self.busy_timeout_ms / 1000.0,
+            isolation_level=None,  # autocommit; explicit BEGIN for batches
+            # Only its own thread uses it, but close() may run on another one
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        if not self._schema_ready:
+            self._ensure_schema(conn)
+            self._schema_ready = True
+        return conn
+
+    @staticmethod
+    def _ensure_schema(conn: sqlite3.Connection) -> None:
+        conn.execute(_SCHEMA)
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(ltm_records)")}
+        missing = [name for name in _ADDED_COLUMNS if name not in existing]
+        if not missing:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock: another worker may have won the race
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(ltm_records)")}
+            for name in _ADDED_COLUMNS:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE ltm_records ADD COLUMN {name} {_ADDED_COLUMNS[name]}")
+            conn.execute(_BACKFILL)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _touch(self, conn: sqlite3.Connection, task_keys: List[str]) -> None:
+        """
+        Record an access to `task_keys` (for LRU/LFU eviction).
+        """
+        if not self.track_access or not task_keys:
+            return
+        now = time.time()
+        try:
+            for start in range(0, len(task_keys), _MAX_SQL_PARAMS):
+                chunk = task_keys[start : start + _MAX_SQL_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                conn.execute(
+                    "UPDATE ltm_records SET last_access = ?, hits = hits + 1 "
+                    f"WHERE task_key IN ({placeholders})",
+                    [now, *chunk],
+                )
+        except Exception:
+            logger.warning("Failed to record LTM access in %s", self.db_path, exc_info=True)
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Return this thread's connection, opening it if needed.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = self._connect()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        with self._connections_lock:
+            self._connections.append((self._local.pid, conn))
+        return conn
+
+    def lookup(self, task_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            conn = self.connection()
+            row = conn.execute(
+                "SELECT result FROM ltm_records WHERE task_key = ?", (task_key,)
+            ).fetchone()
+        except Exception:
+            logger.exception("Failed to read LTM record from %s", self.db_path)
+            return None
+        if row is None:
+            return None
+        self._touch(conn, [task_key])
+
+        try:
+            return json.loads(row[0])
+        except Exception:
+            logger.exception("Corrupt LTM record in %s", self.db_path)
+            return None
+
+    def store(self, task_key: str, result: Dict[str, Any]) -> None:
+        now = time.time()
+        text = json.dumps(result)
+        try:
+            self.connection().execute(_UPSERT, (task_key, text, now, now, now, len(text)))
+        except Exception:
+            logger.exception("Failed to write LTM record to %s", self.db_path)
+
+    def lookup_many(self, task_keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        keys = list(dict.fromkeys(task_keys))
+        found: Dict[str, Dict[str, Any]] = {}
+        try:
+            conn = self.connection()
+            for start in range(0, len(keys), _MAX_SQL_PARAMS):
+                chunk = keys[start : start + _MAX_SQL_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT task_key, result FROM ltm_records WHERE task_key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for task_key, text in rows:
+                    try:
+                        found[task_key] = json.loads(text)
+                    except Exception:
+                        logger.exception("Corrupt LTM record in %s", self.db_path)
+            self._touch(conn, list(found))
+        except Exception:
+            logger.exception("Failed to bulk-read LTM records from %s", self.db_path)
+        return found
+
+    def store_many(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for task_key, result in items:
+            text = json.dumps(result)
+            rows.append((task_key, text, now, now, now, len(text)))
+        try:
+            conn = self.connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(_UPSERT, rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except Exception:
+            logger.exception("Failed to bulk-write %d LTM records to %s", len(rows), self.db_path)
+
+    def count(self) -> int:
+        row = self.connection().execute("SELECT COUNT(*) FROM ltm_records").fetchone()
+        return int(row[0])
+
+    def disk_bytes(self) -> int:
+        """
+        Size on disk of the database, including its WAL and shared-memory files.
+        """
+        total = 0
+        for suffix in ("", "-wal", "-shm"):
+            path = self.db_path.with_name(self.db_path.name + suffix)
+            if path.exists():
+                total += path.stat().st_size
+        return total
+
+    def compact(
+        self,
+        max_entries: int = 0,
+        max_bytes: int = 0,
+        max_age_seconds: float = 0.0,
+        policy: str = "lru",
+        vacuum: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Expire and evict rows in one write transaction, then checkpoint the
+        WAL. Freed pages are reused by later writes; pass `vacuum=True` to
+        also shrink the database file (rewrites the whole file).
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown LTM eviction policy: {policy!r}")
+
+        report = compaction_report(self.name)
+        report["disk_bytes_before"] = self.disk_bytes()
+
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if max_age_seconds > 0:
+                cutoff = time.time() - max_age_seconds
+                expired, expired_bytes = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ltm_records WHERE updated_at < ?",
+                    (cutoff,),
+                ).fetchone()
+                conn.execute("DELETE FROM ltm_records WHERE updated_at < ?", (cutoff,))
+                report["expired"] = expired
+                report["payload_bytes_evicted"] += expired_bytes
+
+            entries, payload_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ltm_records"
+            ).fetchone()
+            excess_entries = max(0, entries - max_entries) if max_entries > 0 else 0
+            excess_bytes = max(0, payload_bytes - max_bytes) if max_bytes > 0 else 0
+
+            victims: List[str] = []
+            freed = 0
+            if excess_entries or excess_bytes:
+                cursor = conn.execute(
+                    f"SELECT task_key, size FROM ltm_records ORDER BY {_EVICTION_ORDER[policy]}"
+                )
+                for task_key, size in cursor:
+                    if len(victims) >= excess_entries and freed >= excess_bytes:
+                        break
+                    victims.append(task_key)
+                    freed += size
+                cursor.close()
+                for start in range(0, len(victims), _MAX_SQL_PARAMS):
+                    chunk = victims[start : start + _MAX_SQL_PARAMS]
+                    placeholders = ",".join("?" * len(chunk))
+                    conn.execute(f"DELETE FROM ltm_records WHERE task_key IN ({placeholders})", chunk)
+
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        report["evicted"] = len(victims)
+        report["payload_bytes_evicted"] += freed
+        report["entries"] = entries - len(victims)
+        report["payload_bytes"] = payload_bytes - freed
+
+        if vacuum:
+            # In WAL mode VACUUM writes the new file through the WAL, so the
+            # checkpoint below is what actually shrinks the database file
+            conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        report["disk_bytes_after"] = self.disk_bytes()
+        report["bytes_reclaimed"] = max(0, report["disk_bytes_before"] - report["disk_bytes_after"])
+        return report
+
+    def close(self) -> None:
+        """
+        Close the connections of every thread of this process (ones inherited
+        across a fork belong to the parent and are left alone).
+        """
+        pid = os.getpid()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for owner, conn in connections:
+            if owner == pid:
+                conn.close()
@@ -0,0 +1,189 @@
+"""
+Text normalization applied before the LTM key is built and before the model
+sees an email.
+
+The same email often arrives in slightly different forms: extra whitespace,
+different casing, a quoted reply chain or signature appended, or a fresh
+tracking link / ticket number / date. Each variant used to get its own
+task_key and its own LTM record. Normalizing first maps them to one key.
+
+Steps (always applied in this order; pick a subset through
+config.TEXT_NORMALIZATION):
+- quotes:     cut quoted reply chains ("On ... wrote:", "-----Original
+              Message-----", Outlook "From:/Sent:" headers, "> " lines)
+- signature:  cut the signature ("-- " delimiter, "Sent from my ...",
+              a closing "Regards,"/"Thanks," that ends the text or is
+              followed only by a name or a contact block)
+- urls:       replace links with <url>
+- emails:     replace e-mail addresses with <email>
+- ids:        replace ticket IDs ("INV-20931"), UUIDs, long hex runs and long
+              tracking codes with <id>; short codes such as "P1" or "Q3"
+              are kept
+- numbers:    replace remaining numbers (amounts, dates, times) with <num>
+- case:       lower-case everything
+- whitespace: collapse runs of whitespace into a single space
+
+normalize_text() is idempotent, so normalizing twice is harmless.
+"""
+
+import re
+from typing import Iterable, List, Optional, Tuple
+
+from .config import TEXT_NORMALIZATION
+
+STEPS = ("quotes", "signature", "urls", "emails", "ids", "numbers", "case", "whitespace")
+
+# Everything from the first reply header on is quoted history
+_REPLY_HEADER_RE = re.compile(
+    r"^\s*(?:"
+    r"On\b.{0,200}?\bwrote:\s*$"
+    r"|-{2,}\s*Original Message\s*-{2,}"
+    r"|-{2,}\s*Forwarded message\s*-{2,}"
+    r"|From:\s.*\n\s*(?:Sent|Date):\s"
+    r")",
+    re.IGNORECASE | re.MULTILINE,
+)
+_QUOTED_LINE_RE = re.compile(r"^[ \t]*>.*(?:\n|$)", re.MULTILINE)
+
+_SIGNATURE_DELIMITER_RE = re.compile(r"^-- ?$", re.MULTILINE)
+_SENT_FROM_RE = re.compile(r"^\s*Sent from my\b.*$", re.IGNORECASE | re.MULTILINE)
+_SIGN_OFF_RE = re.compile(
+    r"^\s*(?:(?:best|kind|warm|warmest)\s+)?(?:regards|wishes|thanks|thank you|cheers|sincerely|"
+    r"best|yours truly|all the best)\s*[,!.]?\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+# A sign-off only starts the signature if it ends the text, is followed by
+# nothing but a name, or by a block of at most this many lines containing
+# contact details (other lines of the block may be a name or job title)
+_SIGN_OFF_MAX_TRAILING_LINES = 4
+# "Dana", "Dana Smith", "J. R. Smith"; a job title is Title Case words
+_NAME_LINE_RE = re.compile(r"^\s*(?:[A-Z](?:[a-z'-]+|\.)\s*){1,3}$")
+_TITLE_LINE_RE = re.compile(r"^\s*(?:[A-Z][a-z'-]*|of|and|&)(?:[ \t,]+(?:[A-Z][a-z'-]*|of|and|&)){0,5}\s*$")
+_CONTACT_LINE_RE = re.compile(
+    r"@|https?://|www\.|^\s*(?:tel|phone|mobile|cell|fax)\b|^\s*\+?[\d\s().-]{7,}$",
+    re.IGNORECASE,
+)
+
+_URL_RE = re.compile(r"(?:https?://|www\.)[^\s<>\"')\]]+", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+# Ticket IDs (upper-case prefix, separator, 3+ digits), UUIDs, hex runs
+# (hashes) and long tracking codes mixing letters and digits. Short mixed
+# tokens ("P1", "Q3", "2FA", "deadline-2025") carry meaning and are kept.
+_ID_RE = re.compile(
+    r"\b[A-Z][A-Z0-9]{1,9}[-_#]\d{3,}\b"
+    r"|\b[0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}\b"
+    r"|\b[0-9a-fA-F]{12,}\b"
+    r"|\b(?=[A-Za-z0-9]*[A-Za-z])(?=[A-Za-z0-9]*\d)[A-Za-z0-9]{16,}\b"
+)
+# Numbers, including times and ordinals ("3pm", "10:30am", "May 3rd")
+_NUMBER_RE = re.compile(r"(?<![<\w])\d+(?:[.,:/-]\d+)*(?:am|pm|st|nd|rd|th)?(?![\w>])", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def parse_steps(spec: str) -> Tuple[str, ...]:
+    """
+    Parse a comma-separated step list ("all", "none" and "" are accepted)
+    into the canonical order. Raises ValueError on unknown steps.
+    """
+    spec = spec.strip().lower()
+    if spec == "all":
+        return STEPS
+    if spec in ("", "none", "off"):
+        return ()
+    wanted = {step.strip() for step in spec.split(",") if step.strip()}
+    unknown = wanted.difference(STEPS)
+    if unknown:
+        raise ValueError(f"Unknown text normalization steps: {sorted(unknown)}")
+    return tuple(step for step in STEPS if step in wanted)
+
+
+DEFAULT_STEPS = parse_steps(TEXT_NORMALIZATION)
+
+
+def _strip_quotes(text: str) -> str:
+    match = _REPLY_HEADER_RE.search(text)
+    if match and match.start() > 0:
+        text = text[: match.start()]
+    return _QUOTED_LINE_RE.sub("", text)
+
+
+def _is_signature_block(lines: List[str]) -> bool:
+    """
+    Whether the lines after a sign-off are a signature rather than more of
+    the body. Short lines alone are no evidence (a body line such as
+    "need the fix deployed asap today" is short too): it takes a lone name,
+    or contact details next to name / title lines.
+    """
+    if not lines:
+        return True
+    if len(lines) == 1 and _NAME_LINE_RE.match(lines[0]):
+        return True
+    if len(lines) > _SIGN_OFF_MAX_TRAILING_LINES:
+        return False
+    contacts = [bool(_CONTACT_LINE_RE.search(line)) for line in lines]
+    return any(contacts) and all(
+        is_contact or _TITLE_LINE_RE.match(line) for line, is_contact in zip(lines, contacts)
+    )
+
+
+def _strip_signature(text: str) -> str:
+    for pattern in (_SIGNATURE_DELIMITER_RE, _SENT_FROM_RE):
+        match = pattern.search(text)
+        if match and match.start() > 0:
+            text = text[: match.start()]
+
+    # A closing "Regards," that ends the body (see _is_signature_block).
+    # A "Thanks!" followed by more of the request is content.
+    for match in reversed(list(_SIGN_OFF_RE.finditer(text))):
+        if match.start() == 0:
+            break
+        trailing = [line for line in text[match.end() :].splitlines() if line.strip()]
+        if _is_signature_block(trailing):
+            text = text[: match.start()]
+        break
+    return text
+
+
+def normalize_text(text: Optional[str], steps: Optional[Iterable[str]] = None) -> str:
+    """
+    Return the normalized form of `text` using `steps` (default: the
+    configured steps). Never returns an empty string for non-blank input:
+    if stripping quotes/signature would remove everything, they are skipped.
+    """
+    if not text:
+        return ""
+    active = DEFAULT_STEPS if steps is None else tuple(steps)
+    if not active:
+        return text
+
+    original = text
+    if "quotes" in active:
+        text = _strip_quotes(text)
+    if "signature" in active:
+        text = _strip_signature(text)
+    if not text.strip():
+        text = original
+    if "urls" in active:
+        text = _URL_RE.sub("<url>", text)
+    if "emails" in active:
+        text = _EMAIL_RE.sub("<email>", text)
+    if "ids" in active:
+        text = _ID_RE.sub("<id>", text)
+    if "numbers" in active:
+        text = _NUMBER_RE.sub("<num>", text)
+    if "case" in active:
+        text = text.lower()
+    if "whitespace" in active:
+        text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text
+
+
+def normalization_fingerprint(steps: Optional[Iterable[str]] = None) -> str:
+    """
+    Short description of the active steps, mixed into the LTM task key so
+    results computed under different normalization settings never mix.
+    Empty when normalization is off (keys stay as before). The prefix is
+    bumped whenever a step's behaviour changes.
+    """
+    active = DEFAULT_STEPS if steps is None else tuple(steps)
+    return "norm3:" + ",".join(active) if active else ""
@@ -1,8 +1,6 @@
 # Accuracy, confusion matrix, etc.
 from typing import List, Any
 
-from sklearn.metrics import accuracy_score, classification_report
-
 from .logging_utils import get_logger
 
 logger = get_logger(__name__)
@@ -15,6 +13,9 @@ def evaluate_classifier(model: Any, X_test: List[str], y_test: List[str]) -> flo
     Returns:
         accuracy (float between 0 and 1)
     """
+    # Imported here: sklearn is a training-time dependency only
+    from sklearn.metrics import accuracy_score, classification_report
+
     y_pred = model.predict(X_test)
     acc = accuracy_score(y_test, y_pred)
     logger.info("Classification report:\n%s", classification_report(y_test, y_pred))
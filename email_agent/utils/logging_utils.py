@@ -1,31 +1,236 @@
+"""
+Logging setup for the whole package, done once by the first get_logger().
+
+- Format: one JSON object per line (EMAIL_AGENT_LOG_FORMAT=json, default)
+  or plain text. Structured fields go in extra={"fields": {...}} and become
+  JSON keys (or trailing key=value pairs in text mode).
+- Sampling: per-request lines are logged with extra=sampled(...) and only a
+  LOG_SAMPLE_RATE fraction of them is kept. Warnings and errors always are.
+- Payloads: email bodies are never logged as-is. Wrap them in Payload(text);
+  the formatter writes only their length, a short hash and at most
+  LOG_PAYLOAD_CHARS characters.
+- Non-blocking: with LOG_QUEUE the calling thread only puts the record on a
+  bounded queue; a QueueListener thread formats and writes it to stdout. If
+  the queue is full the record is dropped (see dropped_records()) instead of
+  stalling the request.
+"""
+
+import atexit
+import copy
+import hashlib
+import json
 import logging
+import os
+import queue
+import random
 import sys
-from typing import Optional
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from ..config import (
+    LOG_FORMAT,
+    LOG_LEVEL,
+    LOG_PAYLOAD_CHARS,
+    LOG_QUEUE,
+    LOG_QUEUE_SIZE,
+    LOG_SAMPLE_RATE,
+)
 
 _LOGGER_CONFIGURED = False
+_QUEUE_HANDLER: Optional["_NonBlockingQueueHandler"] = None
+_LISTENER: Optional[QueueListener] = None
+_OUTPUT_HANDLER: Optional[logging.Handler] = None
+
+
+class Payload:
+    """
+    A request payload (e.g. an email body) to mention in a log line. Hashing
+    and truncation happen when the record is formatted, i.e. off the request
+    thread when the queue is on, and not at all if the line is sampled out.
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: Optional[str]) -> None:
+        self.text = text or ""
+
+    def describe(self) -> Dict[str, Any]:
+        digest = hashlib.sha1(self.text.encode("utf-8", "replace")).hexdigest()[:12]
+        described: Dict[str, Any] = {"length": len(self.text), "sha1": digest}
+        if LOG_PAYLOAD_CHARS > 0:
+            described["preview"] = self.text[:LOG_PAYLOAD_CHARS]
+        return described
+
+    def __str__(self) -> str:
+        return " ".join(f"{key}={value!r}" for key, value in self.describe().items())
+
+
+def short_key(task_key: str, length: int = 12) -> str:
+    """
+    A task key shortened for logs ("v2:<64 hex>" -> "v2:<12 hex>").
+    """
+    prefix, sep, digest = task_key.rpartition(":")
+    return f"{prefix}{sep}{digest[:length]}"
+
+
+def sampled(**fields: Any) -> Dict[str, Any]:
+    """
+    `extra` for a per-request log line: subject to LOG_SAMPLE_RATE.
+
+        logger.info("LTM hit", extra=sampled(task_key=short_key(key)))
+    """
+    return {"sampled": True, "fields": fields}
+
+
+def _field_value(value: Any) -> Any:
+    return value.describe() if isinstance(value, Payload) else value
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a `rate` fraction of the records marked sampled (below WARNING).
+    """
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False) or record.levelno >= logging.WARNING:
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: ts, level, logger, message, the record's
+    fields and, for exceptions, the traceback.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in (getattr(record, "fields", None) or {}).items():
+            entry[key] = _field_value(value)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    The classic "[time] [level] [logger] message" line, plus key=value fields.
+    """
+
+    def __init__(self) -> None:
+        super().__init__("[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += "".join(f" {key}={_field_value(value)}" for key, value in fields.items())
+        return line
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread and drops
+    records when the queue is full.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[Any]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only what cannot wait: merge the args (they may change later) and
+        # render the traceback (it references live frames)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _start_listener() -> None:
+    global _LISTENER
+    assert _QUEUE_HANDLER is not None and _OUTPUT_HANDLER is not None
+    _QUEUE_HANDLER.queue = queue.Queue(LOG_QUEUE_SIZE)
+    _LISTENER = QueueListener(_QUEUE_HANDLER.queue, _OUTPUT_HANDLER)
+    _LISTENER.start()
+
+
+def _stop_listener() -> None:
+    """
+    Write out everything still queued (registered with atexit).
+    """
+    global _LISTENER
+    if _LISTENER is None:
+        return
+    try:
+        _LISTENER.stop()
+    except queue.Full:
+        pass
+    _LISTENER = None
+
+
+def _after_fork_in_child() -> None:
+    # The listener thread does not survive fork(); records the parent had
+    # queued are the parent's to write
+    if _LISTENER is not None:
+        _start_listener()
 
 
 def _configure_root_logger() -> None:
     """
-    Configure the root logger once with a standard format.
+    Configure the root logger once (format, sampling, queue).
     """
-    global _LOGGER_CONFIGURED
+    global _LOGGER_CONFIGURED, _OUTPUT_HANDLER, _QUEUE_HANDLER
     if _LOGGER_CONFIGURED:
         return
 
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(
-        "[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s"
-    )
-    handler.setFormatter(formatter)
+    _OUTPUT_HANDLER = logging.StreamHandler(sys.stdout)
+    _OUTPUT_HANDLER.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    if LOG_QUEUE:
+        _QUEUE_HANDLER = _NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        handler: logging.Handler = _QUEUE_HANDLER
+        _start_listener()
+        atexit.register(_stop_listener)
+    else:
+        handler = _OUTPUT_HANDLER
+    handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
 
     root = logging.getLogger()
-    root.setLevel(logging.INFO)
+    root.setLevel(LOG_LEVEL)
     root.addHandler(handler)
 
     _LOGGER_CONFIGURED = True
 
 
+def dropped_records() -> int:
+    """
+    Records dropped because the log queue was full (this process).
+    """
+    return _QUEUE_HANDLER.dropped if _QUEUE_HANDLER is not None else 0
+
+
 def get_logger(name: Optional[str] = None) -> logging.Logger:
     """
     Returns a logger with a standard format.
@@ -33,6 +238,11 @@ def get_logger(name: Optional[str] = None) -> logging.Logger:
     Usage:
         logger = get_logger(__name__)
         logger.info("Some message")
+        logger.info("LTM miss", extra=sampled(task_key=short_key(key), text=Payload(text)))
     """
     _configure_root_logger()
     return logging.getLogger(name)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,68 @@
+"""
+Per-request stage timing.
+
+A StageTimer collects how long each stage of a request took (parse,
+validate, ltm_lookup, classify, ltm_store, summary, serialize). The HTTP
+entry points feed the numbers into the /metrics histograms and can send
+them back in a standard `Server-Timing` header, which is what the
+benchmark harness (scripts/benchmark_requests.py) reads.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    """
+    Wall-clock durations (in ms) of the named stages of one request.
+    A stage entered more than once accumulates.
+    """
+
+    __slots__ = ("stages", "started")
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self.started = time.perf_counter()
+
+    def elapsed_ms(self) -> float:
+        """
+        Time since the timer was created (the whole request so far).
+        """
+        return (time.perf_counter() - self.started) * 1000.0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000.0)
+
+    def add(self, name: str, duration_ms: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + duration_ms
+
+    def server_timing(self) -> str:
+        """
+        The stages as a Server-Timing header value, e.g.
+        "ltm_lookup;dur=0.081, classify;dur=2.310".
+        """
+        return ", ".join(f"{name};dur={duration:.3f}" for name, duration in self.stages.items())
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """
+    Parse a Server-Timing header value back into {stage: duration_ms}.
+    Metrics without a duration are ignored.
+    """
+    stages: Dict[str, float] = {}
+    for metric in header.split(","):
+        name, _, params = metric.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                try:
+                    stages[name] = stages.get(name, 0.0) + float(value)
+                except ValueError:
+                    pass
+    return stages
@@ -0,0 +1,119 @@
+"""
+Eager warm-up of a worker process, plus the readiness state behind /ready.
+
+Without warm-up the first /handle call in each gunicorn worker pays for
+unpickling the model, compiling the keyword matcher and opening the LTM
+store. warm_up() does all of that up front and runs one dummy inference,
+so the worker only reports ready once it can answer at full speed.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .config import WARMUP_MODE
+from .utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+WARMUP_TEXT = "Urgent: please review the project report before the meeting today."
+
+_LOCK = threading.Lock()
+_READY = threading.Event()
+_STATE: Dict[str, Any] = {
+    "status": "pending",  # pending -> running -> ready | failed
+    "duration_ms": None,
+    "model_version": None,
+    "error": None,
+}
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Run the warm-up steps once in this process and return the final state.
+
+    Steps: load the model, compile the keyword matcher, open the LTM store
+    and classify a dummy email (the result is not stored in LTM).
+    """
+    # Imported here so that importing this module stays cheap
+    from . import ltm_store, priority_logic
+
+    with _LOCK:
+        if _STATE["status"] in ("running", "ready"):
+            return dict(_STATE)
+        _STATE["status"] = "running"
+
+    started = time.perf_counter()
+    try:
+        model_version = priority_logic.get_model_version()
+        priority_logic.get_keyword_matcher()
+        ltm_store.get_backend().lookup("warmup:probe")
+        priority_logic.classify_email(text=WARMUP_TEXT, metadata={"subject": "warm-up"})
+    except Exception as exc:
+        logger.exception("Warm-up failed")
+        with _LOCK:
+            _STATE.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+        return dict(_STATE)
+
+    duration_ms = (time.perf_counter() - started) * 1000.0
+    with _LOCK:
+        _STATE.update(
+            status="ready",
+            duration_ms=round(duration_ms, 1),
+            model_version=model_version,
+            error=None,
+        )
+    _READY.set()
+    logger.info("Warm-up finished in %.1f ms (model version %s)", duration_ms, model_version)
+    return dict(_STATE)
+
+
+def start_warm_up(mode: str = WARMUP_MODE) -> Optional[threading.Thread]:
+    """
+    Kick off warm-up according to `mode`:
+    - "blocking":   run it now, before returning
+    - "background": run it in a daemon thread (liveness is served meanwhile)
+    - "off":        skip it; the worker is ready immediately and loads lazily
+    """
+    if mode == "off":
+        with _LOCK:
+            _STATE.update(status="ready", duration_ms=0.0)
+        _READY.set()
+        return None
+
+    if mode == "blocking":
+        warm_up()
+        return None
+
+    if mode != "background":
+        raise ValueError(f"Unknown warm-up mode: {mode!r}")
+
+    thread = threading.Thread(target=warm_up, name="email-agent-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    return _READY.is_set()
+
+
+def wait_until_ready(timeout: Optional[float] = None) -> bool:
+    """
+    Block until warm-up has finished (or `timeout` seconds have passed).
+    """
+    return _READY.wait(timeout)
+
+
+def readiness() -> Dict[str, Any]:
+    """
+    Snapshot of the warm-up state for the /ready endpoint. Once ready,
+    model_version is the one served now: hot reloads replace the model
+    warm-up saw.
+    """
+    with _LOCK:
+        state = dict(_STATE)
+    if state["status"] == "ready":
+        from . import priority_logic
+
+        state["model_version"] = priority_logic.get_model_version()
+    return state
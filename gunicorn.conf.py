@@ -0,0 +1,33 @@
+"""
+gunicorn settings for the Email Priority Agent (used by the Dockerfile).
+
+The app is preloaded in the master process before workers are forked:
+the model is unpickled once (with its numpy arrays memory-mapped read-only)
+and every worker shares those pages copy-on-write instead of loading its
+own copy. Run `python scripts/measure_worker_memory.py` to compare RSS/PSS
+per worker with and without preloading.
+"""
+
+import glob
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+
+# Import app.py (and warm it up) once in the master, then fork
+preload_app = os.environ.get("EMAIL_AGENT_PRELOAD", "1") == "1"
+
+# Threads do not survive fork(), so warm up synchronously in the master
+if preload_app:
+    os.environ.setdefault("EMAIL_AGENT_WARMUP", "blocking")
+
+# Workers write their metrics snapshots here so GET /metrics can report the
+# totals of all workers. Cleared at startup: pids of a previous run would
+# otherwise keep adding their old numbers.
+_metrics_dir = os.environ.setdefault(
+    "EMAIL_AGENT_METRICS_DIR",
+    os.path.join(tempfile.gettempdir(), f"email-agent-metrics-{bind.rsplit(':', 1)[-1]}"),
+)
+for _snapshot in glob.glob(os.path.join(_metrics_dir, "*.json")):
+    os.remove(_snapshot)
@@ -0,0 +1,115 @@
+"""
+Micro-benchmark: per-request cost of decoding a /handle body and encoding the response.
+
+Compares the request/response codec paths on the same handshake, without
+any HTTP server, LTM or model work in the loop:
+- dict:    json.loads -> AgentRequest.model_validate -> model_dump() ->
+           json.dumps (what get_json() + jsonify() did before)
+- pydantic: AgentRequest.model_validate_json(bytes) -> to_json(response),
+           the path app.py and asgi.py use (service.parse_request /
+           service.encode_response)
+- orjson:  orjson.loads -> model_validate -> orjson.dumps(model_dump()),
+           only if orjson happens to be installed
+
+for a short email and for larger bodies (100 KB by default). The response
+is a real classification result, so its size is the production one.
+
+Usage (from project root):
+    python scripts/benchmark_codec.py
+    python scripts/benchmark_codec.py --sizes 200 10000 100000 --repeat 2000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+from email_agent import service
+from email_agent.handshake_schemas import AgentRequest, AgentResponse
+from email_agent.priority_logic import classify_email
+
+try:
+    import orjson
+except ImportError:  # optional, only benchmarked when present
+    orjson = None
+
+SENTENCE = "Please review the attached quarterly report before Friday's steering meeting. "
+
+
+def _request_body(size: int) -> bytes:
+    text = (SENTENCE * (size // len(SENTENCE) + 1))[:size]
+    request = {
+        "request_id": "bench-1",
+        "agent_name": "email_priority_agent",
+        "intent": "email.priority.classify",
+        "input": {"text": text, "metadata": {"sender": "pm@example.com", "subject": "Report"}},
+        "context": {"user_id": "user-1", "conversation_id": "conv-1"},
+    }
+    return json.dumps(request).encode("utf-8")
+
+
+def _codecs(response: AgentResponse) -> Dict[str, Callable[[bytes], bytes]]:
+    def dict_path(body: bytes) -> bytes:
+        AgentRequest.model_validate(json.loads(body))
+        return json.dumps(response.model_dump()).encode("utf-8")
+
+    def pydantic_path(body: bytes) -> bytes:
+        service.parse_request(body)
+        return service.encode_response(response)
+
+    codecs = {"dict": dict_path, "pydantic": pydantic_path}
+    if orjson is not None:
+
+        def orjson_path(body: bytes) -> bytes:
+            AgentRequest.model_validate(orjson.loads(body))
+            return orjson.dumps(response.model_dump())
+
+        codecs["orjson"] = orjson_path
+    return codecs
+
+
+def _time_per_call_us(fn: Callable[[bytes], bytes], body: bytes, repeat: int) -> float:
+    for _ in range(min(repeat, 50)):
+        fn(body)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(body)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[200, 100_000], help="Email body sizes in bytes."
+    )
+    parser.add_argument("--repeat", type=int, default=1000, help="Calls per codec and size.")
+    args = parser.parse_args()
+
+    sample = AgentRequest.model_validate_json(_request_body(200))
+    response = service.success_response(sample, classify_email(sample.input.text))
+    codecs = _codecs(response)
+    print(f"Response: {len(service.encode_response(response))} bytes; {args.repeat} calls per cell")
+    print(f"{'body':>10} " + " ".join(f"{name + ' us':>12}" for name in codecs) + f" {'speedup':>9}")
+
+    for size in args.sizes:
+        body = _request_body(size)
+        # All paths must agree on the wire format
+        decoded = {name: json.loads(codec(body)) for name, codec in codecs.items()}
+        assert all(value == decoded["dict"] for value in decoded.values())
+
+        timings = {name: _time_per_call_us(codec, body, args.repeat) for name, codec in codecs.items()}
+        cells = " ".join(f"{timings[name]:>12.1f}" for name in codecs)
+        print(f"{len(body):>10} {cells} {timings['dict'] / timings['pydantic']:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
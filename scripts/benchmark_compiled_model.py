@@ -0,0 +1,115 @@
+"""
+Benchmark the compiled (sklearn-free) model against the sklearn pipeline.
+
+Each variant runs in a fresh Python process, which reports:
+- load ms:   importing what the model needs plus loading it from disk
+- us/email:  median single-email predict_proba call (what classify_email does)
+- RSS MB:    resident memory of the process after loading and predicting
+- modules:   number of imported modules
+
+Both variants load the active model (run scripts/compile_model.py first if
+it has no model.npz yet).
+
+Usage (from project root):
+    python scripts/benchmark_compiled_model.py
+    python scripts/benchmark_compiled_model.py --emails 2000
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+from email_agent.data_loader import load_email_dataset
+from email_agent.learning import model_store
+from email_agent.text_normalization import normalize_text
+
+# Runs in the child process: argv = [kind, model file, texts json file]
+_CHILD = r"""
+import json, resource, statistics, sys, time, warnings
+warnings.simplefilter("ignore")
+started = time.perf_counter()
+kind, path, texts_file = sys.argv[1:4]
+if kind == "compiled":
+    from email_agent.compiled_model import CompiledModel
+    model = CompiledModel.load(path)
+else:
+    import joblib
+    model = joblib.load(path)
+load_ms = (time.perf_counter() - started) * 1000
+texts = json.load(open(texts_file))
+model.predict_proba(texts[:1])
+timings = []
+for text in texts:
+    start = time.perf_counter()
+    model.predict_proba([text])
+    timings.append((time.perf_counter() - start) * 1e6)
+print(json.dumps({
+    "load_ms": load_ms,
+    "us_per_email": statistics.median(timings),
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "proba": model.predict_proba(texts[:50]).tolist(),
+}))
+"""
+
+
+def _run(kind: str, path: Path, texts_file: Path) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD, kind, str(path), str(texts_file)],
+        cwd=PROJECT_ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--emails", type=int, default=1000, help="Emails timed per variant.")
+    parser.add_argument("--csv", default="synthetic_emails.csv")
+    args = parser.parse_args()
+
+    resolved = model_store.active_model_file()
+    if resolved is None:
+        sys.exit("No trained model available; run scripts/train_model.py first.")
+    version, pickle_file = resolved
+    compiled_file = pickle_file.with_suffix(model_store.COMPILED_SUFFIX)
+    if not compiled_file.exists():
+        sys.exit(f"{compiled_file} does not exist; run scripts/compile_model.py first.")
+
+    texts = [normalize_text(text) for text in load_email_dataset(args.csv)["text"].astype(str)][: args.emails]
+    with tempfile.TemporaryDirectory() as tmp:
+        texts_file = Path(tmp) / "texts.json"
+        texts_file.write_text(json.dumps(texts), encoding="utf-8")
+        results = {
+            "pipeline": _run("pipeline", pickle_file, texts_file),
+            "compiled": _run("compiled", compiled_file, texts_file),
+        }
+
+    difference = max(
+        abs(a - b)
+        for row_a, row_b in zip(results["pipeline"]["proba"], results["compiled"]["proba"])
+        for a, b in zip(row_a, row_b)
+    )
+    print(f"Model version {version}, {len(texts)} emails; max probability difference {difference:.2g}")
+    print(f"{'variant':>10} {'load ms':>9} {'us/email':>9} {'RSS MB':>8} {'modules':>8}")
+    for kind, result in results.items():
+        print(
+            f"{kind:>10} {result['load_ms']:>9.1f} {result['us_per_email']:>9.1f} "
+            f"{result['rss_mb']:>8.1f} {result['modules']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
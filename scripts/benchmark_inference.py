@@ -0,0 +1,94 @@
+"""
+Micro-benchmark for single-email model inference.
+
+Compares the old two-call path (predict + predict_proba) with the
+single-pass path used by classify_email (one predict_proba, label taken
+from classes_), on emails of increasing length.
+
+Usage (from project root):
+    python scripts/benchmark_inference.py
+    python scripts/benchmark_inference.py --repeats 500 --lengths 100 1000 10000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+from email_agent import priority_logic
+from email_agent.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+BASE_TEXT = (
+    "Urgent: please submit the project report by tonight. "
+    "Reminder: the team meeting moved to this week. "
+    "FYI: there is a new newsletter about the exam schedule. "
+)
+
+
+def _make_text(length: int) -> str:
+    repeats = length // len(BASE_TEXT) + 1
+    return (BASE_TEXT * repeats)[:length]
+
+
+def _two_call(model, text: str):
+    label = str(model.predict([text])[0])
+    confidence = float(max(model.predict_proba([text])[0]))
+    return label, confidence
+
+
+def _single_pass(model, text: str):
+    return priority_logic._predict_with_confidence(model, [text])[0]
+
+
+def _time_per_call(fn, model, text: str, repeats: int) -> float:
+    """
+    Median wall time of one call, in microseconds.
+    """
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(model, text)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    priority_logic._load_model_if_needed()
+    active = priority_logic._ACTIVE
+    model = active[0] if active is not None else None
+    if model is None:
+        print("No trained model available; run scripts/train_model.py first.")
+        return
+
+    print(f"{'chars':>8} {'two-call us':>12} {'single us':>10} {'saved':>7}")
+    for length in args.lengths:
+        text = _make_text(length)
+        assert _two_call(model, text) == _single_pass(model, text)
+
+        # Warm up both paths once before measuring
+        _two_call(model, text)
+        _single_pass(model, text)
+
+        two_call = _time_per_call(_two_call, model, text, args.repeats)
+        single = _time_per_call(_single_pass, model, text, args.repeats)
+        saved = 100.0 * (two_call - single) / two_call
+        print(f"{length:>8} {two_call:>12.1f} {single:>10.1f} {saved:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Micro-benchmark for keyword signal extraction.
+
+Compares the old approach (one substring scan per keyword, per group) with
+the compiled Aho-Corasick matcher, while growing the keyword lists from the
+built-in ~25 terms to several hundred.
+
+Usage (from project root):
+    python scripts/benchmark_keywords.py
+    python scripts/benchmark_keywords.py --sizes 25 200 800 --chars 5000
+"""
+
+import argparse
+import random
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+from email_agent import priority_logic
+from email_agent.keyword_matcher import KeywordMatcher
+
+
+def _substring_scan(text, groups):
+    lower = text.lower()
+    return {name: [kw for kw in words if kw in lower] for name, words in groups.items()}
+
+
+def _grow_groups(size: int, rng: random.Random):
+    groups = {
+        "urgent": list(priority_logic.URGENT_KEYWORDS),
+        "medium": list(priority_logic.MEDIUM_KEYWORDS),
+        "casual": list(priority_logic.CASUAL_KEYWORDS),
+    }
+    names = list(groups)
+    total = sum(len(words) for words in groups.values())
+    while total < size:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+        groups[names[total % len(names)]].append(word)
+        total += 1
+    return groups
+
+
+def _median_us(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25, 100, 400, 1600])
+    parser.add_argument("--chars", type=int, default=2000, help="length of the scanned email text")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    base = "Urgent: please review the project report this week, or share some memes. "
+    text = (base * (args.chars // len(base) + 1))[: args.chars]
+
+    print(f"{'keywords':>9} {'substring us':>13} {'matcher us':>11}")
+    for size in args.sizes:
+        groups = _grow_groups(size, rng)
+        matcher = KeywordMatcher(groups)
+        assert matcher.scan(text) == _substring_scan(text, groups)
+
+        substring = _median_us(lambda: _substring_scan(text, groups), args.repeats)
+        compiled = _median_us(lambda: matcher.scan(text), args.repeats)
+        print(f"{size:>9} {substring:>13.1f} {compiled:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
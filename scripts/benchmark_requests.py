@@ -0,0 +1,419 @@
+"""
+Benchmark harness: replay or generate handshake traffic and measure the agent.
+
+Traffic is either replayed from a JSONL log (--log, one handshake request per
+line, the shape POST /handle receives) or generated from the sentences in
+data/synthetic_emails.csv with a chosen duplicate ratio and text-length
+distribution. It is sent with N concurrent clients to:
+
+- inprocess:   the Flask app through its test client (no network, no server)
+- http:        a running server (--url), or one started here (--serve
+               flask-gunicorn / asgi-uvicorn, with a fresh LTM)
+
+Reported: throughput (RPS), latency p50/p95/p99, the LTM hit ratio (from the
+"ltm_match" block of each result) and per-stage timing (parse, validate,
+ltm_lookup, classify, ltm_store, summary, serialize) from the Server-Timing
+header, which the harness switches on with EMAIL_AGENT_SERVER_TIMING=1 for
+the app it starts.
+An external --url server needs that variable set for stage timing.
+
+Results are written as JSON (--output); --compare checks a run against an
+earlier result file and exits with status 1 if RPS dropped or p95/p99 latency
+grew by more than --tolerance.
+
+Usage (from project root):
+    python scripts/benchmark_requests.py --requests 2000 --concurrency 8
+    python scripts/benchmark_requests.py --duplicate-ratio 0.8 --length long
+    python scripts/benchmark_requests.py --target http --serve flask-gunicorn --output run.json
+    python scripts/benchmark_requests.py --log traffic.jsonl --compare baseline.json
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+from scripts.load_test_servers import SERVERS, wait_ready
+
+INTENT = "email.priority.classify"
+
+# Sentences per generated email
+LENGTHS: Dict[str, Callable[[random.Random], int]] = {
+    "short": lambda rng: 1,
+    "medium": lambda rng: rng.randint(3, 6),
+    "long": lambda rng: rng.randint(20, 40),
+    # Log-normal: mostly short mails with a long tail
+    "mixed": lambda rng: min(60, max(1, int(rng.lognormvariate(math.log(3), 0.9)))),
+}
+
+# A (response status, latency ms, LTM tier or None, stage timings) sample
+Sample = Tuple[int, float, Optional[str], Dict[str, float]]
+
+
+# ---- traffic ----------------------------------------------------------------
+
+
+def _codename(rng: random.Random) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(8))
+
+
+def generate_traffic(count: int, duplicate_ratio: float, length: str, seed: int) -> List[Dict[str, Any]]:
+    """
+    `count` handshake requests; each repeats an earlier email with
+    probability `duplicate_ratio`, otherwise it is a new email of
+    `length` sentences. New emails carry a random project code name, so
+    they stay distinct after text normalization.
+    """
+    with (PROJECT_ROOT / "data" / "synthetic_emails.csv").open(newline="", encoding="utf-8") as handle:
+        sentences = [row["text"] for row in csv.DictReader(handle)]
+    rng = random.Random(seed)
+    sent: List[str] = []
+    requests = []
+    for position in range(count):
+        if sent and rng.random() < duplicate_ratio:
+            text = rng.choice(sent)
+        else:
+            body = " ".join(rng.choice(sentences) for _ in range(LENGTHS[length](rng)))
+            text = f"{body} Project {_codename(rng)}."
+            sent.append(text)
+        requests.append(
+            {
+                "request_id": f"bench-{position}",
+                "agent_name": "email_priority_agent",
+                "intent": INTENT,
+                "input": {"text": text, "metadata": {"sender": "team@example.com", "subject": "Update"}},
+            }
+        )
+    return requests
+
+
+def load_traffic(path: Path) -> List[Dict[str, Any]]:
+    with path.open(encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def _parse_response(status: int, body: bytes, server_timing: str) -> Tuple[Optional[str], Dict[str, float]]:
+    from email_agent.utils.timing import parse_server_timing
+
+    tier = None
+    if status == 200:
+        try:
+            match = json.loads(body)["output"]["result"].get("ltm_match")
+            tier = match["tier"] if match else "miss"
+        except (ValueError, KeyError, TypeError, AttributeError):
+            pass
+    return tier, parse_server_timing(server_timing or "")
+
+
+# ---- targets ----------------------------------------------------------------
+
+
+def _inprocess_sender() -> Callable[[bytes], Tuple[int, bytes, str]]:
+    from app import app
+
+    local = threading.local()
+
+    def send(body: bytes) -> Tuple[int, bytes, str]:
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        response = client.post("/handle", data=body, content_type="application/json")
+        return response.status_code, response.get_data(), response.headers.get("Server-Timing", "")
+
+    return send
+
+
+def _http_sender(url: str) -> Callable[[bytes], Tuple[int, bytes, str]]:
+    import http.client
+
+    parsed = urlparse(url)
+    host, port = parsed.hostname or "127.0.0.1", parsed.port or 80
+    path = (parsed.path.rstrip("/") or "") + "/handle"
+    local = threading.local()
+
+    def send(body: bytes) -> Tuple[int, bytes, str]:
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection(host, port, timeout=60)
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            return response.status, response.read(), response.getheader("Server-Timing", "")
+        except Exception:
+            conn.close()
+            local.conn = None
+            raise
+
+    return send
+
+
+def _fresh_ltm_env(ltm_dir: str) -> Dict[str, str]:
+    return {
+        "EMAIL_AGENT_LTM_DB_PATH": str(Path(ltm_dir) / "ltm.sqlite3"),
+        "EMAIL_AGENT_LTM_SEGMENTS_DIR": str(Path(ltm_dir) / "segments"),
+        "EMAIL_AGENT_LTM_NEAR_DUP_DB_PATH": str(Path(ltm_dir) / "ltm_near.sqlite3"),
+        "EMAIL_AGENT_SERVER_TIMING": "1",
+        "EMAIL_AGENT_WARMUP": "blocking",
+    }
+
+
+# ---- running ----------------------------------------------------------------
+
+
+def run(
+    send: Callable[[bytes], Tuple[int, bytes, str]],
+    requests: List[Dict[str, Any]],
+    concurrency: int,
+    warmup: int,
+) -> Tuple[List[Sample], float]:
+    """
+    Send every request (after `warmup` unmeasured ones) from `concurrency`
+    threads; return the samples and the elapsed wall time in seconds.
+    """
+    bodies = [json.dumps(request).encode("utf-8") for request in requests]
+    for body in bodies[:warmup]:
+        send(body)
+    bodies = bodies[warmup:]
+
+    samples: List[Sample] = []
+    samples_lock = threading.Lock()
+    position = iter(range(len(bodies)))
+    position_lock = threading.Lock()
+
+    def worker() -> None:
+        local: List[Sample] = []
+        while True:
+            with position_lock:
+                index = next(position, None)
+            if index is None:
+                break
+            start = time.perf_counter()
+            try:
+                status, body, server_timing = send(bodies[index])
+            except Exception:
+                local.append((0, (time.perf_counter() - start) * 1000.0, None, {}))
+                continue
+            latency_ms = (time.perf_counter() - start) * 1000.0
+            tier, stages = _parse_response(status, body, server_timing)
+            local.append((status, latency_ms, tier, stages))
+        with samples_lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    quantiles = statistics.quantiles(values, n=100, method="inclusive") if len(values) > 1 else values * 99
+    return {
+        "mean_ms": round(statistics.fmean(values), 3),
+        "p50_ms": round(quantiles[49], 3),
+        "p95_ms": round(quantiles[94], 3),
+        "p99_ms": round(quantiles[98], 3),
+        "max_ms": round(max(values), 3),
+    }
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    ok = [sample for sample in samples if sample[0] == 200]
+    tiers = [sample[2] for sample in ok if sample[2]]
+    stage_names = sorted({name for sample in ok for name in sample[3]})
+    hits = sum(1 for tier in tiers if tier != "miss")
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "latency": _percentiles([sample[1] for sample in ok]),
+        "ltm": {
+            "exact": tiers.count("exact"),
+            "near": tiers.count("near"),
+            "miss": tiers.count("miss"),
+            "hit_ratio": round(hits / len(tiers), 4) if tiers else 0.0,
+        },
+        # Per stage, over the requests that went through it
+        "stages": {
+            name: dict(
+                _percentiles([sample[3][name] for sample in ok if name in sample[3]]),
+                count=sum(1 for sample in ok if name in sample[3]),
+            )
+            for name in stage_names
+        },
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Return the regressions of `current` against `baseline` (empty if none).
+    """
+    regressions = []
+    cur, base = current["summary"], baseline["summary"]
+    if base["rps"] and cur["rps"] < base["rps"] * (1 - tolerance):
+        regressions.append(f"RPS {base['rps']} -> {cur['rps']}")
+    for key in ("p95_ms", "p99_ms"):
+        if base["latency"][key] and cur["latency"][key] > base["latency"][key] * (1 + tolerance):
+            regressions.append(f"latency {key} {base['latency'][key]} -> {cur['latency'][key]}")
+    return regressions
+
+
+def _print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    summary = report["summary"]
+    base = baseline["summary"] if baseline else None
+
+    def delta(value: float, old: Optional[float]) -> str:
+        if not old:
+            return ""
+        return f"  ({(value - old) / old:+.1%})"
+
+    latency, ltm = summary["latency"], summary["ltm"]
+    print(
+        f"{summary['requests']} requests ({summary['errors']} errors) in {summary['elapsed_s']} s "
+        f"against {report['config']['target']}, concurrency {report['config']['concurrency']}"
+    )
+    print(f"  RPS          {summary['rps']:>10}{delta(summary['rps'], base and base['rps'])}")
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        print(f"  {key:<12} {latency[key]:>10}{delta(latency[key], base and base['latency'][key])}")
+    print(
+        f"  LTM hit ratio {ltm['hit_ratio']:>9.1%}  "
+        f"(exact {ltm['exact']}, near {ltm['near']}, miss {ltm['miss']})"
+    )
+    if summary["stages"]:
+        print(f"  {'stage':<12} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+        for name, stage in summary["stages"].items():
+            print(
+                f"  {name:<12} {stage['count']:>7} {stage['mean_ms']:>9} "
+                f"{stage['p50_ms']:>9} {stage['p95_ms']:>9}"
+            )
+    else:
+        print("  (no Server-Timing header; set EMAIL_AGENT_SERVER_TIMING=1 on the server)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", choices=("inprocess", "http"), default="inprocess")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="http: server to benchmark")
+    parser.add_argument("--serve", choices=sorted(SERVERS), help="http: start this server first")
+    parser.add_argument("--workers", type=int, default=2, help="--serve: worker processes")
+    parser.add_argument("--log", type=Path, help="JSONL traffic log to replay instead of generating")
+    parser.add_argument("--requests", type=int, default=1000, help="generated requests")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.5, help="share of repeated emails")
+    parser.add_argument("--length", choices=sorted(LENGTHS), default="mixed", help="sentences per email")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests sent first")
+    parser.add_argument("--output", type=Path, help="write the result as JSON")
+    parser.add_argument("--compare", type=Path, help="earlier result JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative regression")
+    args = parser.parse_args()
+
+    if args.log:
+        requests = load_traffic(args.log)
+    else:
+        requests = generate_traffic(args.requests, args.duplicate_ratio, args.length, args.seed)
+    if len(requests) <= args.warmup:
+        parser.error(f"need more than --warmup={args.warmup} requests")
+
+    ltm_dir = tempfile.mkdtemp(prefix="ltm-bench-")
+    server = None
+    if args.target == "inprocess":
+        # Must be set before the app (and its config) is imported
+        os.environ.update(_fresh_ltm_env(ltm_dir))
+        send = _inprocess_sender()
+    else:
+        if args.serve:
+            port = urlparse(args.url).port or 8000
+            command = [sys.executable, *SERVERS[args.serve]]
+            if args.serve == "asgi-uvicorn":
+                command += ["--port", str(port), "--workers", str(args.workers)]
+            env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(args.workers), **_fresh_ltm_env(ltm_dir))
+            server = subprocess.Popen(
+                command, cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            wait_ready(port)
+        send = _http_sender(args.url)
+
+    try:
+        samples, elapsed = run(send, requests, args.concurrency, args.warmup)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        "config": {
+            "target": (args.serve or args.url) if args.target == "http" else "inprocess",
+            "url": args.url if args.target == "http" else None,
+            "traffic": str(args.log) if args.log else "generated",
+            "requests": len(requests),
+            "duplicate_ratio": None if args.log else args.duplicate_ratio,
+            "length": None if args.log else args.length,
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "git_revision": _git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "summary": summarize(samples, elapsed),
+    }
+
+    baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+    _print_report(report, baseline)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Result written to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}: " + "; ".join(regressions))
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
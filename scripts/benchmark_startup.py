@@ -0,0 +1,149 @@
+"""
+Startup benchmark: time from process start to the first successful POST /handle.
+
+Starts each server (one worker, fresh temporary LTM) and sends POST /handle
+every few milliseconds until one returns 200; the time from spawning the
+process to that response is the cold-start time. Each server is started
+--runs times and the median is reported.
+
+With --profile, also prints an import-time profile of `import app` and
+`import asgi` (python -X importtime, warm-up off): total wall time, module
+count and the packages with the largest self time. Regressions are caught
+by tests/test_import_time.py.
+
+Usage (from project root):
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --runs 10 --profile
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+SERVERS = {
+    "flask-gunicorn": ["-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+    "asgi-uvicorn": ["-m", "uvicorn", "asgi:app", "--log-level", "warning"],
+}
+
+PROBE = json.dumps(
+    {
+        "request_id": "startup-probe",
+        "agent_name": "email_priority_agent",
+        "intent": "email.priority.classify",
+        "input": {"text": "Urgent: please send the report today."},
+    }
+).encode("utf-8")
+
+
+def _first_handle_seconds(name: str, port: int, timeout: float = 60.0) -> float:
+    ltm_dir = tempfile.mkdtemp(prefix="ltm-startup-")
+    command = [sys.executable, *SERVERS[name]]
+    if name == "asgi-uvicorn":
+        command += ["--port", str(port)]
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY="1",
+        EMAIL_AGENT_LTM_DB_PATH=str(Path(ltm_dir) / "ltm.sqlite3"),
+    )
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        command, cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{port}/handle",
+                data=PROBE,
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.005)
+        raise TimeoutError(f"{name} did not answer /handle within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def _import_profile(module: str) -> Dict[str, object]:
+    """
+    Import `module` in a fresh interpreter with -X importtime and return
+    its wall time, module count and self time per top-level package.
+    """
+    code = (
+        "import sys, time; started = time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter() - started) * 1000, len(sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        env=dict(os.environ, EMAIL_AGENT_WARMUP="off"),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall_ms, modules = result.stdout.split()
+    self_us: Counter = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, _, name = line[len("import time:") :].split("|")
+        if self_time.strip().isdigit():
+            self_us[name.strip().split(".")[0]] += int(self_time)
+    return {"wall_ms": float(wall_ms), "modules": int(modules), "self_us": self_us}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per server.")
+    parser.add_argument("--port", type=int, default=18100)
+    parser.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=sorted(SERVERS))
+    parser.add_argument("--profile", action="store_true", help="Also print an import-time profile.")
+    parser.add_argument("--top", type=int, default=12, help="Packages shown per profile.")
+    args = parser.parse_args()
+
+    print(f"{'server':>16} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for name in args.servers:
+        timings: List[float] = [
+            _first_handle_seconds(name, args.port + run) * 1000 for run in range(args.runs)
+        ]
+        print(
+            f"{name:>16} {statistics.median(timings):>10.0f} {min(timings):>8.0f} {max(timings):>8.0f}"
+        )
+
+    if not args.profile:
+        return
+    for module in ("app", "asgi"):
+        profile = _import_profile(module)
+        total_us = sum(profile["self_us"].values())
+        print(f"\nimport {module}: {profile['wall_ms']:.0f} ms wall, {profile['modules']} modules")
+        print(f"{'package':>24} {'self ms':>8} {'share':>6}")
+        for package, self_us in profile["self_us"].most_common(args.top):
+            print(f"{package:>24} {self_us / 1000:>8.1f} {100 * self_us / total_us:>5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
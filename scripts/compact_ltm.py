@@ -0,0 +1,99 @@
+"""
+CLI script to enforce the LTM capacity limits and reclaim disk space.
+
+Expires entries older than the max age, evicts least recently / least
+frequently used entries down to the max entries / max bytes, and (for the
+legacy JSON layout) deletes orphaned records/*.json files that no index
+entry points to. Prints what was removed and how much space was reclaimed.
+
+Limits default to the EMAIL_AGENT_LTM_* settings in email_agent/config.py.
+
+Usage (from project root):
+    python scripts/compact_ltm.py
+    python scripts/compact_ltm.py --backend json --max-entries 100000
+    python scripts/compact_ltm.py --max-age-days 30 --policy lfu --vacuum --json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+from email_agent import ltm_store
+from email_agent.config import (
+    LTM_BACKEND,
+    LTM_EVICTION_POLICY,
+    LTM_MAX_AGE_SECONDS,
+    LTM_MAX_BYTES,
+    LTM_MAX_ENTRIES,
+)
+from email_agent.storage import create_backend
+from email_agent.storage.base import EVICTION_POLICIES
+
+
+def _format_bytes(size: float) -> str:
+    if size < 1024:
+        return f"{int(size)} B"
+    for unit in ("KiB", "MiB", "GiB"):
+        size /= 1024.0
+        if size < 1024 or unit == "GiB":
+            break
+    return f"{size:.1f} {unit}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default=LTM_BACKEND, help="LTM backend to compact")
+    parser.add_argument("--max-entries", type=int, default=LTM_MAX_ENTRIES, help="0 = unlimited")
+    parser.add_argument("--max-bytes", type=int, default=LTM_MAX_BYTES, help="0 = unlimited")
+    parser.add_argument(
+        "--max-age-days",
+        type=float,
+        default=LTM_MAX_AGE_SECONDS / 86400.0,
+        help="drop entries written longer ago than this (0 = keep forever)",
+    )
+    parser.add_argument("--policy", choices=EVICTION_POLICIES, default=LTM_EVICTION_POLICY)
+    parser.add_argument(
+        "--vacuum", action="store_true", help="sqlite: rewrite the database file to shrink it"
+    )
+    parser.add_argument("--json", action="store_true", help="print the raw report as JSON")
+    args = parser.parse_args()
+
+    ltm_store.set_backend(create_backend(args.backend))
+    try:
+        report = ltm_store.compact(
+            max_entries=args.max_entries,
+            max_bytes=args.max_bytes,
+            max_age_seconds=args.max_age_days * 86400.0,
+            policy=args.policy,
+            vacuum=args.vacuum,
+        )
+    finally:
+        ltm_store.set_backend(None)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"[Email Priority Agent] LTM compaction ({report['backend']}) complete: "
+        f"{report['expired']} expired, {report['evicted']} evicted, "
+        f"{report['orphans_removed']} orphaned files removed."
+    )
+    print(
+        f"  {report['entries']} entries left ({_format_bytes(report['payload_bytes'])} of results); "
+        f"on disk {_format_bytes(report['disk_bytes_before'])} -> "
+        f"{_format_bytes(report['disk_bytes_after'])}, "
+        f"reclaimed {_format_bytes(report['bytes_reclaimed'])}."
+    )
+
+
+if __name__ == "__main__":
+    main()
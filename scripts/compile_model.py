@@ -0,0 +1,61 @@
+"""
+Compile a trained model into its sklearn-free form (model.npz next to the pickle).
+
+New registry versions are compiled when they are registered; use this for
+models trained before that, e.g. the legacy data/models/email_priority_model.pkl
+or an older registry version. The compiled model is checked against the
+pipeline on the whole dataset before it is written, and records the pickle's
+sha256: serving picks it up on the next reload check (same version name) and
+ignores it again if the pickle is later replaced.
+
+Usage (from project root):
+    python scripts/compile_model.py                 # the active model
+    python scripts/compile_model.py --version 20250101-120000-3f2a9c1e
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+from email_agent import config
+from email_agent.data_loader import load_email_dataset
+from email_agent.learning import model_store
+from email_agent.learning.model_export import export_compiled
+from email_agent.text_normalization import normalize_text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--version", help="Registry version to compile (default: the active model).")
+    parser.add_argument("--csv", default="synthetic_emails.csv", help="Dataset the output is checked on.")
+    args = parser.parse_args()
+
+    if args.version:
+        version, model_file = args.version, config.MODEL_REGISTRY_DIR / args.version / model_store.MODEL_FILE
+    else:
+        resolved = model_store.active_model_file()
+        if resolved is None:
+            sys.exit("No trained model available; run scripts/train_model.py first.")
+        version, model_file = resolved
+
+    pipeline = model_store.load_model(args.version, mmap_mode=None)
+    texts = [normalize_text(text) for text in load_email_dataset(args.csv)["text"].astype(str)]
+    target = model_file.with_suffix(model_store.COMPILED_SUFFIX)
+    compiled = export_compiled(
+        pipeline, target, check_texts=texts, source_sha256=model_store.file_sha256(model_file)
+    )
+
+    print(f"Version {version}: {compiled.n_features} features, {len(compiled.classes_)} classes")
+    print(f"  pickle:   {model_file} ({model_file.stat().st_size / 1024:.1f} KB)")
+    print(f"  compiled: {target} ({target.stat().st_size / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compress the trained model: vocabulary pruning and float32/int8 weights.
+
+Prints the accuracy / size / latency tradeoff of every (keep ratio, dtype)
+variant against the uncompressed model, on the held-out split the trainer
+evaluates on. With --save, one variant is registered as a new model version
+(and activated with --activate); classify_email serves it like any other.
+
+Usage (from project root):
+    python scripts/compress_model.py
+    python scripts/compress_model.py --keep-ratios 1 0.5 0.2 --output tradeoff.json
+    python scripts/compress_model.py --save 0.5 int8 --activate
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+from email_agent.learning.model_compression import (
+    DEFAULT_KEEP_RATIOS,
+    DTYPES,
+    compress_and_register,
+    held_out_split,
+    tradeoff_curve,
+)
+from email_agent.learning.model_export import compile_pipeline
+from email_agent.learning.model_store import load_model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--version", help="Registry version to compress (default: the active model).")
+    parser.add_argument("--csv", default="synthetic_emails.csv")
+    parser.add_argument("--keep-ratios", type=float, nargs="+", default=list(DEFAULT_KEEP_RATIOS))
+    parser.add_argument("--dtypes", nargs="+", choices=DTYPES, default=list(DTYPES))
+    parser.add_argument("--output", help="Write the tradeoff curve to this JSON file.")
+    parser.add_argument(
+        "--save",
+        nargs=2,
+        metavar=("KEEP_RATIO", "DTYPE"),
+        help="Register this variant as a new model version.",
+    )
+    parser.add_argument("--activate", action="store_true", help="Activate the version saved with --save.")
+    args = parser.parse_args()
+
+    model = compile_pipeline(load_model(args.version, mmap_mode=None))
+    texts, labels = held_out_split(args.csv)
+    curve = tradeoff_curve(model, texts, labels, args.keep_ratios, args.dtypes)
+
+    baseline = next(
+        (entry for entry in curve if entry["keep_ratio"] == 1.0 and entry["dtype"] == "float64"), None
+    )
+    print(f"{len(texts)} held-out emails, {model.n_features} features uncompressed")
+    print(
+        f"{'keep':>6} {'dtype':>8} {'features':>9} {'KB':>7} {'size':>6} "
+        f"{'accuracy':>9} {'agree':>7} {'max dp':>8} {'us/email':>9}"
+    )
+    for entry in curve:
+        size = f"{entry['size_bytes'] / baseline['size_bytes']:.0%}" if baseline else "-"
+        print(
+            f"{entry['keep_ratio']:>6.2f} {entry['dtype']:>8} {entry['n_features']:>9} "
+            f"{entry['size_bytes'] / 1024:>7.1f} {size:>6} {entry['accuracy']:>9.4f} "
+            f"{entry['agreement']:>7.1%} {entry['max_proba_diff']:>8.2g} {entry['latency_us']:>9.1f}"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(curve, indent=2), encoding="utf-8")
+        print(f"Wrote {args.output}")
+
+    if args.save:
+        keep_ratio, dtype = float(args.save[0]), args.save[1]
+        if dtype not in DTYPES:
+            parser.error(f"DTYPE must be one of {DTYPES}")
+        version = compress_and_register(
+            keep_ratio, dtype, version=args.version, csv_filename=args.csv, make_active=args.activate
+        )
+        print(f"Registered {version}" + (" (active)" if args.activate else ""))
+
+
+if __name__ == "__main__":
+    main()
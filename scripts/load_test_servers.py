@@ -0,0 +1,177 @@
+"""
+Load test: Flask app under gunicorn (sync workers) vs. the ASGI app under uvicorn.
+
+Starts each server on a local port with the same number of worker processes,
+then drives POST /handle with a fixed number of concurrent keep-alive
+clients for a fixed duration. Prints RPS and p50/p99 latency per server,
+and can write the numbers to a JSON file.
+
+Traffic is a mix of repeated emails (LTM hits) and unique ones (LTM misses,
+full inference + write-back), controlled by --unique-ratio. Each run uses a
+fresh temporary LTM database so both servers start cold.
+
+Usage (from project root):
+    python scripts/load_test_servers.py
+    python scripts/load_test_servers.py --workers 2 --concurrency 32 --duration 20
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+SERVERS = {
+    "flask-gunicorn": ["-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+    "asgi-uvicorn": ["-m", "uvicorn", "asgi:app", "--log-level", "warning"],
+}
+
+TEMPLATES = [
+    "Urgent: please submit the {item} by tonight.",
+    "Reminder: don't forget to check the {item} this week.",
+    "FYI: there is a new newsletter about {item}.",
+]
+ITEMS = ["project report", "team meeting", "exam schedule", "system update"]
+
+
+def _payload(rng: random.Random, unique_ratio: float, counter: int) -> bytes:
+    text = rng.choice(TEMPLATES).format(item=rng.choice(ITEMS))
+    if rng.random() < unique_ratio:
+        text = f"{text} Ticket #{counter}-{rng.randint(0, 10**9)}."
+    body = {
+        "request_id": f"load-{counter}",
+        "agent_name": "email_priority_agent",
+        "intent": "email.priority.classify",
+        "input": {"text": text, "metadata": {"sender": "team@example.com"}},
+    }
+    return json.dumps(body).encode("utf-8")
+
+
+def wait_ready(port: int, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server on port {port} did not become ready")
+
+
+def _client(port: int, stop_at: float, seed: int, unique_ratio: float, latencies: List[float], errors: List[int]) -> None:
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    counter = 0
+    while time.perf_counter() < stop_at:
+        counter += 1
+        body = _payload(rng, unique_ratio, seed * 1_000_000 + counter)
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/handle", body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except Exception:
+            errors.append(0)
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    conn.close()
+
+
+def _run_server(name: str, port: int, args: argparse.Namespace) -> Dict[str, object]:
+    ltm_dir = tempfile.mkdtemp(prefix="ltm-load-")
+    command = [sys.executable, *SERVERS[name]]
+    if name == "asgi-uvicorn":
+        command += ["--port", str(port), "--workers", str(args.workers)]
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(args.workers),
+        EMAIL_AGENT_LTM_DB_PATH=str(Path(ltm_dir) / "ltm.sqlite3"),
+        EMAIL_AGENT_WARMUP="blocking",
+    )
+    server = subprocess.Popen(
+        command, cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_ready(port)
+        latencies: List[float] = []
+        errors: List[int] = []
+        started = time.perf_counter()
+        stop_at = started + args.duration
+        threads = [
+            threading.Thread(
+                target=_client, args=(port, stop_at, seed, args.unique_ratio, latencies, errors)
+            )
+            for seed in range(args.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "server": name,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(quantiles[49], 2),
+        "p99_ms": round(quantiles[98], 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per server")
+    parser.add_argument("--unique-ratio", type=float, default=0.3, help="share of never-seen emails")
+    parser.add_argument("--port", type=int, default=18100)
+    parser.add_argument("--output", type=Path, default=None, help="optional JSON report path")
+    args = parser.parse_args()
+
+    reports = [
+        _run_server(name, args.port + offset, args) for offset, name in enumerate(SERVERS)
+    ]
+
+    print(f"{'server':>15} {'requests':>9} {'errors':>7} {'RPS':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for report in reports:
+        print(
+            f"{report['server']:>15} {report['requests']:>9} {report['errors']:>7} "
+            f"{report['rps']:>8} {report['p50_ms']:>8} {report['p99_ms']:>8}"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(reports, indent=2), encoding="utf-8")
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
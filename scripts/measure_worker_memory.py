@@ -0,0 +1,152 @@
+"""
+Measure memory per gunicorn worker with and without model sharing.
+
+Starts gunicorn twice with the same number of workers:
+- "per-worker":  no preload, model loaded into private memory by each worker
+- "shared":      preload in the master + joblib mmap_mode="r" (the default)
+
+and reports RSS, PSS (proportional share) and private memory of every worker,
+read from /proc/<pid>/smaps_rollup. Linux only.
+
+Usage (from project root):
+    python scripts/measure_worker_memory.py
+    python scripts/measure_worker_memory.py --workers 4 --port 18000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+SCENARIOS = {
+    "per-worker": {"EMAIL_AGENT_PRELOAD": "0", "EMAIL_AGENT_MODEL_MMAP_MODE": ""},
+    "shared": {"EMAIL_AGENT_PRELOAD": "1", "EMAIL_AGENT_MODEL_MMAP_MODE": "r"},
+}
+
+SAMPLE_REQUEST = {
+    "request_id": "mem-probe",
+    "agent_name": "email_priority_agent",
+    "intent": "email.priority.classify",
+    "input": {"text": "Urgent: please send the report today."},
+}
+
+
+def _read_smaps_rollup(pid: int) -> Dict[str, int]:
+    """
+    Return the smaps_rollup fields of a process, in kB.
+    """
+    fields: Dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup", encoding="utf-8") as handle:
+        for line in handle:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return fields
+
+
+def _child_pids(pid: int) -> List[int]:
+    children: List[int] = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        path = f"/proc/{pid}/task/{task}/children"
+        with open(path, encoding="utf-8") as handle:
+            children.extend(int(child) for child in handle.read().split())
+    return children
+
+
+def _wait_ready(base_url: str, timeout: float) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/ready", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{base_url} did not become ready in {timeout}s")
+
+
+def _measure(name: str, workers: int, port: int) -> Dict[str, object]:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port), **SCENARIOS[name])
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base_url, timeout=60)
+
+        # Make sure every worker has served traffic (and loaded the model)
+        body = json.dumps(SAMPLE_REQUEST).encode("utf-8")
+        for _ in range(workers * 20):
+            request = urllib.request.Request(
+                f"{base_url}/handle", data=body, headers={"Content-Type": "application/json"}
+            )
+            urllib.request.urlopen(request, timeout=10).read()
+        time.sleep(1.0)
+
+        per_worker = []
+        for pid in _child_pids(master.pid):
+            fields = _read_smaps_rollup(pid)
+            per_worker.append(
+                {
+                    "pid": pid,
+                    "rss_kb": fields.get("Rss", 0),
+                    "pss_kb": fields.get("Pss", 0),
+                    "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+                }
+            )
+        return {"scenario": name, "workers": per_worker}
+    finally:
+        master.terminate()
+        master.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--port", type=int, default=18000)
+    parser.add_argument("--output", type=Path, default=None, help="optional JSON report path")
+    args = parser.parse_args()
+
+    if not Path("/proc/self/smaps_rollup").exists():
+        print("This measurement needs Linux /proc/<pid>/smaps_rollup.")
+        return
+
+    reports = []
+    for offset, name in enumerate(SCENARIOS):
+        reports.append(_measure(name, args.workers, args.port + offset))
+
+    print(f"{'scenario':>11} {'pid':>8} {'RSS MiB':>8} {'PSS MiB':>8} {'private MiB':>12}")
+    for report in reports:
+        for worker in report["workers"]:
+            print(
+                f"{report['scenario']:>11} {worker['pid']:>8} "
+                f"{worker['rss_kb'] / 1024:>8.1f} {worker['pss_kb'] / 1024:>8.1f} "
+                f"{worker['private_kb'] / 1024:>12.1f}"
+            )
+        mean_pss = sum(w["pss_kb"] for w in report["workers"]) / max(len(report["workers"]), 1)
+        print(f"{report['scenario']:>11} {'mean':>8} {'':>8} {mean_pss / 1024:>8.1f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(reports, indent=2), encoding="utf-8")
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
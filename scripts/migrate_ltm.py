@@ -0,0 +1,46 @@
+"""
+CLI script to migrate the legacy JSON LTM layout into the SQLite LTM database.
+
+Reads ltm/ltm_index.json + ltm/records/*.json and writes ltm/ltm.sqlite3.
+Safe to run more than once; existing database rows are kept.
+
+Usage (from project root):
+    python scripts/migrate_ltm.py
+or:
+    python -m scripts.migrate_ltm
+"""
+
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so "email_agent" can be imported
+CURRENT_FILE = Path(__file__).resolve()
+PROJECT_ROOT = CURRENT_FILE.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+
+from email_agent.config import LTM_DB_PATH
+from email_agent.storage.migrate import migrate_json_to_sqlite
+from email_agent.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def main() -> None:
+    """
+    Run the one-shot JSON -> SQLite LTM migration and print a summary.
+    """
+    logger.info("Starting LTM migration to %s...", LTM_DB_PATH)
+    counts = migrate_json_to_sqlite()
+
+    print(
+        "[Email Priority Agent] LTM migration complete: "
+        f"{counts['migrated']} migrated, "
+        f"{counts['skipped_existing']} already present, "
+        f"{counts['missing_records']} missing records."
+    )
+
+
+if __name__ == "__main__":
+    main()
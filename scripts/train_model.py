@@ -1,12 +1,26 @@
 """
 CLI script to train the Email Priority Agent's ML model.
 
+By default the whole dataset is loaded in memory and a TF-IDF +
+LogisticRegression pipeline is fitted in one go. With --streaming the CSV
+is read in chunks and a HashingVectorizer + SGDClassifier pipeline is
+trained incrementally (email_agent/learning/streaming_training.py), which
+keeps peak memory bounded for datasets of any size; throughput (docs/sec)
+and peak RSS are reported. With --search a grid (or --random N) search
+with k-fold CV runs on all cores (email_agent/learning/hyperparameter_search.py),
+candidates are ranked by CV accuracy and per-email latency, and the winner
+is refit on all data and saved.
+
 Usage (from project root):
     python scripts/train_model.py
+    python scripts/train_model.py --streaming --chunksize 50000 --epochs 3
+    python scripts/train_model.py --search --folds 5 --random 20
+    python scripts/train_model.py --search --search-space space.json
 or:
     python -m scripts.train_model
 """
 
+import argparse
 import sys
 from pathlib import Path
 
@@ -17,7 +31,9 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 
+from email_agent.learning.hyperparameter_search import load_search_space, search_and_train
 from email_agent.learning.model_training import train_and_evaluate
+from email_agent.learning.streaming_training import train_streaming
 from email_agent.utils.logging_utils import get_logger
 
 logger = get_logger(__name__)
@@ -27,12 +43,74 @@ def main() -> None:
     """
     Train the model on the synthetic dataset and print accuracy.
     """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--csv", default="synthetic_emails.csv", help="Dataset file under data/.")
+    parser.add_argument(
+        "--streaming", action="store_true", help="Out-of-core training (hashing + SGD partial_fit)."
+    )
+    parser.add_argument("--chunksize", type=int, default=10_000, help="Rows per chunk (--streaming).")
+    parser.add_argument("--epochs", type=int, default=5, help="Passes over the data (--streaming).")
+    parser.add_argument(
+        "--n-features", type=int, default=2**18, help="Hashing space size (--streaming)."
+    )
+    parser.add_argument(
+        "--search", action="store_true", help="Hyperparameter search with k-fold CV, save the winner."
+    )
+    parser.add_argument(
+        "--search-space", type=Path, help="JSON search space (default: built-in grid) (--search)."
+    )
+    parser.add_argument(
+        "--random", type=int, metavar="N", help="Random search over N candidates instead of the grid."
+    )
+    parser.add_argument("--folds", type=int, default=5, help="CV folds (--search).")
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel jobs, -1 = all cores (--search).")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.005,
+        help="Accuracy gap within which the faster candidate wins (--search).",
+    )
+    parser.add_argument("--top", type=int, default=10, help="Candidates to print (--search).")
+    args = parser.parse_args()
+
     logger.info("Starting training for Email Priority Agent model...")
-    model, accuracy = train_and_evaluate(csv_filename="synthetic_emails.csv")
-    logger.info("Training complete. Test accuracy: %.4f", accuracy)
+    if args.search:
+        model, ranked = search_and_train(
+            csv_filename=args.csv,
+            search_space=load_search_space(args.search_space) if args.search_space else None,
+            n_iter=args.random,
+            folds=args.folds,
+            n_jobs=args.jobs,
+            accuracy_tolerance=args.tolerance,
+        )
+        print(f"[Email Priority Agent] Search complete: {len(ranked)} candidates, winner saved.")
+        print(f"  {'rank':>4} {'cv acc':>8} {'+/-':>7} {'us/email':>9}  params")
+        for position, candidate in enumerate(ranked[: args.top], start=1):
+            print(
+                f"  {position:>4} {candidate['mean_accuracy']:>8.4f} {candidate['std_accuracy']:>7.4f} "
+                f"{candidate['latency_us']:>9.0f}  {candidate['params']}"
+            )
+        return
+
+    if not args.streaming:
+        model, accuracy = train_and_evaluate(csv_filename=args.csv)
+        logger.info("Training complete. Test accuracy: %.4f", accuracy)
+
+        # Also print to stdout for convenience
+        print(f"[Email Priority Agent] Training complete. Test accuracy: {accuracy:.4f}")
+        return
 
-    # Also print to stdout for convenience
-    print(f"[Email Priority Agent] Training complete. Test accuracy: {accuracy:.4f}")
+    model, accuracy, stats = train_streaming(
+        csv_filename=args.csv,
+        chunksize=args.chunksize,
+        epochs=args.epochs,
+        n_features=args.n_features,
+    )
+    print(f"[Email Priority Agent] Streaming training complete. Test accuracy: {accuracy:.4f}")
+    print(
+        f"  {stats['documents_trained']} docs trained in {stats['train_seconds']:.2f}s "
+        f"({stats['docs_per_sec']:.0f} docs/sec), peak RSS {stats['peak_rss_mb']:.1f} MB"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import asgi
+from email_agent import ltm_store
+from email_agent.handshake_schemas import AgentRequest
+
+
+def _call(method, path, body=None, query=b""):
+    """
+    Drive the raw ASGI app once and return (status, parsed JSON body).
+    """
+    status, _, data = _exchange(method, path, body, query)
+    return status, data
+
+
+def _exchange(method, path, body=None, query=b""):
+    """
+    Like _call(), but also return the response headers (as a dict).
+    """
+    messages = []
+    request_body = json.dumps(body).encode("utf-8") if body is not None else b""
+
+    async def receive():
+        return {"type": "http.request", "body": request_body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        scope = {"type": "http", "method": method, "path": path, "query_string": query}
+        await asgi.app(scope, receive, send)
+        await asgi.drain_pending_writes()
+
+    asyncio.run(run())
+    start = messages[0]
+    return start["status"], dict(start["headers"]), json.loads(messages[1]["body"])
+
+
+def test_asgi_health():
+    status, data = _call("GET", "/health")
+    assert status == 200
+    assert data["status"] == "ok"
+
+
+def test_asgi_handle_defers_ltm_write_until_after_response():
+    payload = {
+        "request_id": "asgi-001",
+        "agent_name": "email_priority_agent",
+        "intent": "email.priority.classify",
+        "input": {"text": "Critical: the payment gateway is down, respond immediately."},
+    }
+    status, data = _call("POST", "/handle", payload, query=b"summary=1")
+
+    assert status == 200
+    assert data["request_id"] == "asgi-001"
+    assert data["status"] == "success"
+    result = data["output"]["result"]
+    assert result["priority"] in {"high", "medium"}
+    assert "human_readable_summary" in result
+
+    # The deferred write-back has landed in LTM, without the summary
+    task_key, cached = asgi.service.lookup_cached(AgentRequest.model_validate(payload))
+    assert cached is not None
+    assert "human_readable_summary" not in cached
+    assert cached.pop("ltm_match") == {"tier": "exact", "matched_key": task_key, "similarity": 1.0}
+    assert ltm_store.lookup(task_key) == cached
+
+
+def test_asgi_handle_bad_payload():
+    status, data = _call("POST", "/handle", {"request_id": "bad"})
+    assert status == 400
+    assert data["status"] == "error"
+
+
+def test_asgi_admin_reload_requires_token():
+    status, data = _call("POST", "/admin/reload_model", body={})
+    assert status == 403
+    assert data["status"] == "error"
+
+
+def test_asgi_unknown_path_and_wrong_method():
+    status, _, data = _exchange("GET", "/no-such-path")
+    assert status == 404
+    assert data["status"] == "error"
+
+    # Like Flask: a known path called with another method is a 405
+    status, headers, data = _exchange("GET", "/handle")
+    assert status == 405
+    assert headers[b"allow"] == b"POST"
+    assert data["status"] == "error"
+    status, headers, _ = _exchange("POST", "/health")
+    assert status == 405
+    assert headers[b"allow"] == b"GET"
@@ -0,0 +1,112 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from email_agent import config, priority_logic
+from email_agent.compiled_model import CompiledModel
+from email_agent.config import BASE_DIR, DATA_DIR
+from email_agent.learning import model_store
+from email_agent.learning.model_export import compile_pipeline, export_compiled, max_probability_difference
+from email_agent.learning.model_training import build_pipeline
+from email_agent.text_normalization import normalize_text
+
+_DF = pd.read_csv(DATA_DIR / "synthetic_emails.csv")
+TEXTS = [normalize_text(text) for text in _DF["text"].astype(str)]
+LABELS = _DF["priority"].astype(str).tolist()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"tfidf__ngram_range": (1, 3), "tfidf__sublinear_tf": True, "tfidf__max_features": 300},
+        {"tfidf__binary": True, "tfidf__norm": None, "tfidf__lowercase": False},
+    ],
+)
+def test_compiled_model_matches_pipeline(params, tmp_path: Path):
+    pipeline = build_pipeline(params).fit(TEXTS[:400], LABELS[:400])
+    compiled = compile_pipeline(pipeline)
+    extra = ["", "!!!", "URGENT urgent Urgent deadline deadline today"]
+
+    assert max_probability_difference(pipeline, compiled, TEXTS + extra) < 1e-9
+    assert list(compiled.predict(TEXTS)) == list(pipeline.predict(TEXTS))
+
+    compiled.save(tmp_path / "model.npz")
+    loaded = CompiledModel.load(tmp_path / "model.npz")
+    assert loaded.terms == compiled.terms
+    np.testing.assert_array_equal(loaded.predict_proba(TEXTS), compiled.predict_proba(TEXTS))
+
+
+def test_binary_classifier_uses_sigmoid():
+    labels = ["high" if label == "high" else "other" for label in LABELS]
+    pipeline = build_pipeline().fit(TEXTS, labels)
+    assert max_probability_difference(pipeline, compile_pipeline(pipeline), TEXTS) < 1e-9
+
+
+def test_unsupported_models_are_rejected():
+    streaming = Pipeline([("hashing", HashingVectorizer()), ("clf", SGDClassifier(loss="log_loss"))])
+    with pytest.raises(ValueError):
+        compile_pipeline(streaming.fit(TEXTS[:50], LABELS[:50]))
+    with pytest.raises(ValueError, match="stop_words"):
+        compile_pipeline(build_pipeline({"tfidf__stop_words": "english"}).fit(TEXTS[:50], LABELS[:50]))
+
+
+def test_registered_versions_are_served_compiled(monkeypatch, tmp_path: Path):
+    monkeypatch.setattr(config, "MODEL_REGISTRY_DIR", tmp_path / "registry")
+    monkeypatch.setattr(priority_logic, "_ACTIVE", None)
+    monkeypatch.setattr(priority_logic, "_LOAD_ATTEMPTED", False)
+
+    version = model_store.save_model(build_pipeline().fit(TEXTS, LABELS))
+    assert model_store.read_metadata(version)["compiled"] is True
+    assert model_store.resolve_active()[1].name == "model.npz"
+
+    result = priority_logic.classify_email("Urgent: the production server is down, fix it ASAP.")
+    assert isinstance(priority_logic._ACTIVE[0], CompiledModel)
+    assert result["model_version"] == version
+    assert "[TAG: ML_MODEL]" in result["explanation"]
+
+    # Turning the flag off serves the pickle of the same version
+    monkeypatch.setattr(config, "USE_COMPILED_MODEL", False)
+    assert model_store.resolve_active() == (version, tmp_path / "registry" / version / "model.pkl")
+
+
+def test_stale_compiled_file_is_not_served(monkeypatch, tmp_path: Path):
+    import joblib
+
+    monkeypatch.setattr(config, "MODEL_PATH", tmp_path / "model.pkl")
+    monkeypatch.setattr(config, "MODEL_REGISTRY_DIR", tmp_path / "registry")
+    compiled_file = tmp_path / "model.npz"
+    joblib.dump(build_pipeline().fit(TEXTS, LABELS), config.MODEL_PATH)
+    export_compiled(
+        joblib.load(config.MODEL_PATH), compiled_file, source_sha256=model_store.file_sha256(config.MODEL_PATH)
+    )
+    assert model_store.resolve_active() == (model_store.legacy_version(), compiled_file)
+
+    # The pickle is retrained in place; the old compiled file is ignored
+    joblib.dump(build_pipeline({"clf__C": 0.1}).fit(TEXTS, LABELS), config.MODEL_PATH)
+    assert model_store.resolve_active() == (model_store.legacy_version(), config.MODEL_PATH)
+
+    # So is one exported without a source hash
+    export_compiled(joblib.load(config.MODEL_PATH), compiled_file)
+    assert CompiledModel.load(compiled_file).source_sha256 is None
+    assert model_store.servable_file(config.MODEL_PATH) == config.MODEL_PATH
+
+
+def test_shipped_compiled_model_matches_shipped_pickle():
+    assert model_store.servable_file(config.MODEL_PATH) == config.MODEL_PATH.with_suffix(".npz")
+
+
+def test_compiled_model_loads_without_sklearn():
+    code = (
+        "import sys; from email_agent.compiled_model import CompiledModel; "
+        f"CompiledModel.load({str(config.MODEL_PATH.with_suffix('.npz'))!r}); "
+        "assert not any(name.split('.')[0] in ('sklearn', 'joblib', 'scipy') for name in sys.modules)"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, check=True)
@@ -0,0 +1,71 @@
+import json
+
+from email_agent.priority_logic import classify_email, classify_emails
+
+
+def _handshake(request_id, text, metadata=None):
+    return {
+        "request_id": request_id,
+        "agent_name": "email_priority_agent",
+        "intent": "email.priority.classify",
+        "input": {"text": text, "metadata": metadata},
+    }
+
+
+def test_handle_batch_returns_per_item_results(client):
+    payload = {
+        "request_id": "batch-001",
+        "agent_name": "email_priority_agent",
+        "requests": [
+            _handshake("b-1", "Urgent: the server is down, fix it ASAP.", {"sender": "boss@example.com"}),
+            {"request_id": "b-2", "agent_name": "email_priority_agent"},  # missing intent/input
+            _handshake("b-3", "Hey, just sharing some memes from the weekend."),
+            _handshake("b-4", "Urgent: the server is down, fix it ASAP.", {"sender": "boss@example.com"}),
+        ],
+    }
+
+    response = client.post(
+        "/handle_batch",
+        data=json.dumps(payload),
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    data = response.get_json()
+
+    assert data["request_id"] == "batch-001"
+    assert data["status"] == "partial"
+    assert [r["request_id"] for r in data["results"]] == ["b-1", "b-2", "b-3", "b-4"]
+
+    ok, bad, low, dup = data["results"]
+    assert ok["status"] == "success"
+    assert ok["output"]["result"]["priority"] in {"high", "medium"}
+    assert bad["status"] == "error"
+    assert bad["error"]["type"] == "BadRequest"
+    assert low["status"] == "success"
+    assert dup["output"]["result"]["priority"] == ok["output"]["result"]["priority"]
+
+
+def test_handle_batch_rejects_bad_envelope(client):
+    response = client.post(
+        "/handle_batch",
+        data=json.dumps({"request_id": "batch-bad"}),
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    data = response.get_json()
+    assert data["status"] == "error"
+
+
+def test_classify_emails_matches_single_classification():
+    texts = [
+        "Urgent: please submit your report ASAP. The deadline is today.",
+        "Important: please review the timetable soon.",
+        "Hey, just sharing some memes from yesterday.",
+    ]
+    batch = classify_emails(texts)
+    single = [classify_email(text=t) for t in texts]
+
+    for b, s in zip(batch, single):
+        assert b["priority"] == s["priority"]
+        assert abs(b["confidence"] - s["confidence"]) < 1e-9
+        assert b["explanation"] == s["explanation"]
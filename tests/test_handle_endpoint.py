@@ -84,3 +84,63 @@ def test_handle_bad_payload(client):
     assert data["status"] == "error"
     assert data["output"] is None
     assert data["error"] is not None
+
+
+def test_handle_decodes_raw_bytes_regardless_of_content_type(client):
+    """
+    The body is validated straight from its bytes, like get_json(force=True)
+    did: any content type is accepted, and malformed JSON is a 400.
+    """
+    payload = _summary_payload("raw-001")
+    payload["input"]["text"] = "Caf\u00e9 menu changes \u2014 no action needed."
+
+    response = client.post(
+        "/handle",
+        data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+        content_type="text/plain",
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    data = json.loads(response.get_data())
+    assert data["request_id"] == "raw-001"
+    assert data["status"] == "success"
+
+    response = client.post("/handle", data=b'{"request_id": "raw-002", ', content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json()["error"]["type"] == "BadRequest"
+
+
+def _summary_payload(request_id, extras=None):
+    payload = {
+        "request_id": request_id,
+        "agent_name": "email_priority_agent",
+        "intent": "email.priority.classify",
+        "input": {"text": "Reminder: please check the lab evaluation this week."},
+    }
+    if extras is not None:
+        payload["context"] = {"extras": extras}
+    return payload
+
+
+def test_handle_summary_is_opt_in(client):
+    plain = client.post(
+        "/handle",
+        data=json.dumps(_summary_payload("sum-001")),
+        content_type="application/json",
+    ).get_json()
+    assert "human_readable_summary" not in plain["output"]["result"]
+
+    via_extras = client.post(
+        "/handle",
+        data=json.dumps(_summary_payload("sum-002", {"include_summary": True})),
+        content_type="application/json",
+    ).get_json()
+    summary = via_extras["output"]["result"]["human_readable_summary"]
+    assert "EMAIL PRIORITY CLASSIFICATION RESULT" in summary
+
+    via_query = client.post(
+        "/handle?summary=1",
+        data=json.dumps(_summary_payload("sum-003")),
+        content_type="application/json",
+    ).get_json()
+    assert via_query["output"]["result"]["human_readable_summary"] == summary
@@ -0,0 +1,40 @@
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from email_agent.data_loader import load_email_dataset
+from email_agent.learning import hyperparameter_search
+from email_agent.learning.hyperparameter_search import candidates, search
+
+
+def test_search_fits_each_vectorizer_once_per_fold_and_ranks(monkeypatch):
+    df = load_email_dataset().head(150)
+    texts, labels = df["text"].tolist(), df["priority"].tolist()
+    space = {"tfidf__ngram_range": [(1, 1), (1, 2)], "clf__C": [0.01, 1.0, 10.0]}
+
+    fits = []
+    original = TfidfVectorizer.fit_transform
+
+    def counting_fit_transform(self, *args, **kwargs):
+        fits.append(self.ngram_range)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(TfidfVectorizer, "fit_transform", counting_fit_transform)
+    monkeypatch.setattr(hyperparameter_search, "LATENCY_SAMPLE_SIZE", 5)
+
+    # n_jobs=1 keeps the jobs in this process, where the counter lives
+    ranked = search(texts, labels, space, folds=3, n_jobs=1)
+
+    assert len(ranked) == len(candidates(space)) == 6
+    # 3 folds x 2 vectorizer settings, not 3 x 6 candidates
+    assert sorted(fits) == [(1, 1)] * 3 + [(1, 2)] * 3
+    assert all(0.0 <= c["mean_accuracy"] <= 1.0 and c["latency_us"] > 0 for c in ranked)
+
+    best = max(c["mean_accuracy"] for c in ranked)
+    tied = [c for c in ranked if c["mean_accuracy"] >= best - 0.005]
+    assert ranked[: len(tied)] == sorted(tied, key=lambda c: c["latency_us"])
+
+
+def test_random_search_samples_the_space():
+    space = {"tfidf__max_features": [1000, 2000, 5000], "clf__C": [0.1, 1.0, 10.0]}
+    sampled = candidates(space, n_iter=4)
+    assert len(sampled) == 4
+    assert len({tuple(sorted(c.items())) for c in sampled}) == 4
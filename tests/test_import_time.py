@@ -0,0 +1,69 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from email_agent.config import BASE_DIR
+
+# Imported by training only; the serving path must never load them
+TRAINING_ONLY_PACKAGES = ("pandas", "sklearn", "scipy", "joblib")
+
+# Regression budgets for `import app` in a fresh interpreter (warm-up off).
+# Measured: ~300 ms and ~380 modules; the time budget leaves room for slow
+# CI machines, the module count is deterministic and catches new eager imports.
+IMPORT_APP_BUDGET_MS = 1500
+IMPORT_APP_MODULE_BUDGET = 420
+
+
+def _run(code: str) -> dict:
+    env = dict(os.environ, EMAIL_AGENT_WARMUP="off")
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _loaded_packages(setup: str) -> dict:
+    return _run(
+        f"import json, sys\n{setup}\n"
+        "print(json.dumps({'modules': len(sys.modules), "
+        "'packages': sorted({name.split('.')[0] for name in sys.modules})}))"
+    )
+
+
+def test_serving_never_imports_training_packages(tmp_path):
+    # Importing both entry points and answering a /handle with the shipped
+    # (compiled) model
+    setup = (
+        "import os\n"
+        f"os.environ['EMAIL_AGENT_LTM_DB_PATH'] = {str(tmp_path / 'ltm.sqlite3')!r}\n"
+        "import app, asgi\n"
+        "response = app.app.test_client().post('/handle', json={'request_id': 'r', "
+        "'agent_name': 'email_priority_agent', 'intent': 'email.priority.classify', "
+        "'input': {'text': 'Urgent: the server is down'}})\n"
+        "assert response.status_code == 200, response.data\n"
+        "assert '[TAG: ML_MODEL]' in response.get_json()['output']['result']['explanation']"
+    )
+    loaded = _loaded_packages(setup)["packages"]
+    assert not set(TRAINING_ONLY_PACKAGES) & set(loaded)
+
+
+def test_training_modules_import_heavy_packages_lazily():
+    loaded = _loaded_packages(
+        "import email_agent.data_loader, email_agent.learning.model_training, "
+        "email_agent.utils.evaluation_utils, email_agent.learning.model_store"
+    )["packages"]
+    assert not set(TRAINING_ONLY_PACKAGES + ("numpy",)) & set(loaded)
+
+
+def test_import_app_within_budget():
+    code = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import app\n"
+        "print(json.dumps({'ms': (time.perf_counter() - started) * 1000, 'modules': len(sys.modules)}))"
+    )
+    runs = [_run(code) for _ in range(3)]
+    assert statistics.median(run["ms"] for run in runs) < IMPORT_APP_BUDGET_MS
+    assert runs[0]["modules"] <= IMPORT_APP_MODULE_BUDGET
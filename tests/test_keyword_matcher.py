@@ -0,0 +1,45 @@
+import random
+
+from email_agent import priority_logic
+from email_agent.keyword_matcher import KeywordMatcher
+
+
+def _naive(text, keywords):
+    lower = text.lower()
+    return [kw for kw in keywords if kw in lower]
+
+
+def test_matcher_agrees_with_substring_scan():
+    groups = {
+        "urgent": priority_logic.URGENT_KEYWORDS,
+        "medium": priority_logic.MEDIUM_KEYWORDS,
+        "casual": priority_logic.CASUAL_KEYWORDS,
+        "overlap": ["he", "she", "his", "hers", "ushers"],
+    }
+    matcher = KeywordMatcher(groups)
+    vocabulary = ["urgent", "ASAP", "this", "week", "fun", "function", "ushers", "she", "today", "memes", "x"]
+
+    rng = random.Random(7)
+    for _ in range(200):
+        text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 12)))
+        hits = matcher.scan(text)
+        for name, words in groups.items():
+            assert hits[name] == _naive(text, words), (name, text)
+
+
+def test_matcher_word_boundary():
+    matcher = KeywordMatcher({"casual": ["fun", "this week"]}, word_boundary=True)
+    assert matcher.scan("A function call")["casual"] == []
+    assert matcher.scan("Have fun, see you this week!")["casual"] == ["fun", "this week"]
+
+
+def test_reload_keywords_hot_swaps_matcher():
+    original = list(priority_logic.CASUAL_KEYWORDS)
+    try:
+        priority_logic.reload_keywords({"casual": original + ["potluck"]})
+        result = priority_logic.classify_email(text="Bring a dish to the potluck", metadata=None)
+        assert "potluck" in result["explanation"]
+        assert priority_logic.get_keyword_matcher().scan("potluck!")["casual"] == ["potluck"]
+    finally:
+        priority_logic.reload_keywords({"casual": original})
+    assert priority_logic.get_keyword_matcher().scan("potluck!")["casual"] == []
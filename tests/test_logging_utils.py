@@ -0,0 +1,68 @@
+import json
+import logging
+import queue
+import sys
+
+from email_agent.utils import logging_utils
+from email_agent.utils.logging_utils import (
+    JsonFormatter,
+    Payload,
+    SamplingFilter,
+    TextFormatter,
+    sampled,
+    short_key,
+)
+
+
+def _record(level=logging.INFO, msg="hello %s", args=("world",), extra=None):
+    record = logging.LogRecord("email_agent.test", level, __file__, 1, msg, args, None)
+    for key, value in (extra or {}).items():
+        setattr(record, key, value)
+    return record
+
+
+def test_json_formatter_writes_fields_but_not_the_payload_text():
+    body = "Quarterly numbers attached, please keep confidential."
+    extra = sampled(request_id="r-1", task_key=short_key("v2:" + "ab" * 32), text=Payload(body))
+
+    entry = json.loads(JsonFormatter().format(_record(extra=extra)))
+
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["request_id"] == "r-1"
+    assert entry["task_key"] == "v2:abababababab"
+    assert entry["text"]["length"] == len(body)
+    assert "preview" not in entry["text"]
+    assert "confidential" not in json.dumps(entry)
+    assert "confidential" not in TextFormatter().format(_record(extra=extra))
+
+
+def test_payload_preview_is_truncated(monkeypatch):
+    monkeypatch.setattr(logging_utils, "LOG_PAYLOAD_CHARS", 5)
+    assert Payload("confidential").describe()["preview"] == "confi"
+
+
+def test_sampling_only_applies_to_marked_lines_below_warning():
+    never = SamplingFilter(0.0)
+    assert not never.filter(_record(extra=sampled()))
+    assert never.filter(_record(level=logging.WARNING, extra=sampled()))
+    assert never.filter(_record())
+    assert SamplingFilter(1.0).filter(_record(extra=sampled()))
+
+
+def test_queue_handler_defers_formatting_and_drops_when_full():
+    handler = logging_utils._NonBlockingQueueHandler(queue.Queue(1))
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        first = _record(extra=sampled(n=1))
+        first.exc_info = sys.exc_info()
+    handler.handle(first)
+    handler.handle(_record())
+
+    queued = handler.queue.get_nowait()
+    assert handler.dropped == 1
+    assert queued.getMessage() == "hello world" and queued.args is None
+    assert queued.exc_info is None and "ValueError: boom" in queued.exc_text
+    entry = json.loads(JsonFormatter().format(queued))
+    assert entry["n"] == 1 and "ValueError: boom" in entry["exc_info"]
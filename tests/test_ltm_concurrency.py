@@ -0,0 +1,83 @@
+import multiprocessing
+
+import pytest
+
+from email_agent.storage.json_backend import JSONFileBackend
+from email_agent.storage.segment_backend import SegmentLogBackend
+from email_agent.storage.sqlite_backend import SQLiteBackend
+
+PROCESSES = 4
+KEYS_PER_PROCESS = 40
+
+
+def _hammer(backend_factory, worker_id):
+    backend = backend_factory()
+    for i in range(KEYS_PER_PROCESS):
+        task_key = f"worker-{worker_id}:{i}"
+        backend.store(task_key, {"worker": worker_id, "i": i})
+        # Interleave reads of our own and other workers' keys
+        assert backend.lookup(task_key) == {"worker": worker_id, "i": i}
+        backend.lookup(f"worker-{(worker_id + 1) % PROCESSES}:{i}")
+    backend.close()
+
+
+def _run_workers(backend_factory):
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_hammer, args=(backend_factory, w)) for w in range(PROCESSES)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join(timeout=120)
+    assert all(proc.exitcode == 0 for proc in procs)
+
+
+def _assert_no_lost_entries(backend):
+    expected = [f"worker-{w}:{i}" for w in range(PROCESSES) for i in range(KEYS_PER_PROCESS)]
+    found = backend.lookup_many(expected)
+    assert sorted(found) == sorted(expected)
+    for key, record in found.items():
+        worker, i = key[len("worker-"):].split(":")
+        assert record == {"worker": int(worker), "i": int(i)}
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork start method"
+)
+def test_json_backend_concurrent_stores_lose_nothing(tmp_path):
+    index_path = tmp_path / "ltm_index.json"
+    records_dir = tmp_path / "records"
+
+    _run_workers(lambda: JSONFileBackend(index_path=index_path, records_dir=records_dir))
+
+    _assert_no_lost_entries(JSONFileBackend(index_path=index_path, records_dir=records_dir))
+    # No temp files left behind by the atomic writes
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork start method"
+)
+def test_sqlite_backend_concurrent_stores_lose_nothing(tmp_path):
+    db_path = tmp_path / "ltm.sqlite3"
+
+    _run_workers(lambda: SQLiteBackend(db_path=db_path))
+
+    backend = SQLiteBackend(db_path=db_path)
+    _assert_no_lost_entries(backend)
+    assert backend.count() == PROCESSES * KEYS_PER_PROCESS
+    backend.close()
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork start method"
+)
+def test_segment_backend_concurrent_stores_lose_nothing(tmp_path):
+    segments_dir = tmp_path / "segments"
+
+    # Small segments so that sealing happens while other workers append
+    _run_workers(lambda: SegmentLogBackend(segments_dir=segments_dir, max_segment_bytes=4096))
+
+    backend = SegmentLogBackend(segments_dir=segments_dir)
+    _assert_no_lost_entries(backend)
+    assert backend.count() == PROCESSES * KEYS_PER_PROCESS
+    backend.close()
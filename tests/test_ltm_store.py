@@ -1,14 +1,34 @@
 from pathlib import Path
+import os
 import shutil
+import sqlite3
+import threading
+import time
 
-from email_agent.config import LTM_DIR, LTM_INDEX_PATH, LTM_RECORDS_DIR
-from email_agent.ltm_store import lookup, store
+import pytest
+
+from email_agent import ltm_store
+from email_agent.config import LTM_DIR, LTM_DB_PATH
+from email_agent.ltm_store import (
+    build_task_key,
+    cache_stats,
+    legacy_task_key,
+    lookup,
+    lookup_with_fallback,
+    set_backend,
+    store,
+)
+from email_agent.storage.front_cache import LRUTTLCache
+from email_agent.storage.json_backend import JSONFileBackend, key_to_filename
+from email_agent.storage.migrate import migrate_json_to_sqlite
+from email_agent.storage.sqlite_backend import SQLiteBackend
 
 
 def setup_module(module):
     """
     Clean LTM directory before tests, so tests start from a blank slate.
     """
+    set_backend(None)
     if LTM_DIR.exists():
         shutil.rmtree(LTM_DIR, ignore_errors=True)
 
@@ -23,14 +43,277 @@ def test_ltm_store_and_lookup_roundtrip():
     # Store result
     store(task_key, result)
 
-    # Check that index and record files were created
+    # Default backend keeps records inline in a single database file
     assert LTM_DIR.exists()
-    assert LTM_INDEX_PATH.exists()
-    assert LTM_RECORDS_DIR.exists()
-    assert any(LTM_RECORDS_DIR.iterdir()), "Expected at least one record file."
+    assert LTM_DB_PATH.exists()
 
     # Lookup should now return the stored result
     loaded = lookup(task_key)
     assert loaded is not None
     assert loaded["priority"] == "high"
     assert loaded["confidence"] == 0.95
+
+
+def test_sqlite_backend_upsert_overwrites(tmp_path: Path):
+    backend = SQLiteBackend(db_path=tmp_path / "ltm.sqlite3")
+    backend.store("k", {"priority": "low"})
+    backend.store("k", {"priority": "high"})
+
+    assert backend.lookup("k") == {"priority": "high"}
+    assert backend.count() == 1
+    backend.close()
+
+
+def test_migrate_json_layout_to_sqlite(tmp_path: Path):
+    legacy = JSONFileBackend(
+        index_path=tmp_path / "ltm_index.json",
+        records_dir=tmp_path / "records",
+    )
+    legacy.store("a", {"priority": "high", "confidence": 0.9})
+    legacy.store("b", {"priority": "low", "confidence": 0.6})
+
+    db_path = tmp_path / "ltm.sqlite3"
+    counts = migrate_json_to_sqlite(
+        index_path=legacy.index_path,
+        records_dir=legacy.records_dir,
+        db_path=db_path,
+    )
+    assert counts["migrated"] == 2
+
+    # Re-running is a no-op
+    again = migrate_json_to_sqlite(
+        index_path=legacy.index_path,
+        records_dir=legacy.records_dir,
+        db_path=db_path,
+    )
+    assert again["migrated"] == 0
+    assert again["skipped_existing"] == 2
+
+    backend = SQLiteBackend(db_path=db_path)
+    assert backend.lookup("a")["priority"] == "high"
+    assert backend.lookup("b")["confidence"] == 0.6
+    backend.close()
+
+
+class _CountingBackend(SQLiteBackend):
+    def __init__(self, db_path: Path) -> None:
+        super().__init__(db_path=db_path)
+        self.lookups = 0
+
+    def lookup(self, task_key):
+        self.lookups += 1
+        return super().lookup(task_key)
+
+
+def test_front_cache_serves_hot_keys_without_backend(tmp_path: Path):
+    backend = _CountingBackend(tmp_path / "ltm.sqlite3")
+    set_backend(backend)
+    try:
+        store("hot", {"priority": "low"})
+        first = lookup("hot")
+        first["priority"] = "mutated by caller"
+        second = lookup("hot")
+
+        assert backend.lookups == 1
+        assert second == {"priority": "low"}
+        assert cache_stats()["hits"] >= 1
+
+        # store() invalidates the cached entry
+        store("hot", {"priority": "high"})
+        assert lookup("hot") == {"priority": "high"}
+        assert backend.lookups == 2
+    finally:
+        set_backend(None)
+
+
+def test_front_cache_lru_and_ttl_eviction(monkeypatch):
+    cache = LRUTTLCache(max_entries=2, ttl_seconds=10)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    cache.get("a")  # "b" is now least recently used
+    cache.put("c", {"v": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.stats()["evictions"] == 1
+
+    now = time.monotonic()
+    monkeypatch.setattr("email_agent.storage.front_cache.time.monotonic", lambda: now + 60)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_task_key_is_fixed_size_and_covers_inputs():
+    short = build_task_key("email.priority.classify", "hi")
+    huge = build_task_key("email.priority.classify", "x" * 100_000)
+    assert len(short) == len(huge)
+    assert "x" not in huge.split(":", 1)[1]
+
+    meta = {"sender": "boss@example.com", "subject": "Exam"}
+    base = build_task_key("i", "text", meta, model_version="m1")
+    assert base == build_task_key("i", "text", dict(meta), model_version="m1")
+    assert base != build_task_key("i", "text", meta, model_version="m2")
+    assert base != build_task_key("i", "text", {**meta, "sender": "friend@example.com"}, "m1")
+
+
+def test_lookup_with_fallback_resolves_legacy_keys(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(ltm_store, "LTM_LEGACY_KEY_FALLBACK", True)
+    backend = SQLiteBackend(db_path=tmp_path / "ltm.sqlite3")
+    set_backend(backend)
+    try:
+        old_key = legacy_task_key("email.priority.classify", "Urgent: reply today")
+        backend.store(old_key, {"priority": "high"})
+
+        new_key = build_task_key("email.priority.classify", "Urgent: reply today")
+        assert lookup(new_key) is None
+        assert lookup_with_fallback(new_key, legacy_key=old_key) == {"priority": "high"}
+
+        # The legacy hit is promoted to the hashed key
+        assert backend.lookup(new_key) == {"priority": "high"}
+    finally:
+        set_backend(None)
+
+
+def test_sqlite_backend_bulk_roundtrip(tmp_path: Path):
+    backend = SQLiteBackend(db_path=tmp_path / "ltm.sqlite3")
+    backend.store_many([(f"k{i}", {"n": i}) for i in range(1200)])
+
+    found = backend.lookup_many(["k0", "k599", "k1199", "missing"])
+    assert found == {"k0": {"n": 0}, "k599": {"n": 599}, "k1199": {"n": 1199}}
+    assert backend.count() == 1200
+    backend.close()
+
+
+def test_sqlite_backend_close_closes_every_thread_connection(tmp_path: Path):
+    backend = SQLiteBackend(db_path=tmp_path / "ltm.sqlite3")
+    backend.store("k", {"n": 1})
+    connections = [backend.connection()]
+
+    def worker():
+        assert backend.lookup("k") == {"n": 1}
+        connections.append(backend.connection())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(conn) for conn in connections}) == 5
+
+    backend.close()
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    # Still usable afterwards: a new connection is opened on demand
+    assert backend.lookup("k") == {"n": 1}
+    backend.close()
+
+
+def test_sqlite_compaction_evicts_lru_and_expires(tmp_path: Path):
+    backend = SQLiteBackend(db_path=tmp_path / "ltm.sqlite3", track_access=True)
+    backend.store_many([(f"k{i}", {"n": i}) for i in range(10)])
+    conn = backend.connection()
+    # Older writes first, then make k0 the most recently used entry
+    for i in range(10):
+        conn.execute("UPDATE ltm_records SET last_access = ?, updated_at = ? WHERE task_key = ?",
+                     (1000.0 + i, 1000.0 + i, f"k{i}"))
+    conn.execute("UPDATE ltm_records SET updated_at = ? WHERE task_key != 'k0'", (time.time(),))
+    assert backend.lookup("k0") == {"n": 0}
+
+    report = backend.compact(max_entries=5, max_age_seconds=3600)
+    # k0 is too old even though it was just read; then k1..k4 are the LRU ones
+    assert report["expired"] == 1
+    assert report["evicted"] == 4
+    assert report["entries"] == 5
+    assert sorted(backend.lookup_many([f"k{i}" for i in range(10)])) == [f"k{i}" for i in range(5, 10)]
+    backend.close()
+
+
+def test_sqlite_compaction_lfu_and_max_bytes(tmp_path: Path):
+    backend = SQLiteBackend(db_path=tmp_path / "ltm.sqlite3", track_access=True)
+    backend.store_many([("hot", {"v": "x" * 100}), ("cold", {"v": "y" * 100})])
+    backend.lookup("hot")
+    backend.lookup_many(["hot"])
+
+    report = backend.compact(max_bytes=150, policy="lfu")
+    assert report["evicted"] == 1
+    assert backend.lookup("hot") is not None
+    assert backend.lookup("cold") is None
+    assert report["payload_bytes"] <= 150
+    backend.close()
+
+
+def test_json_compaction_removes_orphans_and_reports_space(tmp_path: Path):
+    backend = JSONFileBackend(
+        index_path=tmp_path / "ltm_index.json",
+        records_dir=tmp_path / "records",
+        track_access=True,
+    )
+    backend.orphan_grace_seconds = 0
+    backend.store_many([(f"k{i}", {"n": i}) for i in range(4)])
+    (backend.records_dir / "orphan.json").write_text('{"priority": "low"}' * 50)
+    (backend.records_dir / ".ltm_index.json.crashed.tmp").write_text("{")
+    for i in range(4):
+        record = backend.records_dir / backend.load_index()[f"k{i}"]
+        os.utime(record, (1000.0 + i, record.stat().st_mtime))
+    backend.lookup("k0")  # k1 becomes the least recently used entry
+
+    report = backend.compact(max_entries=3)
+
+    assert report["orphans_removed"] == 1
+    assert report["evicted"] == 1
+    assert report["entries"] == 3
+    assert report["bytes_reclaimed"] > 1000
+    assert report["disk_bytes_after"] == sum(
+        p.stat().st_size for p in tmp_path.rglob("*") if p.is_file() and p.suffix != ".lock"
+    )
+    assert backend.lookup("k1") is None
+    assert backend.lookup("k0") == {"n": 0}
+    assert sorted(p.name for p in backend.records_dir.iterdir()) == sorted(
+        backend.load_index().values()
+    )
+
+
+def test_json_backend_survives_index_removed_before_locking(tmp_path: Path, monkeypatch):
+    backend = JSONFileBackend(index_path=tmp_path / "ltm_index.json", records_dir=tmp_path / "records")
+    ensure_dirs = backend._ensure_dirs
+
+    def ensure_then_lose_index(**kwargs):
+        # The index disappears between the unlocked check and the locked update
+        ensure_dirs(**kwargs)
+        if not kwargs.get("locked"):
+            backend.index_path.unlink(missing_ok=True)
+
+    monkeypatch.setattr(backend, "_ensure_dirs", ensure_then_lose_index)
+
+    def run(step):
+        # Re-locking the index lock from the same process used to block forever
+        thread = threading.Thread(target=step, daemon=True)
+        thread.start()
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+
+    run(lambda: backend.store("k", {"n": 1}))
+    assert backend._read_index() == {"k": key_to_filename("k")}
+    run(lambda: backend.compact())
+    assert backend.index_path.exists()
+
+
+def test_sqlite_backend_upgrades_old_schema(tmp_path: Path):
+    db_path = tmp_path / "ltm.sqlite3"
+    conn = sqlite3.connect(str(db_path))
+    conn.execute(
+        "CREATE TABLE ltm_records (task_key TEXT PRIMARY KEY, result TEXT NOT NULL, "
+        "created_at REAL NOT NULL, updated_at REAL NOT NULL) WITHOUT ROWID"
+    )
+    conn.execute("INSERT INTO ltm_records VALUES ('old', '{\"priority\": \"low\"}', 5.0, 5.0)")
+    conn.commit()
+    conn.close()
+
+    backend = SQLiteBackend(db_path=db_path)
+    assert backend.lookup("old") == {"priority": "low"}
+    row = backend.connection().execute(
+        "SELECT last_access, hits, size FROM ltm_records WHERE task_key = 'old'"
+    ).fetchone()
+    assert row == (5.0, 0, len('{"priority": "low"}'))
+    backend.close()
@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+
+from email_agent import ltm_store, metrics
+from email_agent.metrics import Counter, Histogram
+from email_agent.storage.sqlite_backend import SQLiteBackend
+
+
+def _sample(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise KeyError(name)
+
+
+def test_render_histogram_and_counter(monkeypatch):
+    histogram = Histogram("t_latency_seconds", "Test latency.", ("stage",), buckets=(0.01, 0.1))
+    counter = Counter("t_events_total", "Test events.", ("kind",))
+    monkeypatch.setattr(metrics, "METRICS", (histogram, counter))
+    monkeypatch.setattr(metrics, "METRICS_DIR", None)
+
+    histogram.observe(0.005, stage="parse")
+    histogram.observe(0.05, stage="parse")
+    histogram.observe(3.0, stage="parse")
+    counter.inc(kind='say "hi"')
+    counter.inc(2, kind='say "hi"')
+
+    text = metrics.render()
+    assert "# TYPE t_latency_seconds histogram" in text
+    assert 't_latency_seconds_bucket{stage="parse",le="0.01"} 1' in text
+    assert 't_latency_seconds_bucket{stage="parse",le="0.1"} 2' in text
+    assert 't_latency_seconds_bucket{stage="parse",le="+Inf"} 3' in text
+    assert 't_latency_seconds_count{stage="parse"} 3' in text
+    assert 't_latency_seconds_sum{stage="parse"} 3.055' in text
+    assert 't_events_total{kind="say \\"hi\\""} 3' in text
+
+
+def test_render_sums_the_snapshots_of_all_workers(monkeypatch, tmp_path: Path):
+    counter = Counter("t_lookups_total", "Test lookups.", ("tier",))
+    histogram = Histogram("t_seconds", "Test.", buckets=(1.0,))
+    monkeypatch.setattr(metrics, "METRICS", (counter, histogram))
+    monkeypatch.setattr(metrics, "METRICS_DIR", tmp_path)
+
+    # Another worker's snapshot, as written by its flush()
+    (tmp_path / "99999999.json").write_text(
+        json.dumps({"t_lookups_total": [[["exact"], 4.0]], "t_seconds": [[[], [1, 1], 2.5]]}),
+        encoding="utf-8",
+    )
+    counter.inc(tier="exact")
+    counter.inc(tier="miss")
+    histogram.observe(0.5)
+
+    text = metrics.render()
+    assert 't_lookups_total{tier="exact"} 5' in text
+    assert 't_lookups_total{tier="miss"} 1' in text
+    assert 't_seconds_bucket{le="1.0"} 2' in text
+    assert 't_seconds_count 3' in text
+    # render() flushed this process's own snapshot too
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_metrics_endpoint_reports_stages_and_counters(client, tmp_path: Path):
+    payload = {
+        "request_id": "metrics-1",
+        "agent_name": "email_priority_agent",
+        "intent": "email.priority.classify",
+        "input": {"text": "Metrics check: the nightly export failed, please rerun it."},
+    }
+    before = client.get("/metrics").get_data(as_text=True)
+    ltm_store.set_backend(SQLiteBackend(db_path=tmp_path / "ltm.sqlite3"))
+    try:
+        for _ in range(2):
+            client.post("/handle", data=json.dumps(payload), content_type="application/json")
+    finally:
+        ltm_store.set_backend(None)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+
+    def delta(name: str) -> float:
+        try:
+            old = _sample(before, name)
+        except KeyError:
+            old = 0.0
+        return _sample(text, name) - old
+
+    assert delta('email_agent_requests_total{endpoint="handle",status="200"}') == 2
+    assert delta('email_agent_ltm_lookups_total{tier="miss"}') == 1
+    assert delta('email_agent_ltm_lookups_total{tier="exact"}') == 1
+    assert delta('email_agent_request_duration_seconds_count{endpoint="handle"}') == 2
+    for stage, count in (("parse", 2), ("validate", 2), ("ltm_lookup", 2), ("classify", 1), ("serialize", 2)):
+        name = f'email_agent_stage_duration_seconds_count{{endpoint="handle",stage="{stage}"}}'
+        assert delta(name) == count
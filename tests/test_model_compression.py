@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from email_agent import config, priority_logic
+from email_agent.compiled_model import CompiledModel
+from email_agent.learning import model_store
+from email_agent.learning.model_compression import compress, held_out_split, prune, tradeoff_curve
+from email_agent.learning.model_export import compile_pipeline
+from email_agent.learning.model_training import build_pipeline
+
+TEXTS, LABELS = held_out_split()
+
+
+@pytest.fixture(scope="module")
+def model() -> CompiledModel:
+    # Trained on the held-out split itself: only the compression is under test
+    return compile_pipeline(build_pipeline().fit(TEXTS, LABELS))
+
+
+def test_quantized_models_stay_close(model: CompiledModel, tmp_path: Path):
+    baseline = model.predict_proba(TEXTS)
+
+    float32 = compress(model, dtype="float32")
+    assert float32.coef.dtype == np.float32
+    assert np.abs(float32.predict_proba(TEXTS) - baseline).max() < 1e-5
+
+    int8 = compress(model, dtype="int8")
+    int8.save(tmp_path / "model.npz")
+    loaded = CompiledModel.load(tmp_path / "model.npz")
+    assert loaded.coef.dtype == np.int8 and loaded.coef_scale is not None
+    assert np.abs(loaded.predict_proba(TEXTS) - baseline).max() < 0.02
+    assert list(loaded.predict(TEXTS)) == list(model.predict(TEXTS))
+
+
+def test_prune_keeps_largest_coefficients(model: CompiledModel):
+    pruned = prune(model, 0.25)
+    assert pruned.n_features == round(0.25 * model.n_features)
+    threshold = np.abs(pruned.coef).max(axis=1).min()
+    dropped = set(model.terms) - set(pruned.terms)
+    assert all(np.abs(model.coef[model.terms.index(term)]).max() <= threshold for term in dropped)
+    with pytest.raises(ValueError):
+        prune(compress(model, dtype="int8"), 0.5)
+
+
+def test_tradeoff_curve(model: CompiledModel):
+    curve = tradeoff_curve(model, TEXTS, LABELS, keep_ratios=[1.0, 0.1], dtypes=["float64", "int8"])
+    by_variant = {(entry["keep_ratio"], entry["dtype"]): entry for entry in curve}
+
+    baseline = by_variant[(1.0, "float64")]
+    assert baseline["agreement"] == 1.0 and baseline["max_proba_diff"] == 0.0
+    assert by_variant[(1.0, "int8")]["size_bytes"] < baseline["size_bytes"]
+    assert by_variant[(0.1, "int8")]["size_bytes"] < by_variant[(1.0, "int8")]["size_bytes"]
+    assert by_variant[(0.1, "float64")]["n_features"] < baseline["n_features"]
+
+
+def test_compressed_version_is_served(model: CompiledModel, monkeypatch, tmp_path: Path):
+    monkeypatch.setattr(config, "MODEL_REGISTRY_DIR", tmp_path / "registry")
+    monkeypatch.setattr(config, "USE_COMPILED_MODEL", False)  # npz-only versions are served anyway
+    monkeypatch.setattr(priority_logic, "_ACTIVE", None)
+    monkeypatch.setattr(priority_logic, "_LOAD_ATTEMPTED", False)
+
+    version = model_store.save_model(compress(model, 0.5, "int8"), params={"keep_ratio": 0.5})
+    assert not (tmp_path / "registry" / version / model_store.MODEL_FILE).exists()
+    assert model_store.read_metadata(version)["model_type"] == "CompiledModel"
+
+    result = priority_logic.classify_email("Urgent: the production server is down, fix it ASAP.")
+    assert result["model_version"] == version
+    assert priority_logic._ACTIVE[0].coef.dtype == np.int8
+    with pytest.raises(FileNotFoundError):
+        model_store.load_model(version)
@@ -0,0 +1,129 @@
+from pathlib import Path
+
+import pytest
+
+from email_agent import config, ltm_store, priority_logic, service, warmup
+from email_agent.learning import model_store
+from email_agent.learning.model_training import build_pipeline
+from email_agent.ltm_store import build_task_key, legacy_task_key
+from email_agent.storage.sqlite_backend import SQLiteBackend
+
+TEXTS = [
+    "urgent production outage fix now",
+    "server down asap critical",
+    "please review the report this week",
+    "meeting notes for next sprint",
+    "lunch on friday?",
+    "funny cat pictures",
+]
+LABELS = ["high", "high", "medium", "medium", "low", "low"]
+EMAIL = "Urgent: the production server is down, fix it ASAP."
+
+
+@pytest.fixture
+def registry(monkeypatch, tmp_path: Path) -> Path:
+    monkeypatch.setattr(config, "MODEL_REGISTRY_DIR", tmp_path / "registry")
+    monkeypatch.setattr(priority_logic, "_ACTIVE", None)
+    monkeypatch.setattr(priority_logic, "_LOAD_ATTEMPTED", False)
+    monkeypatch.setattr(priority_logic, "_RELOADING", False)
+    return tmp_path / "registry"
+
+
+def _train(C: float):
+    return build_pipeline({"clf__C": C}).fit(TEXTS, LABELS)
+
+
+def test_register_and_activate_versions(registry):
+    first = model_store.register_model(_train(1.0), metrics={"accuracy": 0.9}, params={"clf__C": 1.0})
+    assert model_store.active_version() is None  # registering alone does not activate
+
+    second = model_store.save_model(_train(10.0), metrics={"accuracy": 0.95})
+    assert model_store.active_version() == second
+    assert model_store.active_model_file() == (second, registry / second / model_store.MODEL_FILE)
+
+    versions = {entry["version"]: entry for entry in model_store.list_versions()}
+    assert set(versions) == {first, second}
+    assert versions[first]["metrics"] == {"accuracy": 0.9}
+    assert versions[first]["params"] == {"clf__C": 1.0}
+    assert versions[second]["active"] and not versions[first]["active"]
+    assert len(versions[first]["sha256"]) == 64
+
+    model_store.activate(first)
+    assert model_store.active_version() == first
+    with pytest.raises(FileNotFoundError):
+        model_store.activate("no-such-version")
+
+
+def test_hot_reload_swaps_model_and_ltm_key(registry):
+    first = model_store.save_model(_train(1.0))
+    result = priority_logic.classify_email(EMAIL)
+    assert result["model_version"] == first
+    key_before = build_task_key("email.priority.classify", EMAIL, None, model_version=priority_logic.get_model_version())
+
+    # Another process activates a new version; this one follows without a restart
+    second = model_store.save_model(_train(10.0))
+    assert priority_logic.check_for_new_model(force=True, wait=True) == second
+    result = priority_logic.classify_email(EMAIL)
+    assert result["model_version"] == second
+    key_after = build_task_key("email.priority.classify", EMAIL, None, model_version=priority_logic.get_model_version())
+    assert key_after != key_before
+
+    # Nothing new to load
+    assert priority_logic.check_for_new_model(force=True, wait=True) is None
+
+
+def test_ready_endpoint_reports_the_served_version(client, registry):
+    assert warmup.wait_until_ready(timeout=30)
+    first = model_store.save_model(_train(1.0))
+    priority_logic.check_for_new_model(force=True, wait=True)
+    assert client.get("/ready").get_json()["model_version"] == first
+
+    second = model_store.save_model(_train(10.0))
+    priority_logic.reload_model()
+    assert client.get("/ready").get_json()["model_version"] == second
+
+
+def test_admin_reload_endpoint(client, registry, monkeypatch):
+    first = model_store.save_model(_train(1.0))
+    second = model_store.register_model(_train(10.0))
+
+    monkeypatch.setattr(service, "ADMIN_TOKEN", None)
+    assert client.post("/admin/reload_model", headers={"X-Admin-Token": "x"}).status_code == 403
+
+    monkeypatch.setattr(service, "ADMIN_TOKEN", "s3cret")
+    assert client.post("/admin/reload_model", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.post("/admin/reload_model", json={"version": second}, headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ok", "previous_version": first, "model_version": second}
+    assert model_store.active_version() == second
+
+    response = client.post("/admin/reload_model", json={"version": "missing"}, headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 404
+
+
+def test_legacy_ltm_keys_are_ignored_once_a_version_is_active(client, registry, monkeypatch, tmp_path: Path):
+    monkeypatch.setattr(ltm_store, "LTM_LEGACY_KEY_FALLBACK", True)
+    monkeypatch.setattr(config, "MODEL_PATH", tmp_path / "no-legacy-model.pkl")
+    backend = SQLiteBackend(db_path=tmp_path / "ltm.sqlite3")
+    stale = {"priority": "low", "confidence": 1.0, "model_version": "pre-registry"}
+    backend.store(legacy_task_key("email.priority.classify", EMAIL), stale)
+    payload = {
+        "request_id": "legacy-1",
+        "agent_name": "email_priority_agent",
+        "intent": "email.priority.classify",
+        "input": {"text": EMAIL},
+    }
+    ltm_store.set_backend(backend)
+    try:
+        # No registry version yet: the legacy entry is still trusted
+        result = client.post("/handle", json=payload).get_json()["output"]["result"]
+        assert result["model_version"] == "pre-registry"
+
+        version = model_store.save_model(_train(1.0))
+        assert priority_logic.check_for_new_model(force=True, wait=True) == version
+        result = client.post("/handle", json=payload).get_json()["output"]["result"]
+        assert "ltm_match" not in result
+        assert result["model_version"] == version
+    finally:
+        ltm_store.set_backend(None)
@@ -0,0 +1,177 @@
+import json
+import random
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+from email_agent import ltm_store
+from email_agent.simhash import band_count, bands, simhash, similarity
+from email_agent.storage.simhash_index import SimHashIndex
+from email_agent.storage.sqlite_backend import SQLiteBackend
+
+TEMPLATE = (
+    "Hi {name}, your support ticket #{ticket} was updated on {date}. Please log in to the "
+    "portal to review the latest response from our team and reply if the issue persists."
+)
+
+
+def _handshake(request_id, text):
+    return {
+        "request_id": request_id,
+        "agent_name": "email_priority_agent",
+        "intent": "email.priority.classify",
+        "input": {"text": text, "metadata": {"sender": "support@example.com", "subject": "Ticket update"}},
+    }
+
+
+def test_simhash_separates_templates_from_unrelated_emails():
+    a = simhash(TEMPLATE.format(name="Alice", ticket=48213, date="2024-05-03"))
+    b = simhash(TEMPLATE.format(name="Bob", ticket=51877, date="2024-06-11"))
+    other = simhash("Urgent: the production database is down, please fix it ASAP before the demo.")
+
+    assert similarity(a, a) == 1.0
+    assert similarity(a, b) >= 0.85
+    assert similarity(a, other) < 0.75
+    assert band_count(0.875) == 9
+    assert len(bands(a, 9)) == 9
+
+
+def test_simhash_index_returns_most_similar_in_scope(tmp_path: Path):
+    index = SimHashIndex(db_path=tmp_path / "near.sqlite3")
+    alice = simhash(TEMPLATE.format(name="Alice", ticket=1, date="today"))
+    index.add_many([("k-alice", "scope-a", alice), ("k-other", "scope-b", alice)])
+
+    bob = simhash(TEMPLATE.format(name="Bob", ticket=2, date="today"))
+    assert index.nearest("scope-a", bob, threshold=0.8)[0] == "k-alice"
+    assert index.nearest("scope-c", bob, threshold=0.8) is None
+
+    index.remove("k-alice")
+    assert index.nearest("scope-a", bob, threshold=0.8) is None
+    assert index.count() == 1
+    index.close()
+
+
+def test_simhash_index_finds_matches_at_the_threshold_edge(tmp_path: Path):
+    index = SimHashIndex(db_path=tmp_path / "near.sqlite3", threshold=0.875)
+    # One differing bit in each 8-bit eighth: 8 bands of 8 bits would share none
+    base = 0x0123456789ABCDEF
+    spread = base ^ sum(1 << bit for bit in range(0, 64, 8))
+    index.add("k-base", "scope", base)
+    assert index.nearest("scope", spread, threshold=0.875) == ("k-base", 0.875)
+
+    rng = random.Random(7)
+    items = []
+    queries = []
+    for trial in range(200):
+        signature = rng.getrandbits(64)
+        flipped = signature
+        for bit in rng.sample(range(64), 8):
+            flipped ^= 1 << bit
+        items.append((f"k-{trial}", f"scope-{trial}", signature))
+        queries.append((f"scope-{trial}", flipped))
+    index.add_many(items)
+    for trial, (scope, flipped) in enumerate(queries):
+        assert index.nearest(scope, flipped, threshold=0.875) == (f"k-{trial}", 0.875)
+    index.close()
+
+
+def test_simhash_index_replaces_signatures_and_rebuilds_bands(tmp_path: Path):
+    path = tmp_path / "near.sqlite3"
+    index = SimHashIndex(db_path=path, threshold=0.875)
+    index.add("k", "scope", 0)
+    index.add("k", "scope", (1 << 64) - 1)
+    conn = index.connection()
+    assert conn.execute("SELECT COUNT(*) FROM near_bands").fetchone()[0] == 9
+    assert index.nearest("scope", 0, threshold=0.5) is None
+
+    # close() also closes the connections other threads opened
+    thread = threading.Thread(target=lambda: index.nearest("scope", 0, threshold=0.9))
+    thread.start()
+    thread.join()
+    assert len(index._connections) == 2
+    index.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    assert index._connections == []
+
+    # Opened with another threshold, every signature is re-filed
+    index = SimHashIndex(db_path=path, threshold=0.75)
+    assert index.connection().execute("SELECT COUNT(*) FROM near_bands").fetchone()[0] == 17
+    assert index.nearest("scope", (1 << 64) - 1 - 0xFFFF, threshold=0.75) == ("k", 0.75)
+    index.close()
+
+
+def test_handle_serves_near_duplicates_from_ltm(client, tmp_path: Path):
+    ltm_store.set_backend(SQLiteBackend(db_path=tmp_path / "ltm.sqlite3"))
+    ltm_store.set_near_index(SimHashIndex(db_path=tmp_path / "near.sqlite3"))
+    before = ltm_store.tier_stats()
+    try:
+        first = client.post(
+            "/handle",
+            data=json.dumps(_handshake("n-1", TEMPLATE.format(name="Alice", ticket=48213, date="3 May"))),
+            content_type="application/json",
+        ).get_json()
+        second = client.post(
+            "/handle",
+            data=json.dumps(_handshake("n-2", TEMPLATE.format(name="Bob", ticket=51877, date="11 June"))),
+            content_type="application/json",
+        ).get_json()
+        repeat = client.post(
+            "/handle",
+            data=json.dumps(_handshake("n-3", TEMPLATE.format(name="Alice", ticket=48213, date="3 May"))),
+            content_type="application/json",
+        ).get_json()
+    finally:
+        ltm_store.set_near_index(None)
+        ltm_store.set_backend(None)
+
+    assert "ltm_match" not in first["output"]["result"]
+    match = second["output"]["result"]["ltm_match"]
+    assert match["tier"] == "near"
+    assert 0.85 <= match["similarity"] < 1.0
+    assert second["output"]["result"]["priority"] == first["output"]["result"]["priority"]
+    assert repeat["output"]["result"]["ltm_match"]["tier"] == "exact"
+    assert repeat["output"]["result"]["ltm_match"]["similarity"] == 1.0
+    assert repeat["output"]["result"]["ltm_match"]["matched_key"] == match["matched_key"]
+
+    after = ltm_store.tier_stats()
+    assert after["near_hits"] - before["near_hits"] == 1
+    assert after["exact_hits"] - before["exact_hits"] == 1
+    assert after["misses"] - before["misses"] == 1
+
+    stats = client.get("/stats").get_json()
+    assert stats["ltm"]["near_hits"] >= 1
+    assert 0.0 <= stats["ltm"]["near_hit_rate"] <= 1.0
+
+
+def test_handle_batch_uses_near_tier(client, tmp_path: Path):
+    ltm_store.set_backend(SQLiteBackend(db_path=tmp_path / "ltm.sqlite3"))
+    ltm_store.set_near_index(SimHashIndex(db_path=tmp_path / "near.sqlite3"))
+    try:
+        client.post(
+            "/handle",
+            data=json.dumps(_handshake("seed", TEMPLATE.format(name="Carol", ticket=7, date="1 July"))),
+            content_type="application/json",
+        )
+        data = client.post(
+            "/handle_batch",
+            data=json.dumps(
+                {
+                    "request_id": "nb",
+                    "requests": [
+                        _handshake("nb-1", TEMPLATE.format(name="Dave", ticket=8, date="2 July")),
+                        _handshake("nb-2", "Hey, just sharing some memes from the weekend."),
+                    ],
+                }
+            ),
+            content_type="application/json",
+        ).get_json()
+    finally:
+        ltm_store.set_near_index(None)
+        ltm_store.set_backend(None)
+
+    near, miss = data["results"]
+    assert near["output"]["result"]["ltm_match"]["tier"] == "near"
+    assert "ltm_match" not in miss["output"]["result"]
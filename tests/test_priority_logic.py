@@ -1,4 +1,4 @@
-from email_agent.priority_logic import classify_email
+from email_agent.priority_logic import classify_email, render_summary
 
 
 def test_classify_email_high_priority():
@@ -24,3 +24,42 @@ def test_classify_email_low_priority():
 
     assert result["priority"] in {"low", "medium"}  # low by default; allow medium if model changes
     assert result["confidence"] >= 0.5
+
+
+def test_classify_email_runs_model_once(monkeypatch):
+    import numpy as np
+
+    from email_agent import priority_logic
+
+    class _FakeModel:
+        classes_ = np.array(["high", "low", "medium"])
+
+        def __init__(self):
+            self.calls = []
+
+        def predict(self, texts):
+            self.calls.append("predict")
+            return np.array(["high"] * len(texts))
+
+        def predict_proba(self, texts):
+            self.calls.append("predict_proba")
+            return np.array([[0.1, 0.7, 0.2]] * len(texts))
+
+    fake = _FakeModel()
+    monkeypatch.setattr(priority_logic, "_ACTIVE", (fake, "fake-1"))
+    monkeypatch.setattr(priority_logic, "_LOAD_ATTEMPTED", True)
+    monkeypatch.setattr(priority_logic, "MODEL_RELOAD_INTERVAL_SECONDS", 0)
+
+    result = classify_email(text="Hey, sharing some photos.", metadata=None, context=None)
+
+    assert fake.calls == ["predict_proba"]
+    assert result["priority"] == "low"
+    assert result["confidence"] == 0.7
+    assert "[TAG: ML_MODEL]" in result["explanation"]
+    assert result["model_version"] == "fake-1"
+
+
+def test_classify_email_does_not_render_summary():
+    result = classify_email(text="Urgent: reply today.", metadata={"sender": "boss@example.com"})
+    assert "human_readable_summary" not in result
+    assert "Priority Level: " in render_summary(result, {"sender": "boss@example.com"})
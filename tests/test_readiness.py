@@ -0,0 +1,26 @@
+from email_agent import warmup
+
+
+def test_ready_endpoint_turns_green_after_warm_up(client):
+    assert warmup.wait_until_ready(timeout=30)
+
+    response = client.get("/ready")
+    assert response.status_code == 200
+
+    data = response.get_json()
+    assert data["status"] == "ready"
+    assert data["warmup_duration_ms"] is not None
+    assert data["model_version"]
+
+
+def test_ready_endpoint_reports_not_ready(client, monkeypatch):
+    monkeypatch.setattr(
+        "app.readiness",
+        lambda: {"status": "running", "duration_ms": None, "model_version": None, "error": None},
+    )
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "running"
+
+    # Liveness is independent of warm-up
+    assert client.get("/health").status_code == 200
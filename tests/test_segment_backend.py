@@ -0,0 +1,188 @@
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+from email_agent.storage import create_backend, segment_backend
+from email_agent.storage.segment_backend import SegmentLogBackend
+
+
+def _backend(tmp_path: Path, **kwargs) -> SegmentLogBackend:
+    return SegmentLogBackend(segments_dir=tmp_path / "segments", **kwargs)
+
+
+def test_segment_backend_roundtrip_and_overwrite(tmp_path: Path):
+    backend = _backend(tmp_path)
+    assert backend.lookup("k") is None
+
+    backend.store("k", {"priority": "low"})
+    backend.store("k", {"priority": "high"})
+    backend.store_many([(f"b{i}", {"n": i}) for i in range(100)])
+
+    assert backend.lookup("k") == {"priority": "high"}
+    assert backend.lookup_many(["b0", "b99", "missing"]) == {"b0": {"n": 0}, "b99": {"n": 99}}
+    assert backend.count() == 101
+    backend.close()
+    assert create_backend("segment").name == "segment"
+
+
+def test_segments_rotate_and_reload_from_footers(tmp_path: Path):
+    backend = _backend(tmp_path, max_segment_bytes=2048, merge_garbage_ratio=0)
+    for i in range(200):
+        backend.store(f"k{i}", {"n": i, "pad": "x" * 50})
+    backend.close()
+
+    segments = sorted((tmp_path / "segments").glob("*.seg"))
+    assert len(segments) > 3
+
+    # A fresh process rebuilds its index from the footers + the active tail
+    reopened = _backend(tmp_path, max_segment_bytes=2048)
+    assert reopened.lookup("k0") == {"n": 0, "pad": "x" * 50}
+    assert reopened.lookup("k199")["n"] == 199
+    assert reopened.count() == 200
+    reopened.close()
+
+
+def test_torn_tail_is_ignored_and_truncated(tmp_path: Path):
+    backend = _backend(tmp_path)
+    backend.store("good", {"priority": "high"})
+    backend.close()
+
+    # Simulate a writer that crashed in the middle of an append
+    (active,) = (tmp_path / "segments").glob("*.seg")
+    with open(active, "ab") as handle:
+        handle.write(b"\x01\x02\x03 half a record")
+
+    reopened = _backend(tmp_path)
+    assert reopened.lookup("good") == {"priority": "high"}
+    reopened.store("after", {"priority": "low"})
+    assert reopened.lookup("after") == {"priority": "low"}
+    reopened.close()
+
+    again = _backend(tmp_path)
+    assert again.count() == 2
+    again.close()
+
+
+def test_writes_from_another_process_are_seen_on_miss(tmp_path: Path):
+    reader = _backend(tmp_path, refresh_interval=0)
+    writer = _backend(tmp_path)
+    assert reader.lookup("k") is None
+
+    writer.store("k", {"priority": "medium"})
+    assert reader.lookup("k") == {"priority": "medium"}
+    reader.close()
+    writer.close()
+
+
+def test_miss_refreshes_are_rate_limited(tmp_path: Path, monkeypatch):
+    reader = _backend(tmp_path, refresh_interval=60)
+    writer = _backend(tmp_path)
+    assert reader.lookup("k") is None
+
+    listings = []
+    real_listdir = os.listdir
+    monkeypatch.setattr(segment_backend.os, "listdir", lambda path: listings.append(path) or real_listdir(path))
+    writer.store("k", {"priority": "medium"})
+    listings.clear()
+    for _ in range(100):
+        assert reader.lookup("k") is None
+        assert reader.lookup_many(["k", "other"]) == {}
+    assert listings == []
+
+    # Once the interval has passed, the next miss catches up
+    later = time.monotonic() + 61
+    monkeypatch.setattr(segment_backend.time, "monotonic", lambda: later)
+    assert reader.lookup("k") == {"priority": "medium"}
+    assert len(listings) == 1
+    reader.close()
+    writer.close()
+
+
+def test_merge_drops_superseded_records_and_enforces_limits(tmp_path: Path):
+    backend = _backend(tmp_path, max_segment_bytes=4096, merge_garbage_ratio=0)
+    other = _backend(tmp_path, max_segment_bytes=4096, merge_garbage_ratio=0)
+    for round_ in range(5):
+        backend.store_many([(f"k{i}", {"round": round_, "pad": "x" * 40}) for i in range(50)])
+    assert other.lookup("k0")["round"] == 4
+    assert backend.garbage_ratio() > 0.7
+
+    report = backend.compact(max_entries=40)
+
+    assert report["evicted"] == 10
+    assert report["entries"] == 40
+    assert report["bytes_reclaimed"] > 0
+    assert backend.count() == 40
+    assert backend.lookup("k49") == {"round": 4, "pad": "x" * 40}
+    assert backend.garbage_ratio() < 0.05
+    # Another worker notices the merge and still resolves every live key
+    assert other.lookup("k49") == {"round": 4, "pad": "x" * 40}
+    assert other.count() == 40
+    backend.close()
+    other.close()
+
+
+def test_background_merge_runs_when_garbage_piles_up(tmp_path: Path):
+    backend = _backend(tmp_path / "merged", max_segment_bytes=2048, merge_garbage_ratio=0.5)
+    baseline = _backend(tmp_path / "baseline", max_segment_bytes=2048, merge_garbage_ratio=0)
+    for round_ in range(10):
+        items = [(f"k{i}", {"round": round_}) for i in range(20)]
+        backend.store_many(items)
+        baseline.store_many(items)
+    if backend._merge_thread is not None:
+        backend._merge_thread.join(timeout=10)
+
+    # Merges run when a segment is sealed, so only the active segment may
+    # still hold superseded records
+    assert backend.disk_bytes() < baseline.disk_bytes() / 2
+    assert all(backend.lookup(f"k{i}") == {"round": 9} for i in range(20))
+    backend.close()
+    baseline.close()
+
+
+def test_concurrent_lookups_survive_merges(tmp_path: Path, monkeypatch):
+    backend = _backend(tmp_path, max_segment_bytes=2048, merge_garbage_ratio=0, refresh_interval=0)
+    # Another worker in the same directory: its merges retire our segments,
+    # and its new files may reuse the fd numbers of the ones we close
+    other = _backend(tmp_path, max_segment_bytes=2048, merge_garbage_ratio=0)
+    keys = [f"k{i}" for i in range(60)]
+    backend.store_many([(key, {"key": key, "round": 0}) for key in keys])
+
+    # Readers get descheduled between finding a segment and reading it
+    read = segment_backend._Segment.read
+
+    def slow_read(segment, offset, length):
+        time.sleep(0.001)
+        return read(segment, offset, length)
+
+    monkeypatch.setattr(segment_backend._Segment, "read", slow_read)
+    errors = []
+    monkeypatch.setattr(segment_backend.logger, "exception", lambda *args, **kwargs: errors.append(args))
+    done = threading.Event()
+
+    def reader(seed):
+        rng = random.Random(seed)
+        while not done.is_set():
+            key = rng.choice(keys)
+            found = backend.lookup(key) if rng.random() < 0.5 else backend.lookup_many([key, "missing"]).get(key)
+            if found is not None and found.get("key") != key:
+                errors.append(("wrong record", key, found))
+
+    threads = [threading.Thread(target=reader, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for round_ in range(1, 21):
+            writer = other if round_ % 2 else backend
+            writer.store_many([(key, {"key": key, "round": round_}) for key in keys])
+            writer.compact()
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    assert all(backend.lookup(key) == {"key": key, "round": 20} for key in keys)
+    backend.close()
+    other.close()
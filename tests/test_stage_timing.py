@@ -0,0 +1,45 @@
+import json
+from pathlib import Path
+
+import app as app_module
+from email_agent import ltm_store
+from email_agent.storage.sqlite_backend import SQLiteBackend
+from email_agent.utils.timing import StageTimer, parse_server_timing
+
+
+def test_stage_timer_accumulates_and_round_trips():
+    timer = StageTimer()
+    with timer.stage("classify"):
+        pass
+    timer.add("ltm_lookup", 1.5)
+    timer.add("ltm_lookup", 0.5)
+
+    assert timer.stages["ltm_lookup"] == 2.0
+    assert timer.stages["classify"] >= 0.0
+    parsed = parse_server_timing(timer.server_timing())
+    assert parsed["ltm_lookup"] == 2.0
+    assert set(parsed) == {"classify", "ltm_lookup"}
+    assert parse_server_timing('cache;desc="x", db;dur=bad, app;dur=3') == {"app": 3.0}
+
+
+def test_handle_sends_server_timing_when_enabled(client, monkeypatch, tmp_path: Path):
+    payload = {
+        "request_id": "timing-1",
+        "agent_name": "email_priority_agent",
+        "intent": "email.priority.classify",
+        "input": {"text": "Server-Timing check: the release is blocked, please review today."},
+    }
+    ltm_store.set_backend(SQLiteBackend(db_path=tmp_path / "ltm.sqlite3"))
+    try:
+        disabled = client.post("/handle", data=json.dumps(payload), content_type="application/json")
+        monkeypatch.setattr(app_module, "SERVER_TIMING", True)
+        enabled = client.post("/handle", data=json.dumps(payload), content_type="application/json")
+    finally:
+        ltm_store.set_backend(None)
+
+    assert "Server-Timing" not in disabled.headers
+    # First request classified the email; the second is an LTM hit
+    stages = parse_server_timing(enabled.headers["Server-Timing"])
+    assert {"parse", "ltm_lookup", "serialize"} <= set(stages)
+    assert "classify" not in stages
+    assert all(duration >= 0.0 for duration in stages.values())
@@ -0,0 +1,40 @@
+import csv
+from pathlib import Path
+
+from email_agent import config, priority_logic
+from email_agent.config import DATA_DIR
+from email_agent.learning import model_store
+from email_agent.learning.streaming_training import train_streaming
+
+
+def _write_dataset(path: Path, copies: int) -> None:
+    with open(DATA_DIR / "synthetic_emails.csv", newline="", encoding="utf-8") as handle:
+        rows = list(csv.DictReader(handle))
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["text", "priority"])
+        for copy in range(copies):
+            for row in rows:
+                writer.writerow([f"{row['text']} (batch {copy})", row["priority"]])
+
+
+def test_streaming_training_learns_in_chunks_and_serves(monkeypatch, tmp_path: Path):
+    dataset = tmp_path / "emails.csv"
+    _write_dataset(dataset, copies=2)
+    monkeypatch.setattr(config, "MODEL_REGISTRY_DIR", tmp_path / "registry")
+
+    # An absolute path overrides data/ in the loader; small chunks force many partial_fit calls
+    pipeline, accuracy, stats = train_streaming(str(dataset), chunksize=97, epochs=3)
+
+    assert accuracy >= 0.9
+    assert stats["documents_trained"] == 3 * (1200 - stats["documents_tested"])
+    assert stats["docs_per_sec"] > 0
+    assert set(pipeline.classes_) == {"high", "medium", "low"}
+
+    # The saved pipeline is what classify_email loads and serves
+    monkeypatch.setattr(priority_logic, "_ACTIVE", None)
+    monkeypatch.setattr(priority_logic, "_LOAD_ATTEMPTED", False)
+    result = priority_logic.classify_email("Urgent: the production server is down, fix it ASAP.")
+    assert "[TAG: ML_MODEL]" in result["explanation"]
+    assert result["model_version"] == model_store.active_version()
+    assert result["priority"] == "high"
@@ -0,0 +1,125 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from email_agent import ltm_store
+from email_agent.priority_logic import classify_email
+from email_agent.storage.sqlite_backend import SQLiteBackend
+from email_agent.text_normalization import (
+    STEPS,
+    normalization_fingerprint,
+    normalize_text,
+    parse_steps,
+)
+
+BASE = "The staging server is down again, can you restart it before the 3pm demo?"
+
+
+def test_whitespace_and_case_are_folded():
+    assert normalize_text("  Hello\n\n  WORLD\t again ") == "hello world again"
+
+
+def test_quoted_reply_and_signature_are_stripped():
+    text = (
+        "Please approve the budget by Friday.\n\n"
+        "Thanks,\nDana\n\n"
+        "On Mon, 3 May 2024 at 09:12, Sam <sam@example.com> wrote:\n"
+        "> Can you look at the budget?\n> Sam"
+    )
+    assert normalize_text(text) == "please approve the budget by friday."
+
+    outlook = "Approved.\n\nFrom: Sam\nSent: Monday\nSubject: budget\n\nCan you look at it?"
+    assert normalize_text(outlook) == "approved."
+
+    assert normalize_text("Call me back.\n-- \nDana\n+1 555 0100") == "call me back."
+    assert normalize_text("Call me back.\n\nSent from my iPhone") == "call me back."
+
+
+def test_urls_emails_ids_and_numbers_are_masked():
+    text = "Invoice INV-20931 of $1,200.50 due 2024-05-03, pay at https://pay.example.com/i?x=9 or mail ap@corp.com"
+    assert normalize_text(text) == (
+        "invoice <id> of $<num> due <num>, pay at <url> or mail <email>"
+    )
+
+
+def test_mid_body_sign_off_is_content():
+    text = "Hi team,\nThanks!\nThe production server is down, fix it ASAP, urgent!"
+    assert normalize_text(text) == "hi team, thanks! the production server is down, fix it asap, urgent!"
+
+    text = "Quick update.\nBest,\nCan you send the contract before the board meeting?"
+    assert normalize_text(text).endswith("best, can you send the contract before the board meeting?")
+
+    # Short body lines after a sign-off are no signature either
+    text = "Status update on the migration\nThanks\nneed the fix deployed asap today"
+    assert normalize_text(text) == "status update on the migration thanks need the fix deployed asap today"
+    assert classify_email(text)["priority"] == classify_email(text, normalize=False)["priority"] == "high"
+    text = "Server is down\nRegards\nOps team\nescalate to on-call now"
+    assert normalize_text(text) == "server is down regards ops team escalate to on-call now"
+
+    # A real closing block is still cut: a lone name, or name, title and contact lines
+    assert normalize_text("Please call me.\nThanks,\nDana") == "please call me."
+    text = "Please review the draft.\n\nBest,\nDana Smith\nHead of Sales\n+1 (555) 010-0100\ndana@corp.com"
+    assert normalize_text(text) == "please review the draft."
+
+
+def test_priority_keywords_survive_ids_step():
+    text = "URGENT P1: outage in Q3 release, deadline-2025 fix needs 2FA, ASAP"
+    assert normalize_text(text) == "urgent p1: outage in q3 release, deadline-<num> fix needs 2fa, asap"
+
+    masked = "Ticket JIRA-4821, build 3f2a9c1e7b4d, req 123e4567-e89b-12d3-a456-426614174000, parcel 1Z999AA10123456784"
+    assert normalize_text(masked) == "ticket <id>, build <id>, req <id>, parcel <id>"
+
+
+def test_normalization_is_idempotent_and_never_empties_text():
+    text = "Re: ticket #4821\n\nThanks,\nBob"
+    once = normalize_text(text)
+    assert normalize_text(once) == once
+    # Stripping the sign-off would leave nothing, so it is kept
+    assert normalize_text("Thanks!") == "thanks!"
+    assert normalize_text("") == ""
+
+
+def test_steps_can_be_selected():
+    assert parse_steps("all") == STEPS
+    assert parse_steps("none") == ()
+    assert parse_steps("case, whitespace") == ("case", "whitespace")
+    with pytest.raises(ValueError):
+        parse_steps("case,stemming")
+
+    assert normalize_text("Order  42", steps=("whitespace",)) == "Order 42"
+    assert normalize_text("Order  42", steps=()) == "Order  42"
+    assert normalization_fingerprint(()) == ""
+    assert normalization_fingerprint(("numbers", "case")) == "norm3:numbers,case"
+
+
+def test_text_variants_share_one_ltm_entry(client, tmp_path: Path):
+    variants = [
+        BASE,
+        "  the STAGING server is down again,\ncan you restart it before the 4pm demo?  ",
+        BASE + "\n\nThanks,\nAlex\n\nOn Tue, Alex wrote:\n> earlier thread",
+    ]
+    ltm_store.set_backend(SQLiteBackend(db_path=tmp_path / "ltm.sqlite3"))
+    try:
+        results = []
+        for position, text in enumerate(variants):
+            payload = {
+                "request_id": f"norm-{position}",
+                "agent_name": "email_priority_agent",
+                "intent": "email.priority.classify",
+                "input": {"text": text, "metadata": {"sender": "ops@example.com"}},
+            }
+            response = client.post("/handle", data=json.dumps(payload), content_type="application/json")
+            assert response.status_code == 200
+            results.append(response.get_json()["output"]["result"])
+        assert ltm_store.get_backend().count() == 1
+    finally:
+        ltm_store.set_backend(None)
+
+    assert "ltm_match" not in results[0]
+    for text, result in zip(variants[1:], results[1:]):
+        assert result["ltm_match"]["tier"] == "exact"
+        assert result["ltm_match"]["matched_key"] == results[1]["ltm_match"]["matched_key"]
+        assert result["priority"] == results[0]["priority"]
+        # The length still describes the request's own text
+        assert result["raw_text_length"] == len(text)